@@ -56,11 +56,14 @@ SITE_ID = 1
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PerfInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,7 +93,7 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
@@ -99,6 +102,27 @@ DATABASES = {
     }
 }
 
+# Réplica de solo lectura opcional para reportes, dashboards y Gantt.
+# Se activa definiendo DB_REPLICA_HOST (PostgreSQL) o DB_REPLICA_NAME (por
+# ejemplo un segundo archivo SQLite en local, copiado del primario).
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # En los tests la réplica apunta a la misma base que 'default'
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Segundos que una sesión lee del primario después de escribir
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -145,6 +169,45 @@ STATIC_ROOT = BASE_DIR / 'static_root'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Las subidas se escriben por partes a un archivo temporal calculando su SHA-256
+FILE_UPLOAD_HANDLERS = ['core.storage.HashingUploadHandler']
+
+# Subidas reanudables por partes para archivos grandes
+CHUNKED_UPLOAD_DIR = MEDIA_ROOT / 'uploads_tmp'
+CHUNKED_UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = int(os.getenv('CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024))
+
+# Descarga de adjuntos: con un proxy delante, Django solo autoriza y delega el
+# envío. 'nginx' usa X-Accel-Redirect hacia ATTACHMENT_SENDFILE_PREFIX (location
+# 'internal' con alias a MEDIA_ROOT); 'apache' usa X-Sendfile (mod_xsendfile).
+ATTACHMENT_SENDFILE_BACKEND = os.getenv('ATTACHMENT_SENDFILE_BACKEND') or None
+ATTACHMENT_SENDFILE_PREFIX = os.getenv('ATTACHMENT_SENDFILE_PREFIX', '/protected-media/')
+
+# Previews de adjuntos (Pillow / pdftoppm opcionales), generadas en un pool de
+# procesos. Con 0 workers solo se generan con 'manage.py generate_previews'.
+ATTACHMENT_PREVIEW_SIZE = 320
+ATTACHMENT_PREVIEW_WORKERS = int(os.getenv('ATTACHMENT_PREVIEW_WORKERS', 2))
+
+# Procesos para la previsión Monte Carlo de proyectos grandes (0: en el propio proceso)
+FORECAST_WORKERS = int(os.getenv('FORECAST_WORKERS', 2))
+
+# Máximo de registros por petición en la sincronización por lotes de tareas
+TASK_UPSERT_MAX_BATCH = int(os.getenv('TASK_UPSERT_MAX_BATCH', 5000))
+
+# Proyectar la bandeja de eventos en un hilo tras cada commit. Con 'False' solo
+# la proyecta 'manage.py process_outbox --loop' (worker dedicado)
+OUTBOX_PROJECT_ON_COMMIT = os.getenv('OUTBOX_PROJECT_ON_COMMIT', 'True') == 'True'
+
+# Días que se conservan los eventos ya proyectados (ver 'manage.py process_outbox')
+OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', 7))
+
+# Las notificaciones no leídas con el mismo actor, verbo y objeto dentro de esta
+# ventana se agrupan en una sola fila con contador (0: sin agrupar)
+NOTIFICATION_COALESCE_MINUTES = int(os.getenv('NOTIFICATION_COALESCE_MINUTES', 30))
+
+# Días que se conservan las notificaciones leídas (ver 'manage.py prune_notifications')
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -166,4 +229,24 @@ ACCOUNT_SIGNUP_FIELDS = ['email*', 'password1*', 'password2*']
 ACCOUNT_SIGNUP_FIELDS = ['email*', 'password1*', 'password2*']
 ACCOUNT_EMAIL_VERIFICATION = 'optional' # 'mandatory' para producción
 LOGIN_REDIRECT_URL = '/' # A donde ir después del login
-ACCOUNT_LOGOUT_ON_GET = True # Permite logout sin confirmación
\ No newline at end of file
+ACCOUNT_LOGOUT_ON_GET = True # Permite logout sin confirmación
+
+
+# Instrumentación de rendimiento por vista (core.middleware.PerfInstrumentationMiddleware)
+PERF_INSTRUMENTATION_ENABLED = os.getenv('PERF_INSTRUMENTATION_ENABLED', 'True') == 'True'
+# Ventana deslizante de los histogramas, en minutos
+PERF_WINDOW_MINUTES = int(os.getenv('PERF_WINDOW_MINUTES', 60))
+# Carpeta donde cada worker vuelca sus métricas (vacío para no volcarlas)
+PERF_STATS_DIR = os.getenv('PERF_STATS_DIR', BASE_DIR / 'perf_stats')
+PERF_FLUSH_SECONDS = int(os.getenv('PERF_FLUSH_SECONDS', 30))
+# Si una petición supera este número de consultas se registra un aviso (None lo desactiva)
+PERF_QUERY_BUDGET = int(os.getenv('PERF_QUERY_BUDGET')) if os.getenv('PERF_QUERY_BUDGET') else None
+
+
+# Perfilado bajo demanda para staff (core.middleware.ProfilingMiddleware)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED') == 'True'
+PROFILING_DIR = os.getenv('PROFILING_DIR', BASE_DIR / 'profiles')
+PROFILING_MAX_PER_MINUTE = int(os.getenv('PROFILING_MAX_PER_MINUTE', 6))
+PROFILING_SAMPLE_INTERVAL = float(os.getenv('PROFILING_SAMPLE_INTERVAL', 0.005))
+# Número de perfiles que se conservan en disco
+PROFILING_KEEP = int(os.getenv('PROFILING_KEEP', 50))
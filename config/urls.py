@@ -16,8 +16,6 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 from core.views import LandingPageView
 
 urlpatterns = [
@@ -26,6 +24,3 @@ urlpatterns = [
     path('accounts/', include('allauth.urls')),
     path('workspaces/', include('core.urls')),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (User, Workspace, Membership, Project, Task,
                      Invitation, Comment, Attachment, TimeLog, Activity, Notification,
-                     Role)
+                     Role, StoredFile, ChunkedUpload)
 
 
 # Para una mejor visualización, mostraremos los miembros en la pagina del Workspace
@@ -45,4 +45,6 @@ admin.site.register(Attachment)
 admin.site.register(TimeLog)
 admin.site.register(Activity)
 admin.site.register(Notification)
-admin.site.register(Role)
\ No newline at end of file
+admin.site.register(Role)
+admin.site.register(StoredFile)
+admin.site.register(ChunkedUpload)
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+API JSON de solo lectura para integraciones (proyectos y tareas).
+
+- Paginación por cursor sobre el id (keyset): coste constante en cualquier página.
+- Campos a elección con ?fields=id,title,status: solo se piden esas columnas
+  con .values(), sin instanciar modelos.
+- La respuesta se envía en streaming a medida que se leen las filas (también
+  bajo ASGI, ver core/downloads.py).
+"""
+import base64
+import binascii
+from datetime import date
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+
+from .downloads import streaming_response
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+STREAM_CHUNK_SIZE = 500
+
+# Nombre público -> columna
+PROJECT_FIELDS = {
+    'id': 'id',
+    'workspace': 'workspace_id',
+    'name': 'name',
+    'slug': 'slug',
+    'description': 'description',
+    'deadline': 'deadline',
+    'created_at': 'created_at',
+}
+PROJECT_DEFAULT_FIELDS = ['id', 'workspace', 'name', 'slug', 'deadline']
+
+TASK_FIELDS = {
+    'id': 'id',
+    'project': 'project_id',
+    'external_id': 'external_id',
+    'title': 'title',
+    'description': 'description',
+    'status': 'status',
+    'priority': 'priority',
+    'assignee': 'assignee_id',
+    'start_date': 'start_date',
+    'due_date': 'due_date',
+    'estimated_hours': 'estimated_hours',
+    'created_at': 'created_at',
+}
+TASK_DEFAULT_FIELDS = ['id', 'title', 'status', 'priority', 'assignee', 'start_date', 'due_date']
+
+
+class ApiError(Exception):
+    """ Parámetro no válido: se responde 400 con el mensaje. """
+
+
+def error_response(error):
+    return JsonResponse({'error': str(error)}, status=400)
+
+
+def selected_fields(request, available, default):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(default)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ApiError(f"Campos desconocidos: {', '.join(unknown)}. Disponibles: {', '.join(available)}.")
+    return fields
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError("'limit' debe ser un número entero.")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise ApiError("Cursor no válido.")
+
+
+def _choices(request, param, choices):
+    values = [value.strip().upper() for value in request.GET.get(param, '').split(',') if value.strip()]
+    invalid = [value for value in values if value not in choices]
+    if invalid:
+        raise ApiError(f"Valor no válido para '{param}': {', '.join(invalid)}.")
+    return values
+
+
+def _date(request, param):
+    value = request.GET.get(param)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ApiError(f"'{param}' debe ser una fecha AAAA-MM-DD.")
+
+
+def filter_tasks(request, tasks, status_choices, priority_choices):
+    """ Filtros: status, priority (listas separadas por comas), assignee (id o 'none'), due_after, due_before. """
+    statuses = _choices(request, 'status', status_choices)
+    if statuses:
+        tasks = tasks.filter(status__in=statuses)
+    priorities = _choices(request, 'priority', priority_choices)
+    if priorities:
+        tasks = tasks.filter(priority__in=priorities)
+
+    assignee = request.GET.get('assignee')
+    if assignee == 'none':
+        tasks = tasks.filter(assignee__isnull=True)
+    elif assignee:
+        if not assignee.isdigit():
+            raise ApiError("'assignee' debe ser un id de usuario o 'none'.")
+        tasks = tasks.filter(assignee_id=int(assignee))
+
+    due_after, due_before = _date(request, 'due_after'), _date(request, 'due_before')
+    if due_after:
+        tasks = tasks.filter(due_date__gte=due_after)
+    if due_before:
+        tasks = tasks.filter(due_date__lte=due_before)
+    return tasks
+
+
+def paginated_values(request, queryset, field_map, fields):
+    """
+    Aplica el cursor y devuelve (filas, límite): un iterador de diccionarios
+    con solo las columnas pedidas (más el id, necesario para el cursor).
+    """
+    limit = page_limit(request)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        queryset = queryset.filter(id__gt=decode_cursor(cursor))
+    columns = list(dict.fromkeys(['id'] + [field_map[name] for name in fields]))
+    # La consulta se ejecuta al enviar la respuesta, cuando el middleware ya ha
+    # restablecido el enrutado: fijamos ahora la base de datos (réplica o primario)
+    queryset = queryset.using(queryset.db)
+    # Pedimos una fila de más para saber si hay página siguiente
+    rows = queryset.order_by('id').values(*columns)[:limit + 1].iterator(chunk_size=STREAM_CHUNK_SIZE)
+    return rows, limit
+
+
+def stream_page(request, rows, limit, field_map, fields):
+    """ Respuesta en streaming: {"results": [...], "next_cursor": ...}. """
+    encoder = DjangoJSONEncoder()
+
+    def generate():
+        yield '{"results": ['
+        last_id = None
+        has_next = False
+        separator = ''
+        buffer = []
+        for index, row in enumerate(rows):
+            if index == limit:
+                has_next = True
+                break
+            last_id = row['id']
+            buffer.append(encoder.encode({name: row[field_map[name]] for name in fields}))
+            # Enviamos por bloques: ni una escritura por fila ni la página entera en memoria
+            if len(buffer) == STREAM_CHUNK_SIZE:
+                yield separator + ','.join(buffer)
+                separator, buffer = ',', []
+        if buffer:
+            yield separator + ','.join(buffer)
+        next_cursor = encode_cursor(last_id) if has_next else None
+        yield '], "next_cursor": ' + encoder.encode(next_cursor) + '}'
+
+    return streaming_response(request, generate(), content_type='application/json')
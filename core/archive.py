@@ -0,0 +1,300 @@
+"""
+Archivo en frío de proyectos terminados (ver ProjectArchive).
+
+start_archive() marca el proyecto como archivado (solo lectura desde ese
+momento) y encola el trabajo pesado en un hilo de fondo:
+
+1. Snapshot: cada sección (tareas, dependencias, historial de estados,
+   comentarios, adjuntos, registros de tiempo, actividad y notificaciones) se
+   escribe en streaming como JSON Lines comprimido, con memoria acotada.
+2. Purga: las filas se borran por lotes de CHUNK_SIZE, cada lote en su propia
+   transacción corta, empezando por las que dependen de otras. Se borran con
+   _raw_delete, sin señales ni colector por fila: el índice de búsqueda se
+   limpia por lotes y los adjuntos no liberan su StoredFile, que el snapshot
+   sigue referenciando.
+
+start_restore() hace el camino inverso: recorre el snapshot y vuelve a
+insertar las filas con bulk_create por lotes y sus ids originales (la
+actividad y las notificaciones apuntan a ellos). ignore_conflicts permite
+reanudar una restauración interrumpida. Los usuarios borrados entretanto se
+dejan a NULL en los campos opcionales; las filas que los necesitan se omiten.
+
+Si el proceso se cae a mitad, 'manage.py process_archives' retoma los
+archivos pendientes.
+"""
+import gzip
+import io
+import json
+import tempfile
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import events, search, versions
+from .background import Queue
+from .models import (Activity, Attachment, Comment, DomainEvent, Notification, Project, ProjectArchive,
+                     SearchEntry, Task, TaskTransition, TimeLog)
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 1000
+RECENT_ACTIVITIES = 10
+CACHE_TIMEOUT = 24 * 60 * 60
+
+Edge = Task.predecessors.through
+
+_queue = Queue('archive')
+
+
+def _task_notifications(project):
+    return Notification.objects.filter(
+        content_type=ContentType.objects.get_for_model(Task),
+        object_id__in=Task.objects.filter(project=project).values('pk'),
+    )
+
+
+# Sección -> (modelo, filas del proyecto). Se escriben y restauran en este orden
+# y se purgan en el inverso.
+SECTIONS = {
+    'tasks': (Task, lambda project: Task.objects.filter(project=project)),
+    'dependencies': (Edge, lambda project: Edge.objects.filter(Q(from_task__project=project) | Q(to_task__project=project))),
+    'transitions': (TaskTransition, lambda project: TaskTransition.objects.filter(project=project)),
+    'comments': (Comment, lambda project: Comment.objects.filter(task__project=project)),
+    'attachments': (Attachment, lambda project: Attachment.objects.filter(comment__task__project=project)),
+    'timelogs': (TimeLog, lambda project: TimeLog.objects.filter(task__project=project)),
+    'activities': (Activity, lambda project: Activity.objects.filter(project=project)),
+    'notifications': (Notification, _task_notifications),
+}
+# Documentos de la búsqueda global de cada sección
+SEARCH_KINDS = {'tasks': SearchEntry.Kind.TASK, 'comments': SearchEntry.Kind.COMMENT}
+
+
+class _Encoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder recorta los microsegundos: la restauración debe ser exacta
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _fields(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+# --- Entrada (vistas y comando) ---
+def start_archive(project, actor):
+    """ Bloquea el proyecto y encola su archivo. Devuelve el ProjectArchive. """
+    with transaction.atomic():
+        record = ProjectArchive.objects.create(project=project, archived_by=actor)
+        project.archived_at = timezone.now()
+        project.save(update_fields=['archived_at'])
+        transaction.on_commit(lambda: schedule(record.pk))
+    return record
+
+
+def start_restore(record):
+    """ Encola la restauración de un proyecto archivado. """
+    with transaction.atomic():
+        record.state = ProjectArchive.State.RESTORING
+        record.save(update_fields=['state'])
+        transaction.on_commit(lambda: schedule(record.pk))
+
+
+def process(archive_id):
+    """ Avanza un archivo pendiente: snapshot y purga, o restauración. """
+    record = ProjectArchive.objects.select_related('project').filter(pk=archive_id).first()
+    if record is None:
+        return
+    if record.state == ProjectArchive.State.ARCHIVING:
+        if not record.snapshot:
+            # Los eventos pendientes del proyecto deben llegar al snapshot
+            events.project_pending()
+            write_snapshot(record)
+        purge(record.project)
+        record.state = ProjectArchive.State.ARCHIVED
+        record.save(update_fields=['state'])
+    elif record.state == ProjectArchive.State.RESTORING:
+        restore(record)
+
+
+def schedule(archive_id):
+    return _queue.submit(process, archive_id)
+
+
+# --- Snapshot ---
+def write_snapshot(record):
+    """ Escribe el snapshot en un temporal (memoria acotada) y lo guarda en el almacenamiento. """
+    project = record.project
+    counts = {}
+    with tempfile.TemporaryFile() as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as compressed:
+            out = io.TextIOWrapper(compressed, encoding='utf-8')
+            out.write(json.dumps({'version': FORMAT_VERSION, 'project': project.pk}) + '\n')
+            for section, (model, rows) in SECTIONS.items():
+                counts[section] = 0
+                for row in rows(project).order_by('pk').values(*_fields(model)).iterator(chunk_size=CHUNK_SIZE):
+                    out.write(json.dumps([section, row], cls=_Encoder) + '\n')
+                    counts[section] += 1
+            out.flush()
+            out.detach()
+        raw.seek(0)
+        record.snapshot.save(f'project-{project.pk}.jsonl.gz', File(raw), save=False)
+    record.counts = counts
+    record.save(update_fields=['snapshot', 'counts'])
+
+
+def read_snapshot(record):
+    """ Recorre el snapshot en streaming: pares (sección, fila). """
+    with record.snapshot.open('rb') as raw, gzip.open(raw, 'rt', encoding='utf-8') as lines:
+        header = json.loads(next(lines))
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Versión de snapshot no soportada: {header.get('version')}")
+        for line in lines:
+            section, row = json.loads(line)
+            yield section, row
+
+
+# --- Purga ---
+def delete_in_batches(queryset, search_kind=None, on_batch=None):
+    """
+    Borra las filas del queryset por lotes de CHUNK_SIZE, cada lote en su
+    propia transacción corta. Sin señales ni cascada: las filas que dependen de
+    estas deben borrarse antes. 'on_batch(n)' recibe el tamaño de cada lote
+    (progreso).
+    """
+    total = 0
+    while ids := list(queryset.order_by().values_list('pk', flat=True)[:CHUNK_SIZE]):
+        with transaction.atomic():
+            if search_kind:
+                SearchEntry.objects.filter(kind=search_kind, object_id__in=ids).delete()
+            batch = queryset.model._base_manager.filter(pk__in=ids)
+            batch._raw_delete(batch.db)
+        total += len(ids)
+        if on_batch:
+            on_batch(len(ids))
+    return total
+
+
+def purge(project, on_batch=None):
+    """ Borra por lotes las filas del proyecto de todas las secciones del snapshot. """
+    for section in reversed(SECTIONS):
+        delete_in_batches(SECTIONS[section][1](project), SEARCH_KINDS.get(section), on_batch=on_batch)
+    # El outbox ya proyectado no se guarda: no se vuelve a proyectar al restaurar
+    delete_in_batches(DomainEvent.objects.filter(project=project, processed_at__isnull=False), on_batch=on_batch)
+    # Los borrados sin señales no versionan el proyecto
+    versions.bump_project(project.pk)
+
+
+# --- Restauración ---
+def restore(record):
+    """ Vuelve a insertar el snapshot por lotes y desarchiva el proyecto. """
+    section, buffer = None, []
+    # Ids omitidos por modelo: sus dependientes (p. ej. los adjuntos de un comentario) también se omiten
+    skipped = defaultdict(set)
+    for name, row in read_snapshot(record):
+        if buffer and (name != section or len(buffer) >= CHUNK_SIZE):
+            _insert(section, buffer, skipped)
+            buffer = []
+        section = name
+        buffer.append(row)
+    if buffer:
+        _insert(section, buffer, skipped)
+
+    name, storage = record.snapshot.name, record.snapshot.storage
+    with transaction.atomic():
+        Project.objects.filter(pk=record.project_id).update(archived_at=None)
+        record.delete()
+        # El snapshot se borra solo si la transacción se confirma
+        transaction.on_commit(lambda: storage.delete(name))
+    versions.bump_project(record.project_id)
+
+
+def _insert(section, rows, skipped):
+    model = SECTIONS[section][0]
+    User = get_user_model()
+    relations = [field for field in model._meta.concrete_fields if field.is_relation]
+    user_fields = [field for field in relations if field.related_model is User]
+    referenced = {row[field.attname] for row in rows for field in user_fields} - {None}
+    existing = set(User.objects.filter(pk__in=referenced).values_list('pk', flat=True)) if referenced else set()
+    kept = []
+    for row in rows:
+        missing = [field for field in user_fields if row[field.attname] is not None and row[field.attname] not in existing]
+        orphan = any(row[field.attname] in skipped[field.related_model] for field in relations if field.related_model in skipped)
+        if orphan or any(not field.null for field in missing):
+            skipped[model].add(row['id'])
+            continue
+        for field in missing:
+            row[field.attname] = None
+        kept.append(row)
+    with transaction.atomic():
+        model.objects.bulk_create([model(**row) for row in kept], batch_size=CHUNK_SIZE, ignore_conflicts=True)
+    if section in SEARCH_KINDS:
+        search.reindex(SEARCH_KINDS[section], [row['id'] for row in kept])
+
+
+# --- Vista de solo lectura ---
+def board(record):
+    """
+    Tablero del proyecto archivado leído del snapshot: {'columns': [(etiqueta,
+    [tarea])], 'activities': [...], 'counts'}. Se cachea: el snapshot no cambia.
+    """
+    key = f'archive:board:{record.pk}:{record.snapshot.name}'
+    data = cache.get(key)
+    if data is None:
+        data = _board(record)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def _board(record):
+    tasks = {}
+    comments = Counter()
+    activities = deque(maxlen=RECENT_ACTIVITIES)
+    for section, row in read_snapshot(record):
+        if section == 'tasks':
+            tasks[row['id']] = {
+                'title': row['title'], 'status': row['status'], 'priority': row['priority'],
+                'due_date': row['due_date'] and parse_date(row['due_date']), 'assignee_id': row['assignee_id'],
+            }
+        elif section == 'comments':
+            comments[row['task_id']] += 1
+        elif section == 'activities':
+            activities.append({'actor_id': row['actor_id'], 'verb': row['verb'], 'created_at': parse_datetime(row['created_at'])})
+
+    columns = {status: [] for status in Task.Status.values}
+    for task_id, task in sorted(tasks.items()):
+        columns[task['status']].append({**task, 'comments': comments[task_id]})
+    return {
+        'columns': [(Task.Status(status).label, items) for status, items in columns.items() if items],
+        'activities': list(reversed(activities)),
+        'counts': record.counts,
+    }
+
+
+def board_context(record):
+    """ board() con los nombres de usuario resueltos (una consulta). """
+    data = board(record)
+    user_ids = {task['assignee_id'] for _, items in data['columns'] for task in items}
+    user_ids |= {activity['actor_id'] for activity in data['activities']}
+    users = get_user_model().objects.in_bulk(user_ids - {None})
+
+    def name(user_id):
+        user = users.get(user_id)
+        return (user.get_full_name() or user.username) if user else ''
+
+    return {
+        'columns': [
+            (label, [{**task, 'assignee': name(task['assignee_id'])} for task in items])
+            for label, items in data['columns']
+        ],
+        'activities': [{**activity, 'actor': name(activity['actor_id'])} for activity in data['activities']],
+        'counts': data['counts'],
+    }
@@ -0,0 +1,39 @@
+"""
+Colas de trabajo en hilos de fondo.
+
+Cada cola (proyección del outbox, archivos de proyecto, borrados) tiene un
+único hilo que se crea al encolar el primer trabajo: los trabajos de una misma
+cola se ejecutan en orden, sin competir entre sí por las mismas filas. Los
+errores se registran en el log en lugar de perderse en el Future, y el hilo
+cierra su conexión a la base de datos al terminar cada trabajo.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class Queue:
+
+    def __init__(self, name):
+        self.name = name
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _run(self, func, args):
+        try:
+            func(*args)
+        except Exception:
+            logger.exception('Error en la cola %s: %s%r', self.name, func.__name__, args)
+        finally:
+            # El hilo abre su propia conexión: se cierra al terminar
+            close_old_connections()
+
+    def submit(self, func, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.name)
+            return self._executor.submit(self._run, func, args)
@@ -0,0 +1,152 @@
+"""
+Previsión de capacidad: carga diaria de cada persona en todo un workspace y
+periodos de sobreasignación.
+
+El esfuerzo de cada tarea abierta (estimated_hours, o DEFAULT_TASK_HOURS si no
+tiene estimación) se reparte por igual entre los días de start_date a
+due_date. La suma se hace vectorizada con NumPy: cada tarea aporta +tasa en
+su primer día y -tasa al día siguiente del último en un array de diferencias
+(persona × día), y una suma acumulada da la carga de todos los días a la vez,
+sin recorrer los días de cada tarea.
+
+El resultado se cachea con la versión de los proyectos del workspace (ver
+core/versions.py). NumPy es una dependencia opcional: sin ella available()
+devuelve False y los reportes omiten la previsión.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import versions
+from .models import Task
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+HORIZON_DAYS = 90
+HOURS_PER_DAY = 8
+DEFAULT_TASK_HOURS = 8
+CACHE_TIMEOUT = 6 * 60 * 60
+CHUNK_SIZE = 5000
+# Margen para no marcar sobreasignación por errores de redondeo
+EPSILON = 1e-6
+
+
+def available():
+    return np is not None
+
+
+def daily_load(person, first_day, last_day, hours, days):
+    """
+    Carga diaria por persona. Todos los argumentos son arrays de la misma
+    longitud (una posición por tarea); los días son desplazamientos desde el
+    inicio del horizonte, inclusivos, y pueden caer fuera de [0, days).
+    Devuelve un array (personas × days) de horas.
+    """
+    people = int(person.max()) + 1 if len(person) else 0
+    last_day = np.maximum(last_day, first_day)
+    # La tasa se calcula con la duración completa: recortar al horizonte no cambia las horas por día
+    rate = hours / (last_day - first_day + 1)
+    begin = np.clip(first_day, 0, days)
+    end = np.clip(last_day + 1, 0, days)
+    visible = end > begin
+
+    # Array de diferencias aplanado: bincount acumula las tareas que empiezan el mismo día
+    width = days + 1
+    size = people * width
+    diff = np.bincount(person[visible] * width + begin[visible], weights=rate[visible], minlength=size)
+    diff -= np.bincount(person[visible] * width + end[visible], weights=rate[visible], minlength=size)
+    return np.cumsum(diff.reshape(people, width)[:, :days], axis=1)
+
+
+def overallocated_windows(load, capacity):
+    """ Tramos consecutivos con carga > capacity: lista de (persona, primer día, último día, pico). """
+    over = (load > capacity + EPSILON).astype(np.int8)
+    edges = np.diff(np.pad(over, ((0, 0), (1, 1))), axis=1)
+    # np.nonzero recorre por filas: inicios y finales quedan emparejados en orden
+    starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)
+    return [
+        (int(row), int(first), int(last) - 1, float(load[row, first:last].max()))
+        for row, first, last in zip(starts[0], starts[1], ends[1])
+    ]
+
+
+def _load_tasks(workspace, start, days):
+    """ Tareas abiertas, asignadas y con fechas que tocan el horizonte, como arrays. """
+    end = start + timedelta(days=days - 1)
+    rows = (
+        Task.objects
+        .filter(
+            project__workspace=workspace, project__deleted_at__isnull=True, assignee__isnull=False,
+            start_date__isnull=False, due_date__isnull=False,
+            start_date__lte=end, due_date__gte=start,
+        )
+        .exclude(status__in=[Task.Status.DONE, Task.Status.CANCELED])
+        .values_list('assignee_id', 'start_date', 'due_date', 'estimated_hours')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    assignees, first_days, last_days, hours = [], [], [], []
+    origin = start.toordinal()
+    for assignee_id, start_date, due_date, estimated_hours in rows:
+        assignees.append(assignee_id)
+        first_days.append(start_date.toordinal() - origin)
+        last_days.append(due_date.toordinal() - origin)
+        hours.append(DEFAULT_TASK_HOURS if estimated_hours is None else estimated_hours)
+    return (
+        np.array(assignees, dtype=np.int64),
+        np.array(first_days, dtype=np.int64),
+        np.array(last_days, dtype=np.int64),
+        np.array(hours, dtype=np.float64),
+    )
+
+
+def forecast(workspace, start=None, days=HORIZON_DAYS):
+    """
+    Previsión del workspace desde 'start' (hoy por defecto) durante 'days' días:
+    {'start', 'days', 'capacity', 'people': [{'id', 'name', 'daily', 'peak', 'windows'}]}
+    con 'windows' como lista de (primer día, último día, pico de horas).
+    Devuelve None si NumPy no está instalado.
+    """
+    if not available():
+        return None
+    start = start or timezone.localdate()
+    project_ids = list(workspace.projects.values_list('pk', flat=True))
+    key = f'capacity:{workspace.pk}:{start.isoformat()}:{days}:{versions.projects_digest(project_ids)}'
+    result = cache.get(key)
+    if result is None:
+        result = _compute(workspace, start, days)
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+def _compute(workspace, start, days):
+    assignees, first_days, last_days, hours = _load_tasks(workspace, start, days)
+    # Índices densos por persona para las filas de la matriz
+    user_ids, person = np.unique(assignees, return_inverse=True)
+    load = daily_load(person, first_days, last_days, hours, days) if len(person) else np.zeros((0, days))
+
+    windows = {}
+    for row, first, last, peak in overallocated_windows(load, HOURS_PER_DAY):
+        windows.setdefault(row, []).append(
+            (start + timedelta(days=first), start + timedelta(days=last), round(peak, 1))
+        )
+
+    users = get_user_model().objects.in_bulk([int(pk) for pk in user_ids])
+    daily = np.round(load, 2).tolist()
+    people = []
+    for row, user_id in enumerate(user_ids):
+        user = users.get(int(user_id))
+        people.append({
+            'id': int(user_id),
+            'name': (user.get_full_name() or user.username) if user else '',
+            'daily': daily[row],
+            'peak': round(float(load[row].max()), 1),
+            'windows': windows.get(row, []),
+        })
+    people.sort(key=lambda person: (-person['peak'], person['name']))
+    return {'start': start, 'days': days, 'capacity': HOURS_PER_DAY, 'people': people}
@@ -0,0 +1,179 @@
+"""
+Borrado en segundo plano de workspaces y proyectos.
+
+La petición solo marca el objeto con deleted_at (el manager por defecto lo
+oculta en toda la aplicación; al borrar un workspace se marcan también sus
+proyectos) y crea un DeletionJob. Tras el commit, un hilo de fondo borra las
+filas dependientes por lotes acotados, cada uno en su propia transacción
+(ver archive.delete_in_batches), y va anotando el progreso en el trabajo:
+
+1. Adjuntos: se resta de una vez la referencia de cada StoredFile del lote y
+   los que se quedan sin referencias se borran, con su archivo, tras el
+   commit. En un proyecto archivado los adjuntos están en el snapshot, que
+   también se borra.
+2. El resto de filas del proyecto, en el orden de core/archive.py, y su outbox.
+3. El propio proyecto; en un workspace, al final, el resto de su índice de
+   búsqueda y el workspace (con sus membresías e invitaciones).
+
+Todos los pasos se pueden repetir: 'manage.py process_deletions' retoma los
+trabajos que quedaron a medias.
+"""
+import logging
+from collections import Counter
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import archive
+from .background import Queue
+from .models import (Activity, Attachment, DeletionJob, DomainEvent, Notification, Project, ProjectArchive,
+                     SearchEntry, StoredFile, Workspace)
+
+logger = logging.getLogger(__name__)
+
+_queue = Queue('deletion')
+
+
+def request_deletion(obj, actor):
+    """ Oculta el workspace o proyecto y encola su borrado. Devuelve el DeletionJob. """
+    now = timezone.now()
+    kind = DeletionJob.Kind.WORKSPACE if isinstance(obj, Workspace) else DeletionJob.Kind.PROJECT
+    with transaction.atomic():
+        obj.deleted_at = now
+        obj.save(update_fields=['deleted_at'])
+        if kind == DeletionJob.Kind.WORKSPACE:
+            Project.objects.filter(workspace=obj).update(deleted_at=now)
+        job = DeletionJob.objects.create(kind=kind, object_id=obj.pk, name=str(obj)[:200], requested_by=actor)
+        transaction.on_commit(lambda: schedule(job.pk))
+    return job
+
+
+def archive_in_progress(projects):
+    """
+    True si alguno de los proyectos se está archivando o restaurando: el hilo
+    del archivo sigue escribiendo su snapshot y purgando sus filas, así que no
+    se pueden borrar hasta que termine.
+    """
+    return ProjectArchive.objects.filter(project__in=projects).exclude(state=ProjectArchive.State.ARCHIVED).exists()
+
+
+def run(job_id):
+    """ Ejecuta (o retoma) un trabajo de borrado. """
+    job = DeletionJob.objects.filter(pk=job_id, finished_at__isnull=True).first()
+    if job is None:
+        return
+    if job.kind == DeletionJob.Kind.PROJECT:
+        projects = Project.all_objects.filter(pk=job.object_id)
+    else:
+        projects = Project.all_objects.filter(workspace_id=job.object_id)
+    if archive_in_progress(projects):
+        # Queda pendiente: 'manage.py process_deletions' lo retoma cuando el archivo termine
+        logger.warning('Borrado %s aplazado: hay un archivo de proyecto en curso', job.pk)
+        return
+    projects = list(projects)
+    if job.total_rows is None:
+        job.total_rows = sum(_count(project) for project in projects)
+        job.save(update_fields=['total_rows'])
+
+    def progress(count):
+        DeletionJob.objects.filter(pk=job.pk).update(deleted_rows=F('deleted_rows') + count)
+
+    for project in projects:
+        _delete_project(project, progress)
+    if job.kind == DeletionJob.Kind.WORKSPACE:
+        _delete_workspace(job.object_id, progress)
+    DeletionJob.objects.filter(pk=job.pk).update(finished_at=timezone.now())
+
+
+def schedule(job_id):
+    return _queue.submit(run, job_id)
+
+
+def _count(project):
+    querysets = [rows(project) for _, rows in archive.SECTIONS.values()]
+    querysets.append(DomainEvent.objects.filter(project=project))
+    return sum(queryset.count() for queryset in querysets)
+
+
+def _delete_project(project, progress):
+    _delete_attachments(project, progress)
+    record = ProjectArchive.objects.filter(project=project).first()
+    if record is not None:
+        _delete_archive(record)
+    archive.purge(project, on_batch=progress)
+    # También los eventos aún sin proyectar
+    archive.delete_in_batches(DomainEvent.objects.filter(project=project), on_batch=progress)
+    _delete_targeting(Project, project.pk, progress)
+    with transaction.atomic():
+        # Ya sin dependientes grandes: la cascada de Django solo recorre tablas vacías
+        Project.all_objects.filter(pk=project.pk).delete()
+
+
+def _delete_workspace(workspace_id, progress):
+    archive.delete_in_batches(SearchEntry.objects.filter(workspace_id=workspace_id), on_batch=progress)
+    _delete_targeting(Workspace, workspace_id, progress)
+    with transaction.atomic():
+        Workspace.all_objects.filter(pk=workspace_id).delete()
+
+
+def _delete_targeting(model, object_id, progress):
+    """ Actividad y notificaciones que apuntan al objeto (relación genérica, sin cascada). """
+    content_type = ContentType.objects.get_for_model(model)
+    for target_model in (Activity, Notification):
+        archive.delete_in_batches(
+            target_model.objects.filter(content_type=content_type, object_id=object_id), on_batch=progress,
+        )
+
+
+def _delete_attachments(project, progress):
+    attachments = Attachment.objects.filter(comment__task__project=project)
+    while rows := list(attachments.order_by().values_list('pk', 'blob_id', 'file')[:archive.CHUNK_SIZE]):
+        with transaction.atomic():
+            batch = Attachment.objects.filter(pk__in=[pk for pk, _, _ in rows])
+            batch._raw_delete(batch.db)
+            release_blobs(Counter(blob_id for _, blob_id, _ in rows if blob_id))
+            # Adjuntos anteriores al almacenamiento deduplicado: el archivo es solo suyo
+            _delete_files_on_commit([(default_storage, name) for _, blob_id, name in rows if not blob_id and name])
+        progress(len(rows))
+
+
+def _delete_archive(record):
+    """ Libera los adjuntos guardados en el snapshot y borra el archivo. """
+    blobs, files = Counter(), []
+    if record.snapshot:
+        for section, row in archive.read_snapshot(record):
+            if section == 'attachments':
+                if row['blob_id']:
+                    blobs[row['blob_id']] += 1
+                elif row['file']:
+                    files.append((default_storage, row['file']))
+        files.append((record.snapshot.storage, record.snapshot.name))
+    # Una sola transacción con el borrado del registro: si se repite, no se libera dos veces
+    with transaction.atomic():
+        release_blobs(blobs)
+        record.delete()
+        _delete_files_on_commit(files)
+
+
+def release_blobs(counts):
+    """
+    Resta referencias a varios StoredFile ({id: referencias}) y borra los que
+    se quedan sin ninguna; sus archivos se borran tras el commit.
+    """
+    if not counts:
+        return
+    for blob_id, count in counts.items():
+        StoredFile.objects.filter(pk=blob_id).update(ref_count=Greatest(F('ref_count') - count, 0))
+    orphans = StoredFile.objects.filter(pk__in=list(counts), ref_count=0)
+    files = [(blob.file.storage, blob.file.name) for blob in orphans.only('file')]
+    orphans.delete()
+    _delete_files_on_commit(files)
+
+
+def _delete_files_on_commit(files):
+    if files:
+        transaction.on_commit(lambda: [storage.delete(name) for storage, name in files])
@@ -0,0 +1,162 @@
+"""
+Entrega de archivos protegidos (adjuntos, previsualizaciones).
+
+Si hay un proxy delante (ATTACHMENT_SENDFILE_BACKEND = 'nginx' o 'apache'),
+Django solo comprueba permisos y delega el envío con X-Accel-Redirect o
+X-Sendfile; el proxy se encarga también de los rangos. Sin proxy se usa
+FileResponse, que el servidor WSGI puede enviar sin copias (sendfile), con
+soporte de peticiones Range y condicionales (ETag / Last-Modified).
+
+Las respuestas generadas por partes (exportación de workspaces, páginas de la
+API) usan streaming_response(), que mantiene el streaming también bajo ASGI.
+"""
+import mimetypes
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def streaming_response(request, chunks, **kwargs):
+    """
+    StreamingHttpResponse sobre el iterador síncrono 'chunks'. Bajo ASGI Django
+    consume los iteradores síncronos con sync_to_async(list), es decir, con la
+    respuesta entera en memoria: se le da uno asíncrono que pide las partes de
+    una en una.
+    """
+    if isinstance(request, ASGIRequest):
+        chunks = _aiterate(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
+
+
+async def _aiterate(chunks):
+    iterator = iter(chunks)
+    done = object()
+    # En el hilo síncrono de la petición: las consultas del generador usan siempre la misma conexión
+    pull = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await pull(iterator, done)) is not done:
+            yield chunk
+    finally:
+        # Si el cliente corta la descarga, el generador libera sus cursores y archivos
+        if hasattr(iterator, 'close'):
+            await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+def serve_protected_file(request, path, filename, etag=None, as_attachment=False, cache_control='private, max-age=0'):
+    """ Devuelve la respuesta para 'path' (ya autorizado por la vista). """
+    path = Path(path)
+    stat = path.stat()
+    etag = etag or f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+    last_modified = int(stat.st_mtime)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['Cache-Control'] = cache_control
+        return not_modified
+
+    backend = settings.ATTACHMENT_SENDFILE_BACKEND
+    if backend:
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            relative = path.relative_to(settings.MEDIA_ROOT).as_posix()
+            response['X-Accel-Redirect'] = quote(settings.ATTACHMENT_SENDFILE_PREFIX + relative)
+        else:
+            response['X-Sendfile'] = str(path)
+        _set_common_headers(response, filename, etag, last_modified, as_attachment, cache_control)
+        return response
+
+    byte_range = _requested_range(request, stat.st_size, etag, last_modified)
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    if byte_range is None:
+        # Archivo completo: FileResponse expone fileno() y el servidor puede usar sendfile
+        response = FileResponse(path.open('rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        handle = path.open('rb')
+        handle.seek(start)
+        response = FileResponse(_RangeReader(handle, length), status=206, content_type=content_type)
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    _set_common_headers(response, filename, etag, last_modified, as_attachment, cache_control)
+    return response
+
+
+def _set_common_headers(response, filename, etag, last_modified, as_attachment, cache_control):
+    disposition = 'attachment' if as_attachment else 'inline'
+    response['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = cache_control
+
+
+def _requested_range(request, size, etag, last_modified):
+    """
+    Devuelve (inicio, fin) para un único rango válido, None para enviar el
+    archivo completo o 'unsatisfiable'. Varios rangos se responden completos.
+    """
+    header = request.headers.get('Range')
+    if not header or request.method not in ('GET', 'HEAD'):
+        return None
+
+    # If-Range: el rango solo vale si el archivo no ha cambiado
+    if_range = request.headers.get('If-Range')
+    if if_range:
+        if if_range.startswith(('"', 'W/')):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != last_modified:
+            return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Rango sufijo: los últimos N bytes
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'unsatisfiable'
+    return start, end
+
+
+class _RangeReader:
+    """ Lector que devuelve como mucho 'length' bytes desde la posición actual. """
+
+    def __init__(self, handle, length):
+        self.handle = handle
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.handle.close()
@@ -0,0 +1,181 @@
+"""
+Bandeja de salida (outbox) de eventos de dominio y sus proyectores.
+
+Las vistas llaman a record() dentro de la misma transacción que el cambio:
+una sola inserción en la petición. Los proyectores consumen los eventos
+pendientes por lotes y crean la actividad y las notificaciones con
+bulk_create.
+
+Las notificaciones repetidas (mismo destinatario, actor, verbo y objeto) dentro
+de NOTIFICATION_COALESCE_MINUTES se agrupan en una fila con contador en lugar
+de insertar una nueva.
+
+Tras el commit se lanza la proyección en un hilo de fondo; con
+OUTBOX_PROJECT_ON_COMMIT = False solo la ejecuta 'manage.py process_outbox'
+(por ejemplo, en un worker dedicado).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .background import Queue
+from .models import Activity, DomainEvent, Notification
+
+BATCH_SIZE = 500
+
+_queue = Queue('outbox')
+
+
+def record(kind, actor, target, project=None, recipients=(), **payload):
+    """
+    Añade un evento a la bandeja de salida. 'recipients' son los usuarios (o
+    ids) a notificar; el actor nunca se notifica a sí mismo.
+    """
+    recipient_ids = {getattr(user, 'pk', user) for user in recipients if user is not None}
+    recipient_ids.discard(actor.pk)
+    event = DomainEvent.objects.create(
+        kind=kind, actor=actor, project=project, target=target,
+        payload={**payload, 'recipients': sorted(recipient_ids)},
+    )
+    if settings.OUTBOX_PROJECT_ON_COMMIT:
+        transaction.on_commit(schedule_projection)
+    return event
+
+
+# --- Proyectores: (evento) -> (verbo de la actividad, verbo de la notificación) ---
+def _task_created(event):
+    return f'creó la tarea "{event.payload["title"]}"', 'te asignó la tarea'
+
+
+def _task_status_changed(event):
+    # La notificación no lleva los estados: así los cambios de ida y vuelta de una
+    # tarjeta se agrupan en una sola fila (el estado actual se ve en la tarea)
+    verb = f'cambió el estado de "{event.payload["old_status"]}" a "{event.payload["new_status"]}" en la tarea'
+    return verb, 'cambió el estado de la tarea'
+
+
+def _tasks_synced(event):
+    return f'sincronizó {event.payload["count"]} tareas en', None
+
+
+def _comment_added(event):
+    return 'comentó en la tarea', 'comentó en la tarea'
+
+
+def _invitation_accepted(event):
+    return f'se unió al equipo "{event.payload["workspace"]}"', 'aceptó tu invitación para unirse al equipo'
+
+
+PROJECTORS = {
+    DomainEvent.Kind.TASK_CREATED: _task_created,
+    DomainEvent.Kind.TASK_STATUS_CHANGED: _task_status_changed,
+    DomainEvent.Kind.TASKS_SYNCED: _tasks_synced,
+    DomainEvent.Kind.COMMENT_ADDED: _comment_added,
+    DomainEvent.Kind.INVITATION_ACCEPTED: _invitation_accepted,
+}
+
+
+def project_batch(batch_size=BATCH_SIZE):
+    """ Proyecta un lote de eventos pendientes. Devuelve cuántos se procesaron. """
+    with transaction.atomic():
+        # skip_locked: varios consumidores a la vez no se pisan (en SQLite no aplica)
+        events = list(
+            DomainEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True).order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+        activities, notifications = [], []
+        for event in events:
+            activity_verb, notification_verb = PROJECTORS[event.kind](event)
+            target = {'content_type_id': event.content_type_id, 'object_id': event.object_id}
+            activities.append(Activity(
+                project_id=event.project_id, actor_id=event.actor_id, verb=activity_verb,
+                created_at=event.created_at, **target,
+            ))
+            if notification_verb:
+                notifications.extend(
+                    Notification(
+                        recipient_id=recipient_id, actor_id=event.actor_id, verb=notification_verb,
+                        created_at=event.created_at, **target,
+                    )
+                    for recipient_id in event.payload.get('recipients', ())
+                )
+        notifications, coalesced = coalesce(notifications)
+        Activity.objects.bulk_create(activities, batch_size=batch_size)
+        Notification.objects.bulk_create(notifications, batch_size=batch_size)
+        Notification.objects.bulk_update(coalesced, ['count', 'created_at'], batch_size=batch_size)
+        DomainEvent.objects.filter(pk__in=[event.pk for event in events]).update(processed_at=timezone.now())
+    return len(events)
+
+
+def _coalesce_key(notification):
+    return (notification.recipient_id, notification.actor_id, notification.verb,
+            notification.content_type_id, notification.object_id)
+
+
+def coalesce(notifications):
+    """
+    Agrupa las notificaciones nuevas entre sí y con las no leídas ya guardadas
+    cuando se repiten dentro de la ventana (contada desde la última
+    repetición). Devuelve (notificaciones a insertar, existentes a actualizar).
+    """
+    window = timedelta(minutes=settings.NOTIFICATION_COALESCE_MINUTES)
+    if not window or not notifications:
+        return notifications, []
+    notifications = sorted(notifications, key=lambda notification: notification.created_at)
+    # Una sola consulta (índice parcial de no leídas) para los candidatos del lote
+    latest = {
+        _coalesce_key(row): row
+        for row in Notification.objects.filter(
+            read=False,
+            recipient_id__in={notification.recipient_id for notification in notifications},
+            object_id__in={notification.object_id for notification in notifications},
+            created_at__gte=notifications[0].created_at - window,
+        ).order_by('created_at')
+    }
+    new, changed = [], {}
+    for notification in notifications:
+        key = _coalesce_key(notification)
+        row = latest.get(key)
+        if row is not None and notification.created_at - row.created_at <= window:
+            row.count += notification.count
+            row.created_at = max(row.created_at, notification.created_at)
+            if row.pk:
+                changed[row.pk] = row
+        else:
+            latest[key] = notification
+            new.append(notification)
+    return new, list(changed.values())
+
+
+def prune_processed(days=None, batch_size=BATCH_SIZE):
+    """
+    Borra los eventos proyectados hace más de 'days' días (por defecto
+    OUTBOX_RETENTION_DAYS), por lotes en transacciones cortas. Devuelve cuántos.
+    """
+    days = settings.OUTBOX_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    # Índice parcial event_processed_idx
+    stale = DomainEvent.objects.filter(processed_at__isnull=False, processed_at__lt=cutoff)
+    total = 0
+    while ids := list(stale.order_by('processed_at').values_list('pk', flat=True)[:batch_size]):
+        with transaction.atomic():
+            DomainEvent.objects.filter(pk__in=ids)._raw_delete(DomainEvent.objects.db)
+        total += len(ids)
+    return total
+
+
+def project_pending(batch_size=BATCH_SIZE):
+    """ Proyecta todos los eventos pendientes, lote a lote. """
+    total = 0
+    while processed := project_batch(batch_size):
+        total += processed
+    return total
+
+
+def schedule_projection():
+    """ Lanza la proyección en un hilo de fondo; las llamadas seguidas se agrupan en la misma cola. """
+    return _queue.submit(project_pending)
@@ -0,0 +1,156 @@
+"""
+Métricas de flujo a partir del historial de estados (TaskTransition).
+
+- Lead time: de la creación de la tarea a su último paso a DONE.
+- Cycle time: del primer paso a IN_PROGRESS al último paso a DONE.
+- Throughput: tareas terminadas por semana.
+
+Los tiempos de cada tarea se calculan en la base de datos con una agregación
+por tarea (Min/Max filtrados); los percentiles e histogramas se calculan en
+Python sobre esa lista, que está acotada al periodo del reporte.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import Task, TaskTransition
+
+PERIOD_DAYS = 90
+THROUGHPUT_WEEKS = 12
+PERCENTILES = (50, 85, 95)
+# Límites (en días) de las barras del histograma; la última barra es abierta
+HISTOGRAM_BOUNDS = (1, 2, 4, 7, 14, 30)
+
+
+def percentile(values, point):
+    """ Percentil con interpolación lineal entre los valores ordenados. """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * point / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summary(values):
+    return {
+        'count': len(values),
+        'percentiles': [(point, _round(percentile(values, point))) for point in PERCENTILES],
+    }
+
+
+def histogram(values):
+    """ Lista de (etiqueta, número de tareas) por tramos de HISTOGRAM_BOUNDS. """
+    labels = []
+    lower = 0
+    for bound in HISTOGRAM_BOUNDS:
+        labels.append(f'{lower}-{bound} d')
+        lower = bound
+    labels.append(f'>{lower} d')
+    counts = [0] * len(labels)
+    for value in values:
+        counts[next((i for i, bound in enumerate(HISTOGRAM_BOUNDS) if value < bound), len(HISTOGRAM_BOUNDS))] += 1
+    return list(zip(labels, counts))
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+def _days(delta):
+    return delta.total_seconds() / 86400
+
+
+def completed_tasks(transitions, since=None, limit=None):
+    """
+    Una fila por tarea terminada (estado actual DONE), de la más reciente a la
+    más antigua, con sus tiempos en días:
+    {'task_id', 'assignee_id', 'assignee_name', 'finished', 'lead', 'cycle'}.
+    'cycle' es None si la tarea nunca pasó por IN_PROGRESS.
+    """
+    rows = (
+        transitions.filter(task__status=Task.Status.DONE)
+        .values('task_id', 'task__created_at', 'task__assignee_id', 'task__assignee__first_name', 'task__assignee__last_name')
+        .annotate(
+            started=Min('created_at', filter=Q(to_status=Task.Status.IN_PROGRESS)),
+            finished=Max('created_at', filter=Q(to_status=Task.Status.DONE)),
+        )
+        .filter(finished__isnull=False)
+        .order_by('-finished')
+    )
+    if since is not None:
+        rows = rows.filter(finished__gte=since)
+    if limit is not None:
+        rows = rows[:limit]
+    return [
+        {
+            'task_id': row['task_id'],
+            'assignee_id': row['task__assignee_id'],
+            'assignee_name': f"{row['task__assignee__first_name'] or ''} {row['task__assignee__last_name'] or ''}".strip(),
+            'finished': row['finished'],
+            'lead': _days(row['finished'] - row['task__created_at']),
+            # Una tarea reabierta puede volver a IN_PROGRESS después de terminar
+            'cycle': _days(row['finished'] - row['started']) if row['started'] and row['started'] <= row['finished'] else None,
+        }
+        for row in rows
+    ]
+
+
+def project_metrics(project, now=None, days=PERIOD_DAYS):
+    """ Cycle time, lead time (global y por asignado) y throughput semanal del proyecto. """
+    now = now or timezone.now()
+    transitions = TaskTransition.objects.filter(project=project)
+    tasks = completed_tasks(transitions, since=now - timedelta(days=days))
+
+    cycle = [row['cycle'] for row in tasks if row['cycle'] is not None]
+    lead = [row['lead'] for row in tasks]
+
+    by_assignee = defaultdict(list)
+    names = {}
+    for row in tasks:
+        if row['assignee_id'] is not None and row['cycle'] is not None:
+            by_assignee[row['assignee_id']].append(row['cycle'])
+            names[row['assignee_id']] = row['assignee_name']
+    assignees = sorted(
+        ({'name': names[pk] or f'#{pk}', **summary(values)} for pk, values in by_assignee.items()),
+        key=lambda item: -item['count'],
+    )
+
+    return {
+        'period_days': days,
+        'cycle_time': summary(cycle),
+        'lead_time': summary(lead),
+        'cycle_histogram': histogram(cycle),
+        'lead_histogram': histogram(lead),
+        'assignees': assignees,
+        'throughput': weekly_throughput(transitions, now),
+    }
+
+
+def weekly_throughput(transitions, now, weeks=THROUGHPUT_WEEKS):
+    """ Tareas distintas que pasaron a DONE cada semana, incluidas las semanas sin ninguna. """
+    this_week = (now - timedelta(days=now.weekday())).date()
+    first_week = this_week - timedelta(weeks=weeks - 1)
+    counts = {
+        row['week'].date(): row['done']
+        for row in transitions.filter(to_status=Task.Status.DONE, created_at__date__gte=first_week)
+        .annotate(week=TruncWeek('created_at'))
+        .values('week')
+        .annotate(done=Count('task', distinct=True))
+        .order_by()
+    }
+    return [
+        (first_week + timedelta(weeks=offset), counts.get(first_week + timedelta(weeks=offset), 0))
+        for offset in range(weeks)
+    ]
+
+
+def cycle_time_days(workspace_id, limit=5000):
+    """ Cycle times (días completos, mínimo 1) de las últimas tareas terminadas del workspace. """
+    transitions = TaskTransition.objects.filter(project__workspace_id=workspace_id, project__deleted_at__isnull=True)
+    rows = completed_tasks(transitions, limit=limit)
+    return [max(1, math.ceil(row['cycle'])) for row in rows if row['cycle'] is not None]
@@ -0,0 +1,153 @@
+"""
+Previsión probabilística de la fecha de fin de un proyecto (Monte Carlo).
+
+Cada ensayo asigna a cada tarea abierta una duración tomada al azar de los
+cycle times históricos del workspace (core/flow.py) y recorre el grafo de
+dependencias en orden topológico: una tarea termina su duración después de
+la última de sus predecesoras (y no antes de su start_date). Los
+ensayos se calculan a la vez como columnas de arrays NumPy; el resultado son
+los percentiles P50/P85/P95 de la fecha de fin y la probabilidad de llegar a
+'deadline'.
+
+Los proyectos grandes reparten los ensayos en un pool de procesos (la
+simulación vive en core/montecarlo.py, sin dependencias de Django). El
+resultado se cachea con la versión de los proyectos del workspace (ver
+core/versions.py). NumPy es opcional: sin él forecast() devuelve None.
+"""
+import multiprocessing
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from . import flow, versions
+from .models import Project, Task
+from .scheduling import topological_order
+
+try:
+    import numpy as np
+    from .montecarlo import simulate
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+TRIALS = 5000
+TRIALS_PER_CHUNK = 500
+PERCENTILES = (50, 85, 95)
+# Con menos duraciones históricas se usan las planificadas del propio proyecto
+MIN_HISTORY = 10
+HISTORY_LIMIT = 5000
+# A partir de este número de tareas abiertas los ensayos van al pool de procesos
+POOL_MIN_TASKS = 500
+CACHE_TIMEOUT = 6 * 60 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def available():
+    return np is not None
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 'spawn': no heredamos hilos ni conexiones a la base de datos del worker web
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.FORECAST_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def _run_trials(history, predecessors, earliest, seed):
+    chunks = [
+        (history, predecessors, earliest, min(TRIALS_PER_CHUNK, TRIALS - offset), (seed, offset))
+        for offset in range(0, TRIALS, TRIALS_PER_CHUNK)
+    ]
+    if settings.FORECAST_WORKERS > 0 and len(predecessors) >= POOL_MIN_TASKS:
+        executor = _get_executor()
+        results = [future.result() for future in [executor.submit(simulate, *chunk) for chunk in chunks]]
+    else:
+        results = [simulate(*chunk) for chunk in chunks]
+    return np.concatenate(results)
+
+
+def _durations(tasks):
+    """ Duraciones planificadas (días, ambos extremos incluidos) de un queryset de tareas. """
+    rows = tasks.filter(
+        start_date__isnull=False, due_date__isnull=False, due_date__gte=F('start_date'),
+    ).order_by('-due_date').values_list('start_date', 'due_date')[:HISTORY_LIMIT]
+    return [(due_date - start_date).days + 1 for start_date, due_date in rows]
+
+
+def _model(project, today):
+    """ Tareas abiertas en orden topológico con sus predecesoras abiertas y su inicio más temprano. """
+    open_tasks = dict(
+        project.tasks.exclude(status__in=[Task.Status.DONE, Task.Status.CANCELED])
+        .values_list('pk', 'start_date')
+    )
+    predecessors_of = defaultdict(set)
+    edges = Task.predecessors.through.objects.filter(from_task_id__in=open_tasks, to_task_id__in=open_tasks)
+    for task_id, predecessor_id in edges.values_list('from_task_id', 'to_task_id'):
+        predecessors_of[task_id].add(predecessor_id)
+
+    order = topological_order(open_tasks, predecessors_of)
+    position = {task_id: index for index, task_id in enumerate(order)}
+    predecessors = [sorted(position[p] for p in predecessors_of[task_id]) for task_id in order]
+    earliest = [max((open_tasks[task_id] - today).days, 0) if open_tasks[task_id] else 0 for task_id in order]
+    return predecessors, earliest
+
+
+def forecast(project, today=None):
+    """
+    {'trials', 'percentiles': [(p, fecha)], 'deadline_probability'} o None si
+    no hay NumPy, no hay tareas abiertas o no hay duraciones de referencia.
+    """
+    if not available():
+        return None
+    today = today or timezone.localdate()
+    # Las duraciones históricas salen de todo el workspace: cualquier cambio en él invalida
+    project_ids = list(Project.objects.filter(workspace_id=project.workspace_id).values_list('pk', flat=True))
+    key = f'forecast:{project.pk}:{today.isoformat()}:{project.deadline}:{versions.projects_digest(project_ids)}'
+    result = cache.get(key)
+    if result is None:
+        result = _compute(project, today)
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result or None
+
+
+def _compute(project, today):
+    predecessors, earliest = _model(project, today)
+    if not predecessors:
+        return {}
+    # Cycle times reales (historial de estados); si aún hay pocos, duraciones planificadas
+    history = flow.cycle_time_days(project.workspace_id, limit=HISTORY_LIMIT)
+    if len(history) < MIN_HISTORY:
+        history = _durations(Task.objects.filter(
+            project__workspace_id=project.workspace_id, project__deleted_at__isnull=True, status=Task.Status.DONE,
+        ))
+    if len(history) < MIN_HISTORY:
+        history = _durations(project.tasks.all())
+    if not history:
+        return {}
+
+    # Una tarea que empieza el día s y dura d días termina el día s + d - 1 (hoy es el día 0)
+    last_days = _run_trials(history, predecessors, earliest, seed=project.pk) - 1
+    result = {
+        'trials': len(last_days),
+        'percentiles': [
+            (p, today + timedelta(days=int(np.ceil(day))))
+            for p, day in zip(PERCENTILES, np.percentile(last_days, PERCENTILES))
+        ],
+        'deadline_probability': None,
+    }
+    if project.deadline:
+        limit = (project.deadline - today).days
+        result['deadline_probability'] = round(float((last_days <= limit).mean()) * 100, 1)
+    return result
@@ -1,5 +1,7 @@
 from django import forms
+from django.urls import reverse
 from .models import Workspace, Project, Task, Attachment, Invitation, Role
+from .widgets import AutocompleteSelect, AutocompleteSelectMultiple
 
 
 class WorkspaceForm(forms.ModelForm):
@@ -17,14 +19,15 @@ class WorkspaceForm(forms.ModelForm):
 class ProjectForm(forms.ModelForm):
     class Meta:
         model = Project
-        fields = ['name', 'description', 'deadline']
+        fields = ['name', 'description', 'deadline', 'auto_schedule']
         widgets = {
             'deadline': forms.DateInput(attrs={'type': 'date'}),
         }
         labels = {
             'name': 'Nombre del Proyecto',
             'description': 'Descripción',
-            'deadline': 'Fecha Límite'
+            'deadline': 'Fecha Límite',
+            'auto_schedule': 'Reprogramar automáticamente las tareas sucesoras',
         }
 
 
@@ -42,19 +45,29 @@ class TaskForm(forms.ModelForm):
             self.fields['predecessors'].queryset = project.tasks.all()
 
             # Opcional: Excluimos la tarea actual de la lista de posibles predecesoras
+            task_url = reverse('core:task_autocomplete', kwargs={'project_slug': project.slug})
             if self.instance and self.instance.pk:
                 self.fields['predecessors'].queryset = self.fields['predecessors'].queryset.exclude(pk=self.instance.pk)
+                task_url += f'?exclude={self.instance.pk}'
+
+            # Los querysets solo se usan para validar los ids enviados: las opciones
+            # se buscan con autocompletado en lugar de renderizarlas todas
+            self.fields['predecessors'].widget.url = task_url
+            self.fields['assignee'].widget.url = reverse(
+                'core:member_autocomplete', kwargs={'workspace_slug': project.workspace.slug}
+            )
 
     class Meta:
         model = Task
         # Añadimos los nuevos campos a la lista
-        fields = ['title', 'description', 'status', 'priority', 'assignee', 'start_date', 'due_date', 'predecessors']
+        fields = ['title', 'description', 'status', 'priority', 'assignee', 'start_date', 'due_date', 'estimated_hours', 'predecessors']
         widgets = {
             'start_date': forms.DateInput(attrs={'type': 'date'}),
             'due_date': forms.DateInput(attrs={'type': 'date'}),
             'description': forms.Textarea(attrs={'rows': 3}),
-            # Hacemos que el campo de predecesoras sea un multiselector más amigable
-            'predecessors': forms.SelectMultiple(attrs={'class': 'form-select'}),
+            # Selectores con autocompletado: solo se renderizan las opciones elegidas
+            'assignee': AutocompleteSelect(attrs={'class': 'form-select'}),
+            'predecessors': AutocompleteSelectMultiple(attrs={'class': 'form-select'}),
         }
         labels = {
             'title': 'Título de la Tarea',
@@ -64,6 +77,7 @@ class TaskForm(forms.ModelForm):
             'assignee': 'Asignar a',
             'start_date': 'Fecha de Inicio',
             'due_date': 'Fecha Límite',
+            'estimated_hours': 'Horas Estimadas',
             'predecessors': 'Depende de (Tareas Predecesoras)', # Nueva etiqueta
         }
         
@@ -82,6 +96,8 @@ class CommentForm(forms.Form):
         label=''
     )
     file = forms.FileField(required=False, label='Adjuntar archivo')
+    # Id de una subida por partes ya completada (archivos grandes)
+    upload_id = forms.UUIDField(required=False, widget=forms.HiddenInput)
     
     
 class InvitationForm(forms.Form):
@@ -0,0 +1,129 @@
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from core.models import Project
+
+
+class Command(BaseCommand):
+    """
+    Compara el rendimiento del endpoint de datos del Gantt servido por ASGI
+    (uvicorn) frente a WSGI (gunicorn) con cargas concurrentes.
+
+    Ejemplo:
+        python manage.py bench_gantt --project mi-proyecto --user pmo@empresa.com
+    """
+    help = 'Benchmark de ASGI (uvicorn) vs WSGI (gunicorn) para cargas concurrentes del Gantt.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', required=True, help='Slug del proyecto a cargar.')
+        parser.add_argument('--user', required=True, help='Email de un miembro del workspace.')
+        parser.add_argument('--requests', type=int, default=500, help='Numero total de peticiones por servidor.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Peticiones simultaneas.')
+        parser.add_argument('--workers', type=int, default=2, help='Procesos por servidor.')
+        parser.add_argument('--threads', type=int, default=4, help='Hilos por worker WSGI.')
+        parser.add_argument('--asgi-port', type=int, default=8101)
+        parser.add_argument('--wsgi-port', type=int, default=8102)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['user']}.")
+        if not Project.objects.filter(slug=options['project'], workspace__members=user).exists():
+            raise CommandError('El proyecto no existe o el usuario no es miembro de su workspace.')
+
+        # Creamos una sesion real para que ambos servidores autentiquen la peticion
+        client = Client()
+        client.force_login(user)
+        session_cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+        path = reverse('core:project_gantt_data', kwargs={'project_slug': options['project']})
+
+        servers = {
+            'ASGI (uvicorn)': [
+                'uvicorn', 'config.asgi:application',
+                '--port', str(options['asgi_port']),
+                '--workers', str(options['workers']),
+                '--log-level', 'warning',
+            ],
+            'WSGI (gunicorn)': [
+                'gunicorn', 'config.wsgi:application',
+                '--bind', f"127.0.0.1:{options['wsgi_port']}",
+                '--workers', str(options['workers']),
+                '--threads', str(options['threads']),
+                '--log-level', 'warning',
+            ],
+        }
+        ports = {'ASGI (uvicorn)': options['asgi_port'], 'WSGI (gunicorn)': options['wsgi_port']}
+
+        for name, command in servers.items():
+            if not shutil.which(command[0]):
+                self.stdout.write(self.style.WARNING(f'{name}: "{command[0]}" no esta instalado, se omite.'))
+                continue
+
+            process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=os.environ.copy())
+            try:
+                self._wait_for_port(ports[name])
+                url = f'http://127.0.0.1:{ports[name]}{path}'
+                result = self._run_load(url, session_cookie, options['requests'], options['concurrency'])
+            finally:
+                process.terminate()
+                process.wait(timeout=10)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {result['throughput']:.1f} req/s | "
+                f"p50 {result['p50']:.1f} ms | p95 {result['p95']:.1f} ms | "
+                f"errores {result['errors']}"
+            ))
+
+    def _wait_for_port(self, port, timeout=15):
+        """ Espera a que el servidor acepte conexiones. """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with socket.socket() as sock:
+                if sock.connect_ex(('127.0.0.1', port)) == 0:
+                    return
+            time.sleep(0.1)
+        raise CommandError(f'El servidor no respondio en el puerto {port}.')
+
+    def _run_load(self, url, session_cookie, total, concurrency):
+        """ Lanza 'total' peticiones con 'concurrency' hilos y mide latencias. """
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session_cookie}'
+
+        def fetch(_):
+            request = urllib.request.Request(url, headers={'Cookie': cookie})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    ok = response.status == 200
+            except Exception:
+                ok = False
+            return (time.perf_counter() - start) * 1000, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, ok in results if ok)
+        if not latencies:
+            raise CommandError(f'Todas las peticiones a {url} fallaron.')
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            'errors': total - len(latencies),
+        }
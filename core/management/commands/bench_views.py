@@ -0,0 +1,213 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import urls as core_urls
+from core.models import Workspace, Membership, Task, Invitation, Role, ChunkedUpload, DeletionJob
+from .seed_perf import SEED_EMAIL_DOMAIN, SEED_SLUG_PREFIX
+
+
+def _url_kwargs(ctx):
+    """ Valores para los parámetros de ruta, tomados del dataset de rendimiento. """
+    return {
+        'workspace_slug': ctx['workspace'].slug,
+        'project_slug': ctx['project'].slug,
+        'pk': ctx['task'].pk,
+        'task_pk': ctx['task'].pk,
+        'membership_id': ctx['membership'].pk,
+        'name': 'no-existe.sql.json',
+    }
+
+
+# Método y datos de cada vista. Las peticiones que escriben se ejecutan dentro
+# de una transacción que se revierte, así el dataset no cambia entre rondas.
+# 'post_json' envía los datos como cuerpo JSON en lugar de formulario.
+BENCHMARKS = {
+    'workspace_list': ('get', None),
+    'workspace_create': ('get', None),
+    'notification_list': ('get', None),
+    'global_search': ('get', lambda ctx: {'q': ctx['task'].title}),
+    'accept_invitation': ('get', None),
+    'update_member_role': ('post', lambda ctx: {'role': ctx['role'].pk}),
+    'update_task_status': ('post', lambda ctx: {'task_id': ctx['task'].pk, 'new_status': Task.Status.PAUSED}),
+    'project_gantt_data': ('get', None),
+    'notification_count': ('get', None),
+    'task_time_summary': ('get', None),
+    'task_comments': ('get', None),
+    'task_autocomplete': ('get', None),
+    'member_autocomplete': ('get', None),
+    'perf_stats': ('get', None),
+    'api_project_list': ('get', None),
+    'api_task_list': ('get', lambda ctx: {'limit': 500}),
+    'api_task_upsert': ('post_json', lambda ctx: {
+        'tasks': [{'external_id': f'bench-{i}', 'title': f'Tarea sincronizada {i}'} for i in range(500)],
+    }),
+    'profile_list': ('get', None),
+    'profile_download': ('get', None),
+    'chunked_upload_start': ('post', lambda ctx: {'filename': 'grande.bin', 'size': 10 * 1024 * 1024}),
+    'chunked_upload_chunk': ('get', None),
+    'attachment_download': ('get', None),
+    'attachment_preview': ('get', None),
+    'workspace_manage': ('get', None),
+    'team_directory': ('get', None),
+    'send_invitation': ('post', lambda ctx: {'email': 'nuevo@example.com'}),
+    'create_role': ('post', lambda ctx: {'name': 'Rol de benchmark'}),
+    'project_create_form': ('get', None),
+    'project_create_action': ('post', lambda ctx: {'name': 'Proyecto de benchmark'}),
+    'workspace_detail': ('get', None),
+    'project_detail': ('get', None),
+    'project_gantt': ('get', None),
+    'project_reports': ('get', None),
+    'project_archive': ('post', None),
+    'project_restore': ('post', None),
+    'project_delete': ('post', None),
+    'workspace_delete': ('post', None),
+    'workspace_export': ('get', None),
+    'deletion_status': ('get', None),
+    'task_create': ('get', None),
+    'task_detail_update': ('get', None),
+    'add_comment': ('post', lambda ctx: {'text': 'Comentario de benchmark'}),
+    'toggle_time_log': ('post', None),
+}
+
+
+class Command(BaseCommand):
+    """
+    Mide cada URL de core/urls.py contra el dataset de 'seed_perf' y compara la
+    latencia y el número de consultas con una línea base en JSON.
+
+    Ejemplos:
+        python manage.py bench_views --update           # graba la línea base
+        python manage.py bench_views --threshold 0.25   # falla si algo empeora > 25 %
+    """
+    help = 'Benchmark de las vistas de core contra el dataset de seed_perf, con línea base JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'perf_baseline.json'))
+        parser.add_argument('--update', action='store_true', help='Sobrescribe la línea base con esta ejecución.')
+        parser.add_argument('--repeat', type=int, default=5, help='Rondas por vista (se usa la mediana).')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Empeoramiento relativo permitido en latencia.')
+        parser.add_argument('--min-delta-ms', type=float, default=5.0, help='Diferencias menores se ignoran (ruido).')
+
+    def handle(self, *args, **options):
+        ctx = self._context()
+        # Los errores se registran como código 500 en lugar de abortar el benchmark
+        client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+        client.force_login(ctx['user'])
+
+        results = {}
+        for pattern in core_urls.urlpatterns:
+            name = pattern.name
+            if name not in BENCHMARKS:
+                self.stdout.write(self.style.WARNING(f'{name}: sin benchmark definido, se omite.'))
+                continue
+            results[name] = self._measure(client, name, ctx, options['repeat'])
+            self.stdout.write(
+                f"{name:28} {results[name]['status']:>4} {results[name]['median_ms']:>9.1f} ms "
+                f"{results[name]['queries']:>5} consultas"
+            )
+
+        baseline_path = Path(options['baseline'])
+        if options['update'] or not baseline_path.exists():
+            baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f'Línea base guardada en {baseline_path}.'))
+            return
+
+        regressions = self._compare(json.loads(baseline_path.read_text()), results, options)
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(line))
+            raise CommandError(f'{len(regressions)} vista(s) empeoraron respecto a la línea base.')
+        self.stdout.write(self.style.SUCCESS('Sin regresiones respecto a la línea base.'))
+
+    def _context(self):
+        workspace = (
+            Workspace.objects.filter(slug__startswith=f'{SEED_SLUG_PREFIX}-ws-')
+            .select_related('owner').order_by('id').first()
+        )
+        if workspace is None:
+            raise CommandError('No hay dataset de rendimiento. Ejecuta antes "manage.py seed_perf".')
+        project = workspace.projects.order_by('id').first()
+        user = workspace.owner
+        if not user.email.endswith(SEED_EMAIL_DOMAIN):
+            raise CommandError('El workspace de rendimiento no pertenece a un usuario del dataset.')
+        return {
+            'user': user,
+            'workspace': workspace,
+            'project': project,
+            'task': project.tasks.order_by('id').first(),
+            'membership': Membership.objects.filter(workspace=workspace).exclude(user=user).first(),
+            'role': Role.objects.order_by('id').first(),
+        }
+
+    def _measure(self, client, name, ctx, repeat):
+        method, data_factory = BENCHMARKS[name]
+        timings, queries, status = [], 0, None
+        for _ in range(repeat):
+            with transaction.atomic():
+                url = self._reverse(name, ctx)
+                data = data_factory(ctx) if data_factory else {}
+                uploads = set(ChunkedUpload.objects.values_list('id', flat=True))
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    if method == 'post_json':
+                        response = client.post(url, data, content_type='application/json')
+                    else:
+                        response = getattr(client, method)(url, data)
+                    if response.streaming:
+                        # El cuerpo se genera al recorrerlo: sin consumirlo solo se mediría la cabecera
+                        for _chunk in response.streaming_content:
+                            pass
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries = len(captured)
+                status = response.status_code
+                # El rollback deshace las filas, pero no los ficheros temporales de las subidas creadas
+                for upload in ChunkedUpload.objects.exclude(id__in=uploads):
+                    upload.temp_path.unlink(missing_ok=True)
+                transaction.set_rollback(True)
+        return {
+            'status': status,
+            'median_ms': round(statistics.median(timings), 2),
+            'queries': queries,
+        }
+
+    def _reverse(self, name, ctx):
+        if name == 'accept_invitation':
+            # La invitación se crea dentro de la transacción que se revierte
+            invitation = Invitation.objects.create(
+                workspace=ctx['workspace'], sender=ctx['user'], email='invitado@example.com'
+            )
+            return reverse('core:accept_invitation', kwargs={'token': invitation.token})
+        if name == 'chunked_upload_chunk':
+            upload = ChunkedUpload.objects.create(user=ctx['user'], filename='grande.bin', size=1024)
+            return reverse('core:chunked_upload_chunk', kwargs={'upload_id': upload.id})
+        if name == 'deletion_status':
+            job = DeletionJob.objects.create(
+                kind=DeletionJob.Kind.PROJECT, object_id=ctx['project'].pk, name=ctx['project'].name, requested_by=ctx['user'],
+            )
+            return reverse('core:deletion_status', kwargs={'job_id': job.pk})
+
+        pattern = next(p for p in core_urls.urlpatterns if p.name == name)
+        kwargs = {k: v for k, v in _url_kwargs(ctx).items() if k in pattern.pattern.converters}
+        return reverse(f'core:{name}', kwargs=kwargs)
+
+    def _compare(self, baseline, results, options):
+        regressions = []
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            if current['queries'] > previous['queries']:
+                regressions.append(f"{name}: {previous['queries']} -> {current['queries']} consultas")
+            allowed = previous['median_ms'] * (1 + options['threshold'])
+            if current['median_ms'] > allowed and current['median_ms'] - previous['median_ms'] > options['min_delta_ms']:
+                regressions.append(f"{name}: {previous['median_ms']} -> {current['median_ms']} ms")
+        return regressions
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import transfer
+from core.models import Workspace
+
+
+class Command(BaseCommand):
+    """
+    Exporta un workspace completo (con los adjuntos) a un zip de NDJSON, en
+    streaming y con memoria acotada. Se importa con 'import_workspace'.
+    """
+    help = 'Exporta un workspace a un zip de NDJSON (ver core/transfer.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('workspace', help='Slug del workspace.')
+        parser.add_argument('--output', help='Ruta del zip (por defecto, <slug>.zip).')
+
+    def handle(self, *args, **options):
+        workspace = Workspace.objects.filter(slug=options['workspace']).first()
+        if workspace is None:
+            raise CommandError(f"No existe el workspace '{options['workspace']}'.")
+        output = options['output'] or f'{workspace.slug}.zip'
+        try:
+            with open(output, 'wb') as fileobj:
+                counts = transfer.export_workspace(workspace, fileobj)
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f'{sum(counts.values())} fila(s) exportada(s) a {output}.'))
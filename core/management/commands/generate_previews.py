@@ -0,0 +1,39 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import previews
+from core.models import StoredFile
+
+
+class Command(BaseCommand):
+    """
+    Genera las previews que faltan (adjuntos anteriores al pipeline, workers
+    desactivados o dependencias instaladas después).
+    """
+    help = 'Genera en un pool de procesos las previews de adjuntos que aún no existen.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=max(1, settings.ATTACHMENT_PREVIEW_WORKERS))
+
+    def handle(self, *args, **options):
+        preview_dir = str(Path(settings.MEDIA_ROOT) / previews.PREVIEW_SUBDIR)
+        pending = (
+            blob for blob in StoredFile.objects.only('sha256', 'file').iterator(chunk_size=500)
+            if previews.needs_preview(blob.sha256)
+        )
+        generated = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(previews.render_preview, blob.file.path, blob.sha256, settings.ATTACHMENT_PREVIEW_SIZE, preview_dir): blob
+                for blob in pending
+            }
+            for future in as_completed(futures):
+                try:
+                    generated += future.result()
+                except OSError as error:
+                    failed += 1
+                    self.stderr.write(f'{futures[future].sha256}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'{generated} preview(s) generada(s), {failed} error(es).'))
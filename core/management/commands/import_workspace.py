@@ -0,0 +1,25 @@
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import transfer
+
+
+class Command(BaseCommand):
+    """
+    Importa un zip de 'export_workspace' como un workspace nuevo: inserciones
+    por lotes con bulk_create y traducción de ids. Los usuarios se reconocen
+    por email; los que no existen se crean inactivos.
+    """
+    help = 'Importa un workspace exportado con export_workspace (ver core/transfer.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Ruta del zip.')
+        parser.add_argument('--name', help='Nombre del nuevo workspace (por defecto, el original).')
+
+    def handle(self, *args, **options):
+        try:
+            workspace = transfer.import_workspace(options['path'], name=options['name'])
+        except (OSError, ValueError, zipfile.BadZipFile) as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"Workspace '{workspace.name}' importado ({workspace.slug})."))
@@ -0,0 +1,67 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import perf
+
+# Columnas numéricas del resumen de perf.summarize(); 'total' es su orden por defecto (media × peticiones)
+SORT_COLUMNS = (
+    'total', 'requests', 'avg_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'avg_render_ms', 'avg_db_ms',
+    'avg_queries', 'max_queries', 'avg_bytes', 'slowest_sql_ms',
+)
+
+
+class Command(BaseCommand):
+    """
+    Muestra las métricas por vista que los workers vuelcan en PERF_STATS_DIR.
+
+    Ejemplo:
+        python manage.py perf_report --sort p95_ms --limit 10
+    """
+    help = 'Informe de latencia y consultas por vista a partir de las métricas en PERF_STATS_DIR.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', default='total', help=f"Columna de orden: {', '.join(SORT_COLUMNS)}.")
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help='Imprime el informe completo en JSON.')
+
+    def handle(self, *args, **options):
+        if not settings.PERF_STATS_DIR:
+            raise CommandError('PERF_STATS_DIR no está configurado.')
+        if options['sort'] not in SORT_COLUMNS:
+            raise CommandError(f"Columna de orden desconocida: {options['sort']}. Opciones: {', '.join(SORT_COLUMNS)}.")
+
+        # Este proceso no atiende peticiones: solo leemos lo volcado por los workers
+        summary = perf.summarize(perf.load_snapshots(settings.PERF_STATS_DIR, include_live=False))
+        if options['sort'] != 'total':
+            # Un percentil None está por encima del último bucket del histograma (> 5 s)
+            summary.sort(key=lambda s: float('inf') if s[options['sort']] is None else s[options['sort']], reverse=True)
+        summary = summary[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        if not summary:
+            self.stdout.write(self.style.WARNING('No hay métricas en la ventana actual.'))
+            return
+
+        header = f"{'Vista':40} {'Req':>6} {'Media':>8} {'p50':>6} {'p95':>6} {'p99':>6} {'Render':>8} {'BD ms':>8} {'Cons.':>6} {'Max':>5} {'Bytes':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in summary:
+            self.stdout.write(
+                f"{row['view'][:40]:40} {row['requests']:>6} {row['avg_ms']:>8.1f} "
+                f"{_fmt(row['p50_ms']):>6} {_fmt(row['p95_ms']):>6} {_fmt(row['p99_ms']):>6} "
+                f"{row['avg_render_ms']:>8.1f} {row['avg_db_ms']:>8.1f} {row['avg_queries']:>6.1f} "
+                f"{row['max_queries']:>5} {row['avg_bytes']:>9}"
+            )
+        self.stdout.write('')
+        self.stdout.write('Consulta más lenta por vista:')
+        for row in summary:
+            if row['slowest_sql']:
+                self.stdout.write(f"  {row['view']} ({row['slowest_sql_ms']} ms): {row['slowest_sql'][:200]}")
+
+
+def _fmt(value):
+    return f'{value}' if value is not None else '>5s'
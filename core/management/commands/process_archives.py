@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core import archive
+from core.models import ProjectArchive
+
+
+class Command(BaseCommand):
+    """ Retoma los archivos de proyectos que quedaron a medias (snapshot, purga o restauración). """
+    help = 'Procesa en primer plano los archivos de proyectos pendientes de archivar o restaurar.'
+
+    def handle(self, *args, **options):
+        pending = ProjectArchive.objects.exclude(state=ProjectArchive.State.ARCHIVED).values_list('pk', flat=True)
+        count = 0
+        for archive_id in list(pending):
+            archive.process(archive_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'{count} archivo(s) procesado(s).'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core import deletion
+from core.models import DeletionJob
+
+
+class Command(BaseCommand):
+    """ Retoma los borrados de workspaces y proyectos que quedaron a medias. """
+    help = 'Procesa en primer plano los borrados de workspaces y proyectos pendientes.'
+
+    def handle(self, *args, **options):
+        pending = DeletionJob.objects.filter(finished_at__isnull=True).order_by('id').values_list('pk', flat=True)
+        count = 0
+        for job_id in list(pending):
+            deletion.run(job_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'{count} borrado(s) procesado(s).'))
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import events
+
+# Con --loop, la retención se aplica como mucho una vez por este intervalo (segundos)
+PRUNE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    """
+    Proyecta los eventos pendientes de la bandeja de salida en actividad y
+    notificaciones, y borra por lotes los ya proyectados hace más de
+    --prune-days días.
+    """
+    help = 'Materializa los eventos de dominio pendientes por lotes. Con --loop sigue esperando eventos nuevos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=events.BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=float, default=1.0, help='Segundos de espera sin eventos (con --loop).')
+        parser.add_argument('--prune-days', type=int, default=settings.OUTBOX_RETENTION_DAYS,
+                            help='Días que se conservan los eventos proyectados (negativo: no se borran).')
+
+    def handle(self, *args, **options):
+        last_prune = None
+        while True:
+            count = events.project_pending(options['batch_size'])
+            if count or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'{count} evento(s) proyectado(s).'))
+            # Con --loop, solo sin eventos pendientes y como mucho una vez por PRUNE_INTERVAL
+            idle = not count and (last_prune is None or time.monotonic() - last_prune >= PRUNE_INTERVAL)
+            if options['prune_days'] >= 0 and (idle or not options['loop']):
+                pruned = events.prune_processed(options['prune_days'], options['batch_size'])
+                last_prune = time.monotonic()
+                if pruned or not options['loop']:
+                    self.stdout.write(self.style.SUCCESS(f'{pruned} evento(s) antiguo(s) borrado(s).'))
+            if not options['loop']:
+                break
+            if not count:
+                time.sleep(options['interval'])
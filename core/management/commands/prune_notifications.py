@@ -0,0 +1,56 @@
+import gzip
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Notification
+
+ARCHIVE_FIELDS = ('id', 'recipient_id', 'actor_id', 'verb', 'count', 'created_at', 'content_type_id', 'object_id')
+
+
+class Command(BaseCommand):
+    """
+    Retención de notificaciones: borra las leídas más antiguas que --days por
+    lotes de --batch-size, cada lote en su propia transacción corta para no
+    bloquear la tabla. Con --archive se guardan antes en un JSON Lines
+    comprimido (se añaden al final si el archivo ya existe).
+    """
+    help = 'Borra (o archiva y borra) por lotes las notificaciones leídas más antiguas que --days.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--archive', help='Ruta de un .jsonl.gz donde guardar las notificaciones borradas.')
+        parser.add_argument('--sleep', type=float, default=0, help='Pausa en segundos entre lotes.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # Índice parcial notif_read_created_idx
+        stale = Notification.objects.filter(read=True, created_at__lt=cutoff)
+        archive = gzip.open(options['archive'], 'at', encoding='utf-8') if options['archive'] else None
+        count = 0
+        try:
+            while True:
+                with transaction.atomic():
+                    if archive:
+                        rows = list(stale.order_by('created_at', 'pk').values(*ARCHIVE_FIELDS)[:options['batch_size']])
+                        ids = [row['id'] for row in rows]
+                        archive.writelines(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows)
+                    else:
+                        ids = list(stale.order_by('created_at', 'pk').values_list('pk', flat=True)[:options['batch_size']])
+                    if not ids:
+                        break
+                    Notification.objects.filter(pk__in=ids).delete()
+                count += len(ids)
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+        finally:
+            if archive:
+                archive.close()
+        self.stdout.write(self.style.SUCCESS(f'{count} notificación(es) eliminada(s).'))
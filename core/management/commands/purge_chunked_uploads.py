@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ChunkedUpload
+
+
+class Command(BaseCommand):
+    """ Elimina las subidas por partes abandonadas y sus archivos temporales. """
+    help = 'Borra las subidas por partes sin completar más antiguas que --hours.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = ChunkedUpload.objects.filter(created_at__lt=cutoff)
+        count = 0
+        for upload in stale.iterator():
+            upload.temp_path.unlink(missing_ok=True)
+            upload.delete()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'{count} subida(s) abandonada(s) eliminada(s).'))
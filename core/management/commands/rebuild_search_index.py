@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core import search
+
+
+class Command(BaseCommand):
+    """
+    Reconstruye el índice de la búsqueda global. Necesario tras cargas con
+    bulk_create o update(), que no disparan las señales que lo mantienen.
+    """
+    help = 'Reconstruye por lotes el índice invertido de la búsqueda global.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workspace', type=int, action='append', dest='workspaces',
+                            help='Solo este workspace (se puede repetir).')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        documents = search.rebuild(options['workspaces'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{documents} documento(s) indexado(s).'))
@@ -0,0 +1,192 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core import search
+from core.models import Workspace, Membership, Project, Task, Comment, Notification, TimeLog, Role
+
+# Todos los datos generados usan este dominio/prefijo para poder borrarlos
+SEED_EMAIL_DOMAIN = 'perf.nexus-pm.test'
+SEED_SLUG_PREFIX = 'perf'
+SEED_PASSWORD = 'perf-password'
+
+
+class Command(BaseCommand):
+    """
+    Genera un conjunto de datos de carga determinista (a partir de --seed) para
+    medir el rendimiento de las vistas. Usa bulk_create en todos los modelos.
+
+    Ejemplo:
+        python manage.py seed_perf --workspaces 5 --projects 4 --tasks 500 --seed 42
+    """
+    help = 'Crea un dataset de rendimiento determinista con inserciones masivas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workspaces', type=int, default=3)
+        parser.add_argument('--members', type=int, default=20, help='Miembros por workspace.')
+        parser.add_argument('--projects', type=int, default=5, help='Proyectos por workspace.')
+        parser.add_argument('--tasks', type=int, default=200, help='Tareas por proyecto.')
+        parser.add_argument('--max-predecessors', type=int, default=3, help='Predecesoras máximas por tarea.')
+        parser.add_argument('--comments', type=int, default=3, help='Comentarios medios por tarea.')
+        parser.add_argument('--timelogs', type=int, default=2, help='Registros de tiempo medios por tarea.')
+        parser.add_argument('--notifications', type=int, default=50, help='Notificaciones por miembro.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--clear', action='store_true', help='Borra antes los datos de una ejecución anterior.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch = options['batch_size']
+        User = get_user_model()
+
+        if options['clear']:
+            self.clear()
+
+        with transaction.atomic():
+            owner_role, _ = Role.objects.get_or_create(name='Dueño')
+            member_role, _ = Role.objects.get_or_create(name='Miembro')
+
+            # --- Usuarios (uno de ellos staff, para el informe de rendimiento) ---
+            # El hash se calcula una sola vez: make_password es deliberadamente lento
+            password = make_password(SEED_PASSWORD)
+            total_users = options['workspaces'] * options['members']
+            users = User.objects.bulk_create([
+                User(
+                    username=f'{SEED_SLUG_PREFIX}-user-{i}',
+                    email=f'user{i}@{SEED_EMAIL_DOMAIN}',
+                    first_name=f'Usuario{i}',
+                    last_name='Perf',
+                    password=password,
+                    is_staff=(i == 0),
+                )
+                for i in range(total_users)
+            ], batch_size=batch)
+
+            # --- Workspaces y membresías ---
+            # bulk_create no llama a save(): asignamos los slugs a mano
+            workspaces = Workspace.objects.bulk_create([
+                Workspace(
+                    name=f'Workspace Perf {w}',
+                    owner=users[w * options['members']],
+                    slug=f'{SEED_SLUG_PREFIX}-ws-{options["seed"]}-{w}',
+                )
+                for w in range(options['workspaces'])
+            ], batch_size=batch)
+
+            memberships = []
+            members_by_workspace = {}
+            for w, workspace in enumerate(workspaces):
+                members = users[w * options['members']:(w + 1) * options['members']]
+                members_by_workspace[workspace.id] = members
+                for member in members:
+                    role = owner_role if member.id == workspace.owner_id else member_role
+                    memberships.append(Membership(user=member, workspace=workspace, role=role))
+            Membership.objects.bulk_create(memberships, batch_size=batch)
+
+            # --- Proyectos ---
+            today = date.today()
+            projects = Project.objects.bulk_create([
+                Project(
+                    workspace=workspace,
+                    name=f'Proyecto {w}-{p}',
+                    description='Proyecto generado para pruebas de rendimiento.',
+                    deadline=today + timedelta(days=rng.randint(-30, 180)),
+                    slug=f'{workspace.slug}-p{p}',
+                )
+                for w, workspace in enumerate(workspaces)
+                for p in range(options['projects'])
+            ], batch_size=batch)
+
+            # --- Tareas ---
+            statuses = [choice for choice, _ in Task.Status.choices]
+            priorities = [choice for choice, _ in Task.Priority.choices]
+            tasks = []
+            for project in projects:
+                members = members_by_workspace[project.workspace_id]
+                for t in range(options['tasks']):
+                    start = today + timedelta(days=rng.randint(-90, 90))
+                    tasks.append(Task(
+                        project=project,
+                        title=f'Tarea {t} de {project.name}',
+                        description=f'Descripción de la tarea {t}.',
+                        status=rng.choice(statuses),
+                        priority=rng.choice(priorities),
+                        assignee=rng.choice(members) if rng.random() < 0.85 else None,
+                        start_date=start,
+                        due_date=start + timedelta(days=rng.randint(1, 30)),
+                        slug=f'tarea-{t}',
+                    ))
+            # PostgreSQL (y SQLite >= 3.35) devuelven los ids de las filas insertadas
+            Task.objects.bulk_create(tasks, batch_size=batch)
+            task_ids_by_project = {}
+            for task in tasks:
+                task_ids_by_project.setdefault(task.project_id, []).append(task.id)
+
+            # --- Dependencias (DAG: solo se depende de tareas anteriores) ---
+            Edge = Task.predecessors.through
+            edges = []
+            for task_ids in task_ids_by_project.values():
+                for index, task_id in enumerate(task_ids[1:], start=1):
+                    count = rng.randint(0, min(options['max_predecessors'], index))
+                    for predecessor_id in rng.sample(task_ids[max(0, index - 50):index], count):
+                        edges.append(Edge(from_task_id=task_id, to_task_id=predecessor_id))
+            Edge.objects.bulk_create(edges, batch_size=batch)
+
+            # --- Comentarios, registros de tiempo y notificaciones ---
+            comments, timelogs = [], []
+            now = timezone.now()
+            for project in projects:
+                members = members_by_workspace[project.workspace_id]
+                for task_id in task_ids_by_project[project.id]:
+                    for c in range(rng.randint(0, options['comments'] * 2)):
+                        comments.append(Comment(task_id=task_id, author=rng.choice(members), text=f'Comentario {c}.'))
+                    for _ in range(rng.randint(0, options['timelogs'] * 2)):
+                        # Solo registros terminados: un usuario no puede tener dos cronómetros abiertos
+                        timelogs.append(TimeLog(task_id=task_id, user=rng.choice(members),
+                                                end_time=now + timedelta(minutes=rng.randint(5, 240))))
+            Comment.objects.bulk_create(comments, batch_size=batch)
+            TimeLog.objects.bulk_create(timelogs, batch_size=batch)
+
+            task_type = ContentType.objects.get_for_model(Task)
+            notifications = []
+            for workspace in workspaces:
+                members = members_by_workspace[workspace.id]
+                workspace_task_ids = [
+                    task_id for project in projects if project.workspace_id == workspace.id
+                    for task_id in task_ids_by_project[project.id]
+                ]
+                for member in members:
+                    for _ in range(options['notifications']):
+                        notifications.append(Notification(
+                            recipient=member,
+                            actor=rng.choice(members),
+                            verb='cambió el estado de la tarea',
+                            read=rng.random() < 0.7,
+                            content_type=task_type,
+                            object_id=rng.choice(workspace_task_ids),
+                        ))
+            Notification.objects.bulk_create(notifications, batch_size=batch)
+
+            # bulk_create no dispara las señales que mantienen el índice de búsqueda
+            search.rebuild([workspace.id for workspace in workspaces], batch_size=batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Dataset creado: {len(users)} usuarios, {len(workspaces)} workspaces, {len(projects)} proyectos, '
+            f'{len(tasks)} tareas, {len(edges)} dependencias, {len(comments)} comentarios, '
+            f'{len(timelogs)} registros de tiempo, {len(notifications)} notificaciones.'
+        ))
+        self.stdout.write(f'Usuario staff: user0@{SEED_EMAIL_DOMAIN} / {SEED_PASSWORD}')
+
+    def clear(self):
+        """ Elimina los datos de una ejecución anterior (en cascada desde los usuarios). """
+        User = get_user_model()
+        with transaction.atomic():
+            Workspace.objects.filter(slug__startswith=f'{SEED_SLUG_PREFIX}-ws-').delete()
+            User.objects.filter(email__endswith=f'@{SEED_EMAIL_DOMAIN}').delete()
+        self.stdout.write('Datos de rendimiento anteriores eliminados.')
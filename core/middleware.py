@@ -0,0 +1,335 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import FileResponse
+
+from . import perf, profiling
+from .routers import has_written, is_replica_view, replica_available, reset_writes, set_replica_reads
+
+logger = logging.getLogger('core.perf')
+
+# Clave de sesión con el instante hasta el que el usuario queda fijado al primario
+REPLICA_PIN_SESSION_KEY = '_db_pinned_until'
+
+# Recolectores de consultas activos en el contexto actual. Como la ContextVar de
+# core/routers.py, llega también a los hilos de sync_to_async, donde se ejecutan
+# las consultas de las vistas asíncronas.
+_active_collectors = ContextVar('query_collectors', default=())
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Decide por petición si las lecturas pueden ir a la réplica.
+
+    Solo las peticiones GET/HEAD a vistas de solo lectura usan la réplica. Tras
+    cualquier petición en la que el router envió una escritura al primario
+    (también un GET que escribe, como marcar notificaciones como leídas), la
+    sesión queda fijada al primario durante REPLICA_PIN_SECONDS para que el
+    usuario siempre vea sus propios cambios aunque la réplica vaya con retraso.
+
+    Funciona en modo síncrono y asíncrono; en asíncrono la sesión se lee y se
+    escribe con su API asíncrona.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django llama a process_view en el modo de la cadena: la versión
+            # asíncrona evita un salto a un hilo en cada petición
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        set_replica_reads(False)
+        reset_writes()
+        try:
+            response = self.get_response(request)
+        finally:
+            set_replica_reads(False)
+
+        if self._pins_session(request):
+            request.session[REPLICA_PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+        return response
+
+    async def __acall__(self, request):
+        set_replica_reads(False)
+        reset_writes()
+        try:
+            response = await self.get_response(request)
+        finally:
+            set_replica_reads(False)
+
+        if self._pins_session(request):
+            await request.session.aset(REPLICA_PIN_SESSION_KEY, time.time() + settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self._may_use_replica(request, view_func) and not self._is_pinned(request):
+            set_replica_reads(True)
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if self._may_use_replica(request, view_func) and not await self._ais_pinned(request):
+            set_replica_reads(True)
+        return None
+
+    def _pins_session(self, request):
+        return replica_available() and has_written() and hasattr(request, 'session')
+
+    def _may_use_replica(self, request, view_func):
+        return replica_available() and request.method in ('GET', 'HEAD') and is_replica_view(view_func)
+
+    def _is_pinned(self, request):
+        session = getattr(request, 'session', None)
+        if session is None:
+            return False
+        return session.get(REPLICA_PIN_SESSION_KEY, 0) > time.time()
+
+    async def _ais_pinned(self, request):
+        session = getattr(request, 'session', None)
+        if session is None:
+            return False
+        return await session.aget(REPLICA_PIN_SESSION_KEY, 0) > time.time()
+
+
+class PerfInstrumentationMiddleware:
+    """
+    Mide cada petición: número de consultas, tiempo total en BD, consulta más
+    lenta, tiempo de render de plantillas y tamaño de la respuesta. Las métricas
+    se agregan por nombre de URL en core.perf.
+
+    El render solo se separa para TemplateResponse (vistas basadas en clases);
+    en las vistas que usan render() forma parte del tiempo de la vista. En las
+    respuestas en streaming la medida incluye el envío del cuerpo, que es
+    donde se ejecutan sus consultas.
+
+    Funciona en modo síncrono y asíncrono: bajo ASGI no obliga a Django a
+    adaptar la cadena de middleware (ni las vistas asíncronas) a síncrona.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.PERF_INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+
+        collector = _QueryCollector()
+        request._perf_render_ms = 0.0
+        start = time.perf_counter()
+        with collecting(collector):
+            response = self.get_response(request)
+        self._finish(request, response, collector, start)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.PERF_INSTRUMENTATION_ENABLED:
+            return await self.get_response(request)
+
+        collector = _QueryCollector()
+        request._perf_render_ms = 0.0
+        start = time.perf_counter()
+        with collecting(collector):
+            response = await self.get_response(request)
+        self._finish(request, response, collector, start)
+        return response
+
+    def _finish(self, request, response, collector, start):
+        if not response.streaming or isinstance(response, FileResponse):
+            # Un FileResponse solo lee el archivo (y reemplazar su contenido anularía el sendfile)
+            self._record(request, collector, start, 0 if response.streaming else len(response.content))
+            return
+        # Las consultas de una respuesta en streaming (API, exportación) se ejecutan
+        # al enviarla, después de get_response: la medida acaba con la última parte
+        measure = self._ameasure_stream if response.is_async else self._measure_stream
+        response.streaming_content = measure(response.streaming_content, request, collector, start)
+
+    def _measure_stream(self, chunks, request, collector, start):
+        size = 0
+        iterator = iter(chunks)
+        try:
+            while True:
+                with collecting(collector):
+                    chunk = next(iterator, None)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            self._record(request, collector, start, size)
+
+    async def _ameasure_stream(self, chunks, request, collector, start):
+        size = 0
+        iterator = aiter(chunks)
+        try:
+            while True:
+                with collecting(collector):
+                    chunk = await anext(iterator, None)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            self._record(request, collector, start, size)
+
+    def _record(self, request, collector, start, size):
+        total_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else '<sin resolver>'
+        perf.stats.record(
+            view_name,
+            total_ms=total_ms,
+            render_ms=request._perf_render_ms,
+            db_ms=collector.total_ms,
+            queries=collector.count,
+            slowest_sql=collector.slowest_sql,
+            slowest_sql_ms=collector.slowest_ms,
+            size=size,
+        )
+        perf.stats.maybe_flush()
+
+        budget = settings.PERF_QUERY_BUDGET
+        if budget is not None and collector.count > budget:
+            logger.warning(
+                'Presupuesto de consultas excedido en %s: %d consultas (límite %d), %.1f ms en BD. Más lenta (%.1f ms): %s',
+                view_name, collector.count, budget, collector.total_ms,
+                collector.slowest_ms, collector.slowest_sql,
+            )
+
+    def process_template_response(self, request, response):
+        if hasattr(request, '_perf_render_ms'):
+            render_start = time.perf_counter()
+
+            def _record_render(rendered):
+                request._perf_render_ms += (time.perf_counter() - render_start) * 1000
+
+            response.add_post_render_callback(_record_render)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Perfila una petición bajo demanda: cabecera 'X-Profile: cprofile|sample' o
+    parámetro '?_profile=cprofile|sample'. Solo para staff, solo si
+    PROFILING_ENABLED y como mucho PROFILING_MAX_PER_MINUTE perfiles por minuto.
+    Debe ir después de AuthenticationMiddleware.
+
+    Funciona en modo síncrono y asíncrono; en asíncrono perfila también el hilo
+    del bucle de eventos, donde corren las vistas asíncronas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        mode = profiling.requested_mode(request) if settings.PROFILING_ENABLED else None
+        if not mode or not request.user.is_staff:
+            return self.get_response(request)
+        if not profiling.acquire_slot():
+            logger.info('Perfilado descartado por límite de frecuencia: %s', request.path)
+            return self.get_response(request)
+
+        collector = _QueryCollector(keep_log=True)
+        start = time.perf_counter()
+        profiler = profiling.start_profiler(mode)
+        try:
+            with collecting(collector):
+                # Las TemplateResponse ya llegan renderizadas: el perfil incluye las plantillas
+                response = self.get_response(request)
+        finally:
+            profiling.stop_profiler(profiler)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        name = profiling.save_profile(profiler, request, collector.log, duration_ms)
+        response['X-Profile-Id'] = name
+        return response
+
+    async def __acall__(self, request):
+        mode = profiling.requested_mode(request) if settings.PROFILING_ENABLED else None
+        if not mode or not (await request.auser()).is_staff:
+            return await self.get_response(request)
+        if not await sync_to_async(profiling.acquire_slot)():
+            logger.info('Perfilado descartado por límite de frecuencia: %s', request.path)
+            return await self.get_response(request)
+
+        collector = _QueryCollector(keep_log=True)
+        start = time.perf_counter()
+        profiler = await profiling.astart_profiler(mode)
+        try:
+            with collecting(collector):
+                response = await self.get_response(request)
+        finally:
+            await profiling.astop_profiler(profiler)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        name = await sync_to_async(profiling.save_profile)(profiler, request, collector.log, duration_ms)
+        response['X-Profile-Id'] = name
+        return response
+
+
+@contextmanager
+def collecting(collector):
+    """ Envía al recolector las consultas del bloque, en cualquier hilo que herede el contexto. """
+    token = _active_collectors.set(_active_collectors.get() + (collector,))
+    try:
+        yield collector
+    finally:
+        _active_collectors.reset(token)
+
+
+def collect_queries(execute, sql, params, many, context):
+    """ execute_wrapper de todas las conexiones (ver signals.py); sin recolectores activos no mide nada. """
+    collectors = _active_collectors.get()
+    if not collectors:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        for collector in collectors:
+            collector.add(sql, params, elapsed, context['connection'].alias)
+
+
+class _QueryCollector:
+    """ Cuenta y cronometra las consultas de una petición. """
+
+    def __init__(self, keep_log=False):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+        self.log = [] if keep_log else None
+
+    def add(self, sql, params, elapsed, alias):
+        self.count += 1
+        self.total_ms += elapsed
+        if elapsed > self.slowest_ms:
+            self.slowest_ms = elapsed
+            self.slowest_sql = sql
+        if self.log is not None:
+            self.log.append({'sql': sql, 'params': repr(params), 'ms': round(elapsed, 3), 'alias': alias})
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:44
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def close_duplicate_running_timers(apps, schema_editor):
+    """
+    Antes de crear la restriccion de un solo cronometro en curso por usuario,
+    cerramos los registros abiertos sobrantes (conservamos el mas reciente).
+    """
+    TimeLog = apps.get_model('core', 'TimeLog')
+    now = timezone.now()
+    seen_users = set()
+    running = TimeLog.objects.filter(end_time__isnull=True).order_by('user_id', '-start_time')
+    for log_id, user_id in running.values_list('id', 'user_id'):
+        if user_id in seen_users:
+            TimeLog.objects.filter(id=log_id).update(end_time=now)
+        seen_users.add(user_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0016_role_is_admin_role_alter_membership_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['project', '-created_at'], name='activity_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at'], name='notif_recipient_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('read', False)), fields=['recipient', '-created_at'], name='notif_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', 'status', 'due_date'], name='task_assignee_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelog',
+            index=models.Index(condition=models.Q(('end_time__isnull', True)), fields=['task', 'user'], name='timelog_running_idx'),
+        ),
+        migrations.RunPython(close_duplicate_running_timers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='timelog',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_time__isnull', True)), fields=('user',), name='timelog_one_running_per_user'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+# Autocompletado de predecesoras: title__istartswith genera
+# UPPER("title"::text) LIKE UPPER('q%'). Con text_pattern_ops PostgreSQL puede
+# usar el índice para el prefijo sea cual sea la collation de la base.
+# No se puede declarar en Meta.indexes de forma portable, por eso es RunPython.
+INDEX_NAME = 'task_project_title_prefix_idx'
+
+
+def create_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON core_task (project_id, UPPER(title::text) text_pattern_ops)'
+    )
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_comment_thread_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
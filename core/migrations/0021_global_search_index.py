@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_task_title_prefix_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('task', 'Tarea'), ('comment', 'Comentario'), ('project', 'Proyecto')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('workspace', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.workspace')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'workspace', 'kind', 'object_id', 'weight'], name='search_term_workspace_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id', 'term'), name='search_entry_unique_term')],
+            },
+        ),
+    ]
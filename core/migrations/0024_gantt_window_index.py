@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_task_external_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'start_date', 'due_date'], name='task_project_dates_idx'),
+        ),
+    ]
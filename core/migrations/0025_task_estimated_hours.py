@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_gantt_window_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='estimated_hours',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_task_estimated_hours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='auto_schedule',
+            field=models.BooleanField(default=False),
+        ),
+    ]
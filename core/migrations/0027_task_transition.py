@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_project_auto_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('BACKLOG', 'Backlog'), ('TODO', 'Por Hacer'), ('IN_PROGRESS', 'En Progreso'), ('PAUSED', 'Pausada'), ('DONE', 'Completada'), ('CANCELED', 'Cancelada')], max_length=20)),
+                ('to_status', models.CharField(choices=[('BACKLOG', 'Backlog'), ('TODO', 'Por Hacer'), ('IN_PROGRESS', 'En Progreso'), ('PAUSED', 'Pausada'), ('DONE', 'Completada'), ('CANCELED', 'Cancelada')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('project', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.project')),
+                ('task', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='core.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task', 'created_at'], name='transition_task_idx'), models.Index(fields=['project', 'to_status', 'created_at'], name='transition_project_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0032_preserve_created_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='domainevent',
+            index=models.Index(condition=models.Q(('processed_at__isnull', False)), fields=['processed_at'], name='event_processed_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser
 from django.utils.text import slugify
 import shortuuid
@@ -9,6 +10,16 @@ from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
 import uuid
 from datetime import timedelta
+from pathlib import Path
+from .storage import blob_path, content_addressed_storage, hash_file
+from . import previews
+
+# Fechas de creación: las de los modelos que se insertan en bloque con su fecha
+# original (proyección de eventos en core/events.py, restauración de archivos en
+# core/archive.py, importación de workspaces en core/transfer.py) usan
+# default=timezone.now en lugar de auto_now_add, que la sobrescribiría con la
+# hora de la inserción.
+
 
 class User(AbstractUser):
     """ 
@@ -24,13 +35,28 @@ class User(AbstractUser):
         return self.get_full_name() if self.get_full_name() else self.email
     
     
+class LiveManager(models.Manager):
+    """
+    Manager por defecto de Workspace y Project: oculta los marcados como
+    borrados, que un trabajo en segundo plano elimina por lotes (ver
+    core/deletion.py). 'all_objects' los incluye.
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Workspace(models.Model):
     """ Representa un equipo o espacio de trabajo. """
     name = models.CharField(max_length=150)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='owned_workspaces')
     members = models.ManyToManyField(settings.AUTH_USER_MODEL, through="Membership", related_name='workspaces')
     slug = models.SlugField(max_length=255, unique=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Borrado pendiente (ver DeletionJob): oculto en toda la aplicación
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
     
     def __str__(self):
         return self.name
@@ -38,7 +64,8 @@ class Workspace(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.name)
-            while Workspace.objects.filter(slug=base_slug).exists():
+            # all_objects: un workspace pendiente de borrar conserva su slug
+            while Workspace.all_objects.filter(slug=base_slug).exists():
                 base_slug = f'{slugify(self.name)}-{shortuuid.uuid()[:4]}'
             self.slug = base_slug
         super().save(*args, **kwargs)
@@ -59,7 +86,7 @@ class Membership(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='memberships')
     workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE)
     role = models.ForeignKey(Role, on_delete=models.SET_NULL, null=True, related_name='members')
-    data_joined = models.DateTimeField(auto_now_add=True)
+    data_joined = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         # Un usuario no puede estar 2 veces en el mismo workspace
@@ -75,8 +102,17 @@ class Project(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     deadline = models.DateField(blank=True, null=True)
+    # Al cambiar las fechas de una tarea se desplazan sus sucesoras (ver core/scheduling.py)
+    auto_schedule = models.BooleanField(default=False)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Proyecto archivado en frío (ver ProjectArchive): solo lectura
+    archived_at = models.DateTimeField(null=True, blank=True)
+    # Borrado pendiente (ver DeletionJob): oculto en toda la aplicación
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
     
     def __str__(self):
         return self.name
@@ -85,7 +121,8 @@ class Project(models.Model):
         if not self.slug:
             base_slug = slugify(self.name)
             # Generamos un slug unico añadiendo un ID corto si ya existe
-            while Project.objects.filter(slug=base_slug).exists():
+            # (all_objects: un proyecto pendiente de borrar conserva su slug)
+            while Project.all_objects.filter(slug=base_slug).exists():
                 base_slug = f"{slugify(self.name)}-{shortuuid.uuid()[:4]}"
             self.slug = base_slug
         super().save(*args, **kwargs)
@@ -151,8 +188,12 @@ class Task(models.Model):
     )
     start_date = models.DateField(blank=True, null=True)
     due_date = models.DateField(blank=True, null=True)
+    # Esfuerzo estimado; la previsión de capacidad lo reparte entre start_date y due_date
+    estimated_hours = models.PositiveIntegerField(blank=True, null=True)
     slug = models.SlugField(max_length=255, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Id de la tarea en un sistema externo (sincronización por lotes, ver core/task_sync.py)
+    external_id = models.CharField(max_length=100, null=True, blank=True)
 
     # --- NUEVOS CAMPOS ---
     priority = models.CharField(
@@ -172,9 +213,40 @@ class Task(models.Model):
     class Meta:
         ordering = ['-created_at'] # Ordenamos por defecto por fecha de creación
         unique_together = ('project', 'slug')
-    
+        indexes = [
+            # Tablero Kanban y reportes: tareas de un proyecto por estado
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            # Dashboard "Mis tareas": tareas abiertas del usuario ordenadas por vencimiento
+            models.Index(fields=['assignee', 'status', 'due_date'], name='task_assignee_status_due_idx'),
+            # API: paginación por cursor (id) dentro de un proyecto
+            models.Index(fields=['project', 'id'], name='task_project_id_idx'),
+            # Gantt: tareas de un proyecto que se solapan con una ventana de fechas
+            models.Index(fields=['project', 'start_date', 'due_date'], name='task_project_dates_idx'),
+        ]
+        constraints = [
+            # Sin condición a propósito: ON CONFLICT (project_id, external_id) necesita
+            # una restricción única completa. Los NULL no chocan entre sí.
+            models.UniqueConstraint(fields=['project', 'external_id'], name='task_project_external_id_uniq'),
+        ]
+    
+    # Usuario que hace el cambio; no es un campo, lo usa el registro de
+    # transiciones de estado (ver TaskTransition y core/signals.py)
+    changed_by = None
+
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado cargado, para detectar al guardar si ha cambiado
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.status
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -210,44 +282,202 @@ class Task(models.Model):
         return f"{hours:02}:{minutes:02}:{seconds:02}"
 
 
+class TaskTransition(models.Model):
+    """
+    Cambio de estado de una tarea (o su creación, con from_status vacío). Base
+    de las métricas de flujo: cycle time, lead time y throughput (ver
+    core/flow.py). El proyecto está desnormalizado para los reportes.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='transitions', db_index=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+', db_index=False)
+    from_status = models.CharField(max_length=20, choices=Task.Status.choices, blank=True)
+    to_status = models.CharField(max_length=20, choices=Task.Status.choices)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Historial de una tarea
+            models.Index(fields=['task', 'created_at'], name='transition_task_idx'),
+            # Reportes: entradas a un estado dentro de un proyecto por fecha
+            models.Index(fields=['project', 'to_status', 'created_at'], name='transition_project_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task_id}: {self.from_status or "-"} → {self.to_status}'
+
+    @classmethod
+    def for_change(cls, task, from_status, actor=None):
+        return cls(
+            task_id=task.pk, project_id=task.project_id, from_status=from_status or '',
+            to_status=task.status, actor=actor,
+        )
+
+
 class Comment(models.Model):
     """ Representa un comentario en una tarea. """
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     text = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            # Hilo del modal: páginas de comentarios de una tarea (keyset por fecha e id)
+            models.Index(fields=['task', '-created_at', '-id'], name='comment_task_created_idx'),
+        ]
     
     def __str__(self):
         return f'Comentario de {self.author} en {self.task.title}'
         
 
+class StoredFile(models.Model):
+    """
+    Contenido de un archivo guardado una sola vez, identificado por su SHA-256.
+    'ref_count' cuenta los Attachment que lo usan; al llegar a 0 se borra.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(storage=content_addressed_storage, max_length=255)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.sha256[:12]} ({self.ref_count} ref.)'
+
+    @classmethod
+    def store(cls, content, sha256=None, refs=1):
+        """ Guarda el contenido (si aún no existe) y suma 'refs' referencias. """
+        sha256 = sha256 or hash_file(content)
+        with transaction.atomic():
+            blob, created = cls.objects.select_for_update().get_or_create(
+                sha256=sha256, defaults={'size': content.size}
+            )
+            if created:
+                blob.file.save(blob_path(sha256), content, save=False)
+                blob.save(update_fields=['file'])
+            cls.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + refs)
+        return blob
+
+    def release(self):
+        """ Resta una referencia; sin referencias se borran la fila y el archivo. """
+        with transaction.atomic():
+            blob = StoredFile.objects.select_for_update().get(pk=self.pk)
+            if blob.ref_count > 1:
+                StoredFile.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+            name, storage = blob.file.name, blob.file.storage
+            blob.delete()
+            # El archivo se borra solo si la transacción se confirma
+            transaction.on_commit(lambda: storage.delete(name))
+
+
 class Attachment(models.Model):
     """Representa un archivo adjunto a un Comentario."""
     comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='attachments')
     uploader = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     file = models.FileField(upload_to='attachments/%Y/%m/%d/')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Contenido deduplicado (los adjuntos anteriores no lo tienen)
+    blob = models.ForeignKey(StoredFile, on_delete=models.PROTECT, null=True, blank=True, related_name='attachments')
+    original_name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     def __str__(self):
         # Retorna solo el nombre del archivo, no la ruta completa
-        return self.file.name.split('/')[-1]
+        return self.original_name or self.file.name.split('/')[-1]
+
+    @property
+    def has_preview(self):
+        return self.blob_id is not None and previews.preview_exists(self.blob.sha256)
+
+    @classmethod
+    def create_from_upload(cls, comment, uploader, uploaded_file):
+        """ Crea el adjunto guardando su contenido en el almacenamiento deduplicado. """
+        blob = StoredFile.store(uploaded_file, sha256=getattr(uploaded_file, 'sha256', None))
+        # La preview se genera en segundo plano cuando el archivo ya es definitivo
+        transaction.on_commit(lambda: previews.schedule_preview(blob))
+        return cls.objects.create(
+            comment=comment,
+            uploader=uploader,
+            file=blob.file.name,
+            blob=blob,
+            original_name=Path(uploaded_file.name).name[:255],
+        )
+
+
+class ChunkedUpload(models.Model):
+    """ Subida reanudable por partes de un archivo grande. """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.offset}/{self.size})'
+
+    @property
+    def temp_path(self):
+        return Path(settings.CHUNKED_UPLOAD_DIR) / f'{self.id}.part'
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
     
     
+class NotificationQuerySet(models.QuerySet):
+
+    def live(self):
+        """
+        Sin las que apuntan a un workspace, proyecto o tarea pendientes de
+        borrar (el DeletionJob las elimina después). El tipo se filtra por
+        nombre, sin consultar ContentType: también sirve en vistas async.
+        """
+        def target(model, queryset):
+            return models.Q(
+                content_type__app_label=model._meta.app_label, content_type__model=model._meta.model_name,
+                object_id__in=queryset.values('pk'),
+            )
+        return self.exclude(
+            target(Task, Task.objects.filter(project__deleted_at__isnull=False))
+            | target(Project, Project.all_objects.filter(deleted_at__isnull=False))
+            | target(Workspace, Workspace.all_objects.filter(deleted_at__isnull=False))
+        )
+
+
 class Notification(models.Model):
     """ Representa una notificacion para un usuario. """
     recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
     actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='actions')
     verb = models.CharField(max_length=255)
     read = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Veces que se repitió la acción (mismo actor, verbo y objeto) dentro de la
+    # ventana NOTIFICATION_COALESCE_MINUTES; created_at es la última vez
+    count = models.PositiveIntegerField(default=1)
     
     # Campos para el Generic Foreign Key
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     target = GenericForeignKey('content_type', 'object_id')
+
+    objects = NotificationQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Listado de notificaciones del usuario (más recientes primero)
+            models.Index(fields=['recipient', '-created_at'], name='notif_recipient_created_idx'),
+            # Índice parcial de no leídas: contador del navbar y marcado como leídas
+            models.Index(
+                fields=['recipient', '-created_at'],
+                condition=models.Q(read=False),
+                name='notif_unread_idx',
+            ),
+            # Índice parcial de leídas por fecha: borrado por lotes de la retención
+            models.Index(fields=['created_at'], condition=models.Q(read=True), name='notif_read_created_idx'),
+        ]
         
     def __str__(self):
         # Manejar el caso de que el target haya sido eliminado
@@ -260,7 +490,7 @@ class Activity(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='activities', null=True, blank=True)
     actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     verb = models.CharField(max_length=255)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
 
     # Opcional: un target genérico para saber sobre qué objeto se actuó
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
@@ -270,6 +500,10 @@ class Activity(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Activities" # Corrige el plural en el admin de Django
+        indexes = [
+            # Feed de actividad reciente de un proyecto
+            models.Index(fields=['project', '-created_at'], name='activity_project_created_idx'),
+        ]
 
     def __str__(self):
         if self.target:
@@ -277,6 +511,108 @@ class Activity(models.Model):
         return f'{self.actor} {self.verb}'
     
     
+class DomainEvent(models.Model):
+    """
+    Evento de dominio de la bandeja de salida (outbox). Las vistas solo
+    insertan el evento, en la misma transacción que el cambio; los
+    proyectores de core/events.py lo consumen por lotes y materializan la
+    actividad y las notificaciones con bulk_create. Al consumirlas se marca
+    processed_at; pasados OUTBOX_RETENTION_DAYS se borran por lotes.
+    """
+    class Kind(models.TextChoices):
+        TASK_CREATED = 'task_created', 'Tarea creada'
+        TASK_STATUS_CHANGED = 'task_status_changed', 'Cambio de estado'
+        TASKS_SYNCED = 'tasks_synced', 'Tareas sincronizadas'
+        COMMENT_ADDED = 'comment_added', 'Comentario'
+        INVITATION_ACCEPTED = 'invitation_accepted', 'Invitación aceptada'
+
+    kind = models.CharField(max_length=30, choices=Kind.choices)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    target = GenericForeignKey('content_type', 'object_id')
+    # Datos para construir los textos y destinatarios ya resueltos ('recipients')
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Índice parcial: solo los eventos pendientes de proyectar
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='event_pending_idx'),
+            # Retención: eventos ya proyectados por antigüedad
+            models.Index(fields=['processed_at'], condition=models.Q(processed_at__isnull=False), name='event_processed_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk}'
+
+
+class ProjectArchive(models.Model):
+    """
+    Archivo en frío de un proyecto terminado. Sus tareas, comentarios,
+    adjuntos, registros de tiempo, actividad y notificaciones se guardan en
+    'snapshot' (JSON Lines comprimido con gzip) y se borran de las tablas por
+    lotes en segundo plano; el proyecto se muestra en solo lectura desde el
+    snapshot hasta que se restaura (ver core/archive.py).
+    """
+    class State(models.TextChoices):
+        ARCHIVING = 'archiving', 'Archivando'
+        ARCHIVED = 'archived', 'Archivado'
+        RESTORING = 'restoring', 'Restaurando'
+
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='archive')
+    state = models.CharField(max_length=10, choices=State.choices, default=State.ARCHIVING)
+    snapshot = models.FileField(upload_to='archives/', blank=True)
+    # Filas guardadas por sección del snapshot
+    counts = models.JSONField(default=dict)
+    archived_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'Archivo de {self.project} ({self.get_state_display()})'
+
+
+class DeletionJob(models.Model):
+    """
+    Borrado en segundo plano de un workspace o proyecto ya marcado con
+    deleted_at. Las filas dependientes se borran por lotes y aquí se anota el
+    progreso; el trabajo sobrevive al objeto borrado (sin FK a él).
+    """
+    class Kind(models.TextChoices):
+        WORKSPACE = 'workspace', 'Workspace'
+        PROJECT = 'project', 'Proyecto'
+
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    name = models.CharField(max_length=200)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    # Filas a borrar (se calcula al empezar) y borradas hasta ahora
+    total_rows = models.PositiveBigIntegerField(null=True, blank=True)
+    deleted_rows = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Trabajos pendientes (reanudación y listado de progreso)
+            models.Index(fields=['requested_by'], condition=models.Q(finished_at__isnull=True), name='deletion_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'Borrado de {self.get_kind_display()} "{self.name}"'
+
+    @property
+    def progress(self):
+        """ Porcentaje completado (0 si aún no se han contado las filas). """
+        if self.finished_at:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.deleted_rows * 100 / self.total_rows))
+
+
 class Invitation(models.Model):
     " Guarda una invitacion para unirse a un workspace. "
     workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='invitations')
@@ -284,7 +620,7 @@ class Invitation(models.Model):
     email = models.EmailField()
     token = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     is_accepted = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     def __str__(self):
         status = "Aceptada" if self.is_accepted else "Pendiente"
@@ -296,9 +632,27 @@ class TimeLog(models.Model):
     """ Representa un bloque de tiempo trabajado en una tarea. """
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='timelogs')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    start_time = models.DateTimeField(auto_now_add=True)
+    start_time = models.DateTimeField(default=timezone.now, editable=False)
     end_time = models.DateTimeField(null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            # Índice parcial: solo los cronómetros en curso (end_time IS NULL)
+            models.Index(
+                fields=['task', 'user'],
+                condition=models.Q(end_time__isnull=True),
+                name='timelog_running_idx',
+            ),
+        ]
+        constraints = [
+            # Un usuario solo puede tener un cronómetro en curso a la vez
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(end_time__isnull=True),
+                name='timelog_one_running_per_user',
+            ),
+        ]
+    
     @property
     def duration(self):
         """ Calcula la duracion del registro de tiempo. Si aún no ha terminado, devuelve 'En curso'. """
@@ -307,4 +661,39 @@ class TimeLog(models.Model):
         return "En curso"
     
     def __str__(self):
-        return f'Registro de {self.user} en {self.task.title} ({self.duration})'
\ No newline at end of file
+        return f'Registro de {self.user} en {self.task.title} ({self.duration})'
+
+class SearchEntry(models.Model):
+    """
+    Fila del índice invertido de la búsqueda global: un término normalizado de
+    un documento (tarea, comentario o proyecto) con su peso. El workspace está
+    desnormalizado para filtrar por permisos en la propia consulta al índice.
+    Se mantiene con señales (ver core/search.py).
+    """
+    class Kind(models.TextChoices):
+        TASK = 'task', 'Tarea'
+        COMMENT = 'comment', 'Comentario'
+        PROJECT = 'project', 'Proyecto'
+
+    term = models.CharField(max_length=64)
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField()
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='+', db_index=False)
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            # Búsqueda: término + workspaces del usuario. Incluye el resto de
+            # columnas para que la consulta se resuelva solo con el índice.
+            models.Index(
+                fields=['term', 'workspace', 'kind', 'object_id', 'weight'],
+                name='search_term_workspace_idx',
+            ),
+        ]
+        constraints = [
+            # Sirve además para reindexar/borrar un documento por (kind, object_id)
+            models.UniqueConstraint(fields=['kind', 'object_id', 'term'], name='search_entry_unique_term'),
+        ]
+
+    def __str__(self):
+        return f'{self.term} → {self.kind}:{self.object_id}'
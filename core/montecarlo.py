@@ -0,0 +1,30 @@
+"""
+Simulación Monte Carlo de la previsión de entrega (ver core/forecasting.py).
+
+Módulo sin dependencias de Django: los procesos del pool lo importan sin
+cargar los modelos ni la configuración.
+"""
+import numpy as np
+
+
+def simulate(history, predecessors, earliest, trials, seed):
+    """
+    Ejecuta 'trials' ensayos y devuelve, para cada uno, el primer día libre
+    tras terminar todas las tareas (hoy es el día 0). No usa el ORM: se puede
+    ejecutar en otro proceso.
+
+    history: duraciones posibles (días); predecessors: por cada tarea, en orden
+    topológico, los índices de sus predecesoras; earliest: primer día en que
+    puede empezar cada tarea.
+    """
+    rng = np.random.default_rng(seed)
+    history = np.asarray(history, dtype=np.int32)
+    earliest = np.asarray(earliest, dtype=np.int32)
+    durations = history[rng.integers(0, len(history), size=(trials, len(predecessors)), dtype=np.int32)]
+    finish = np.empty_like(durations)
+    for index, preds in enumerate(predecessors):
+        start = np.full(trials, earliest[index], dtype=np.int32)
+        if preds:
+            start = np.maximum(start, finish[:, preds].max(axis=1))
+        finish[:, index] = start + durations[:, index]
+    return finish.max(axis=1) if len(predecessors) else np.zeros(trials, dtype=np.int32)
@@ -0,0 +1,167 @@
+"""
+Métricas de rendimiento por vista, agregadas en memoria del proceso.
+
+Cada petición instrumentada se registra bajo el nombre de su URL
+('core:project_detail', ...). Las métricas se guardan en buckets de un minuto
+que forman una ventana deslizante (PERF_WINDOW_MINUTES); así los histogramas
+reflejan el tráfico reciente y la memoria usada está acotada.
+
+Cada proceso vuelca periódicamente su instantánea a PERF_STATS_DIR, de modo que
+el endpoint de staff y el comando 'perf_report' pueden combinar los datos de
+todos los workers.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from django.conf import settings
+
+# Límites superiores (ms) de los buckets del histograma de latencia
+LATENCY_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _empty_bucket(minute):
+    return {
+        'minute': minute,
+        'count': 0,
+        'total_ms': 0.0,
+        'render_ms': 0.0,
+        'db_ms': 0.0,
+        'queries': 0,
+        'max_queries': 0,
+        'bytes': 0,
+        'histogram': [0] * (len(LATENCY_BOUNDS_MS) + 1),
+        'slowest_sql': None,
+        'slowest_sql_ms': 0.0,
+    }
+
+
+def _histogram_index(total_ms):
+    for i, bound in enumerate(LATENCY_BOUNDS_MS):
+        if total_ms <= bound:
+            return i
+    return len(LATENCY_BOUNDS_MS)
+
+
+class PerfStats:
+    """ Agregador en memoria, seguro entre hilos, de las métricas por vista. """
+
+    def __init__(self, window_minutes=None):
+        self.window_minutes = window_minutes or settings.PERF_WINDOW_MINUTES
+        self._lock = threading.Lock()
+        self._views = {}
+        self._last_flush = time.monotonic()
+
+    def record(self, view_name, total_ms, render_ms, db_ms, queries, slowest_sql, slowest_sql_ms, size):
+        minute = int(time.time() // 60)
+        with self._lock:
+            buckets = self._views.setdefault(view_name, deque(maxlen=self.window_minutes))
+            if not buckets or buckets[-1]['minute'] != minute:
+                buckets.append(_empty_bucket(minute))
+            bucket = buckets[-1]
+            bucket['count'] += 1
+            bucket['total_ms'] += total_ms
+            bucket['render_ms'] += render_ms
+            bucket['db_ms'] += db_ms
+            bucket['queries'] += queries
+            bucket['max_queries'] = max(bucket['max_queries'], queries)
+            bucket['bytes'] += size
+            bucket['histogram'][_histogram_index(total_ms)] += 1
+            if slowest_sql and slowest_sql_ms > bucket['slowest_sql_ms']:
+                bucket['slowest_sql'] = slowest_sql[:2000]
+                bucket['slowest_sql_ms'] = slowest_sql_ms
+
+    def snapshot(self):
+        """ Devuelve los buckets vigentes de cada vista como datos serializables. """
+        oldest = int(time.time() // 60) - self.window_minutes
+        with self._lock:
+            return {
+                name: [dict(b, histogram=list(b['histogram'])) for b in buckets if b['minute'] > oldest]
+                for name, buckets in self._views.items()
+            }
+
+    def maybe_flush(self):
+        """ Vuelca la instantánea a disco como mucho una vez cada PERF_FLUSH_SECONDS. """
+        directory = settings.PERF_STATS_DIR
+        if not directory or time.monotonic() - self._last_flush < settings.PERF_FLUSH_SECONDS:
+            return
+        self._last_flush = time.monotonic()
+        self.flush(directory)
+
+    def flush(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f'perf-{os.getpid()}.json'
+        tmp = target.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'written_at': time.time(), 'views': self.snapshot()}))
+        os.replace(tmp, target)  # Escritura atómica para los lectores
+
+
+def load_snapshots(directory, include_live=True):
+    """ Combina las instantáneas de todos los procesos (y la del proceso actual). """
+    views = {}
+    sources = []
+    if directory and Path(directory).is_dir():
+        oldest = time.time() - settings.PERF_WINDOW_MINUTES * 60
+        own_file = f'perf-{os.getpid()}.json'
+        for path in Path(directory).glob('perf-*.json'):
+            if include_live and path.name == own_file:
+                continue
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if data.get('written_at', 0) >= oldest:
+                sources.append(data['views'])
+    if include_live:
+        sources.append(stats.snapshot())
+
+    for source in sources:
+        for name, buckets in source.items():
+            views.setdefault(name, []).extend(buckets)
+    return views
+
+
+def summarize(views):
+    """ Reduce los buckets de cada vista a un resumen con percentiles estimados. """
+    summary = []
+    for name, buckets in views.items():
+        count = sum(b['count'] for b in buckets)
+        if not count:
+            continue
+        histogram = [sum(col) for col in zip(*(b['histogram'] for b in buckets))]
+        slowest = max(buckets, key=lambda b: b['slowest_sql_ms'])
+        summary.append({
+            'view': name,
+            'requests': count,
+            'avg_ms': round(sum(b['total_ms'] for b in buckets) / count, 2),
+            'p50_ms': _percentile(histogram, count, 0.50),
+            'p95_ms': _percentile(histogram, count, 0.95),
+            'p99_ms': _percentile(histogram, count, 0.99),
+            'avg_render_ms': round(sum(b['render_ms'] for b in buckets) / count, 2),
+            'avg_db_ms': round(sum(b['db_ms'] for b in buckets) / count, 2),
+            'avg_queries': round(sum(b['queries'] for b in buckets) / count, 2),
+            'max_queries': max(b['max_queries'] for b in buckets),
+            'avg_bytes': round(sum(b['bytes'] for b in buckets) / count),
+            'slowest_sql': slowest['slowest_sql'],
+            'slowest_sql_ms': round(slowest['slowest_sql_ms'], 2),
+            'histogram': dict(zip([f'<={b}ms' for b in LATENCY_BOUNDS_MS] + ['>5000ms'], histogram)),
+        })
+    return sorted(summary, key=lambda s: s['avg_ms'] * s['requests'], reverse=True)
+
+
+def _percentile(histogram, count, fraction):
+    """ Percentil aproximado: límite superior del bucket que lo contiene. """
+    target = count * fraction
+    seen = 0
+    for i, value in enumerate(histogram):
+        seen += value
+        if seen >= target:
+            return LATENCY_BOUNDS_MS[i] if i < len(LATENCY_BOUNDS_MS) else None
+    return None
+
+
+stats = PerfStats()
@@ -0,0 +1,162 @@
+"""
+Previsualizaciones de adjuntos (miniatura de imágenes y primera página de PDF).
+
+Se generan fuera de la petición en un pool de procesos y se guardan en disco
+junto al contenido, con el SHA-256 como clave: 'previews/ab/cd/<sha256>-<tamaño>.jpg'.
+Como el contenido de un hash nunca cambia, la preview se sirve con caché de
+larga duración.
+
+Dependencias opcionales: Pillow para las imágenes y 'pdftoppm' (poppler-utils)
+para los PDF. Si faltan, simplemente no hay preview y la plantilla muestra el
+enlace al archivo.
+"""
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_SUBDIR = 'previews'
+PDF_MAGIC = b'%PDF'
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_flight = set()
+
+
+def _base_path(sha256):
+    size = settings.ATTACHMENT_PREVIEW_SIZE
+    return Path(settings.MEDIA_ROOT) / PREVIEW_SUBDIR / sha256[:2] / sha256[2:4] / f'{sha256}-{size}'
+
+
+def preview_path(sha256):
+    return _base_path(sha256).with_suffix('.jpg')
+
+
+def _unsupported_marker(sha256):
+    # Evita reintentar archivos que no tienen preview posible (zip, docx...)
+    return _base_path(sha256).with_suffix('.none')
+
+
+def preview_exists(sha256):
+    return preview_path(sha256).is_file()
+
+
+def needs_preview(sha256):
+    return not preview_exists(sha256) and not _unsupported_marker(sha256).exists()
+
+
+def render_preview(source, sha256, size, preview_dir):
+    """
+    Genera la preview en un proceso del pool. No usa el ORM ni los settings:
+    recibe todo lo necesario como argumentos. Devuelve True si se generó.
+
+    Los renderizadores devuelven None si falta la dependencia opcional (se
+    reintentará cuando esté instalada) y False si el archivo no tiene preview.
+    """
+    base = Path(preview_dir) / sha256[:2] / sha256[2:4] / f'{sha256}-{size}'
+    base.parent.mkdir(parents=True, exist_ok=True)
+    target = base.with_suffix('.jpg')
+
+    with open(source, 'rb') as handle:
+        is_pdf = handle.read(len(PDF_MAGIC)) == PDF_MAGIC
+
+    # Se escribe en un temporal y se renombra: nunca se sirve una preview a medias
+    fd, tmp_name = tempfile.mkstemp(dir=base.parent, suffix='.tmp')
+    os.close(fd)
+    try:
+        generated = _render_pdf(source, tmp_name, size) if is_pdf else _render_image(source, tmp_name, size)
+        if generated:
+            os.replace(tmp_name, target)
+        elif generated is False:
+            base.with_suffix('.none').touch()
+        return bool(generated)
+    finally:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+
+
+def _render_image(source, target, size):
+    try:
+        from PIL import Image, ImageOps, UnidentifiedImageError
+    except ImportError:
+        return None
+    try:
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size))
+            image.convert('RGB').save(target, 'JPEG', quality=80, optimize=True)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return False
+    return True
+
+
+def _render_pdf(source, target, size):
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm is None:
+        return None
+    out_base = target[:-len('.tmp')]
+    try:
+        subprocess.run(
+            [pdftoppm, '-f', '1', '-l', '1', '-singlefile', '-jpeg', '-scale-to', str(size), source, out_base],
+            check=True, capture_output=True, timeout=60,
+        )
+    except (subprocess.SubprocessError, OSError):
+        return False
+    os.replace(f'{out_base}.jpg', target)
+    return True
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 'spawn': no heredamos hilos ni conexiones a la base de datos del worker web
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.ATTACHMENT_PREVIEW_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _executor
+
+
+def schedule_preview(blob):
+    """
+    Encola la preview de un StoredFile si aún no existe. Llamar tras el commit:
+    el archivo ya está en disco y la petición no espera al resultado.
+    """
+    if settings.ATTACHMENT_PREVIEW_WORKERS <= 0 or not needs_preview(blob.sha256):
+        return None
+    with _executor_lock:
+        if blob.sha256 in _in_flight:
+            return None
+        _in_flight.add(blob.sha256)
+
+    future = _get_executor().submit(
+        render_preview, blob.file.path, blob.sha256,
+        settings.ATTACHMENT_PREVIEW_SIZE, str(Path(settings.MEDIA_ROOT) / PREVIEW_SUBDIR),
+    )
+    future.add_done_callback(lambda done: _finished(blob.sha256, done))
+    return future
+
+
+def _finished(sha256, future):
+    with _executor_lock:
+        _in_flight.discard(sha256)
+    if future.exception() is not None:
+        logger.error('Error generando la preview de %s', sha256, exc_info=future.exception())
+
+
+def generate_preview(blob):
+    """ Genera la preview en el proceso actual (comando de relleno, tests). """
+    return render_preview(
+        blob.file.path, blob.sha256,
+        settings.ATTACHMENT_PREVIEW_SIZE, str(Path(settings.MEDIA_ROOT) / PREVIEW_SUBDIR),
+    )
@@ -0,0 +1,232 @@
+"""
+Perfilado bajo demanda de peticiones reales (solo staff).
+
+Dos modos:
+- 'cprofile': perfil determinista de cProfile, guardado como .prof (pstats,
+  snakeviz, etc.).
+- 'sample': perfilador por muestreo en un hilo aparte que lee la pila del hilo
+  de la petición cada PROFILING_SAMPLE_INTERVAL segundos. Se guarda en el
+  formato de speedscope (https://www.speedscope.app).
+
+Una petición asíncrona (ASGI) corre en dos hilos: la vista asíncrona en el del
+bucle de eventos y el ORM o las vistas síncronas en su hilo de sync_to_async.
+Se perfilan los dos: un perfil por hilo en speedscope y, con cProfile, un
+perfilador por hilo que se combinan en el mismo .prof.
+
+Junto a cada perfil se guarda un .sql.json con las consultas ejecutadas.
+"""
+import cProfile
+import json
+import pstats
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+PROFILE_MODES = ('cprofile', 'sample')
+# Solo nombres generados por save_profile: evita rutas arbitrarias al descargar
+PROFILE_NAME_RE = re.compile(r'^[\w.-]+\.(prof|speedscope\.json|sql\.json)$')
+
+
+def requested_mode(request):
+    """ Devuelve el modo pedido por cabecera (X-Profile) o parámetro (?_profile=), o None. """
+    value = request.headers.get('X-Profile') or request.GET.get('_profile')
+    if not value:
+        return None
+    value = value.lower()
+    return value if value in PROFILE_MODES else 'cprofile'
+
+
+def acquire_slot():
+    """
+    Limita los perfiles a PROFILING_MAX_PER_MINUTE. Usa la caché para que el
+    límite sea compartido entre workers cuando la caché lo es.
+    """
+    key = f'profiling-slots:{int(time.time() // 60)}'
+    cache.add(key, 0, timeout=60)
+    try:
+        used = cache.incr(key)
+    except ValueError:
+        return False
+    return used <= settings.PROFILING_MAX_PER_MINUTE
+
+
+class SamplingProfiler:
+    """ Muestrea periódicamente la pila de uno o varios hilos y la exporta a speedscope. """
+
+    def __init__(self, interval=None):
+        self.interval = interval or settings.PROFILING_SAMPLE_INTERVAL
+        self._frames = []
+        self._frame_index = {}
+        self._samples = {}
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = 0.0
+        self._ended = 0.0
+
+    def start(self, threads=None):
+        """ threads: {ident: etiqueta} de los hilos a muestrear; por defecto, el actual. """
+        self._labels = threads or {threading.get_ident(): None}
+        self._samples = {ident: [] for ident in self._labels}
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._ended = time.perf_counter()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, samples in self._samples.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    samples.append(self._stack(frame))
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self._frames)
+                self._frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()  # speedscope espera la pila de la raíz a la hoja
+        return stack
+
+    def to_speedscope(self, name):
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': self._frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': f'{name} ({label})' if label else name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': self._ended - self._started,
+                'samples': self._samples[ident],
+                'weights': [self.interval] * len(self._samples[ident]),
+            } for ident, label in self._labels.items()],
+            'name': name,
+            'exporter': 'nexus-pm',
+        }
+
+
+def start_profiler(mode):
+    if mode == 'sample':
+        profiler = SamplingProfiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+
+def stop_profiler(profiler):
+    if isinstance(profiler, SamplingProfiler):
+        profiler.stop()
+    else:
+        profiler.disable()
+
+
+async def astart_profiler(mode):
+    """ Como start_profiler, para una petición asíncrona: perfila su hilo del bucle de eventos y el de sync_to_async. """
+    worker = await sync_to_async(threading.get_ident)()
+    if mode == 'sample':
+        profiler = SamplingProfiler()
+        profiler.start({threading.get_ident(): 'bucle de eventos', worker: 'hilo síncrono'})
+        return profiler
+    # cProfile solo perfila el hilo que lo activa: uno por hilo
+    profilers = [start_profiler(mode)]
+    try:
+        profilers.append(await sync_to_async(start_profiler)(mode))
+    except ValueError:
+        # Python 3.12+: cProfile usa sys.monitoring, que admite un solo perfilador y ya cubre todos los hilos
+        pass
+    return profilers
+
+
+async def astop_profiler(profiler):
+    if isinstance(profiler, SamplingProfiler):
+        profiler.stop()
+    else:
+        loop_profiler, *worker_profilers = profiler
+        loop_profiler.disable()
+        for worker_profiler in worker_profilers:
+            await sync_to_async(worker_profiler.disable)()
+
+
+def save_profile(profiler, request, sql_log, duration_ms):
+    """ Guarda el perfil y su log de SQL; devuelve el nombre base de los archivos. """
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    match = getattr(request, 'resolver_match', None)
+    view_name = (match.view_name if match else 'sin-resolver').replace(':', '-')
+    base = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{view_name}"
+    label = f'{request.method} {request.get_full_path()}'
+
+    if isinstance(profiler, SamplingProfiler):
+        (directory / f'{base}.speedscope.json').write_text(json.dumps(profiler.to_speedscope(label)))
+    elif isinstance(profiler, list):
+        pstats.Stats(*profiler).dump_stats(directory / f'{base}.prof')
+    else:
+        profiler.dump_stats(directory / f'{base}.prof')
+
+    (directory / f'{base}.sql.json').write_text(json.dumps({
+        'request': label,
+        'user': request.user.get_username(),
+        'duration_ms': round(duration_ms, 2),
+        'queries': sql_log,
+    }, indent=2))
+
+    _prune(directory)
+    return base
+
+
+def _prune(directory):
+    """ Conserva solo los PROFILING_KEEP perfiles más recientes. """
+    sql_files = sorted(directory.glob('*.sql.json'), reverse=True)
+    for old in sql_files[settings.PROFILING_KEEP:]:
+        base = old.name[:-len('.sql.json')]
+        for path in directory.glob(f'{base}.*'):
+            path.unlink(missing_ok=True)
+
+
+def list_profiles():
+    """ Perfiles guardados, del más reciente al más antiguo. """
+    directory = Path(settings.PROFILING_DIR)
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for sql_file in sorted(directory.glob('*.sql.json'), reverse=True):
+        base = sql_file.name[:-len('.sql.json')]
+        try:
+            meta = json.loads(sql_file.read_text())
+        except (OSError, ValueError):
+            continue
+        profile_file = next(
+            (p.name for p in directory.glob(f'{base}.*') if not p.name.endswith('.sql.json')), None
+        )
+        profiles.append({
+            'name': base,
+            'request': meta.get('request'),
+            'user': meta.get('user'),
+            'duration_ms': meta.get('duration_ms'),
+            'query_count': len(meta.get('queries', [])),
+            'profile_file': profile_file,
+            'sql_file': sql_file.name,
+        })
+    return profiles
@@ -0,0 +1,83 @@
+"""
+Enrutamiento de lecturas hacia una réplica de solo lectura.
+
+Por defecto todo va a 'default'. Las vistas marcadas con ``replica_read`` (o
+con ``use_replica = True`` en vistas basadas en clases) leen de la réplica
+cuando esta configurada; las escrituras, y las lecturas que las siguen en la
+misma petición o sesión, se quedan en el primario.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA_DB_ALIAS = 'replica'
+
+# Indica si las lecturas del contexto actual pueden ir a la réplica
+_use_replica = ContextVar('use_replica', default=False)
+# Indica si el contexto actual (la petición en curso) ha escrito en el primario
+_wrote_primary = ContextVar('wrote_primary', default=False)
+
+
+def replica_available():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def set_replica_reads(enabled):
+    _use_replica.set(enabled)
+
+
+def reset_writes():
+    _wrote_primary.set(False)
+
+
+def has_written():
+    """ True si el router ha enviado alguna escritura al primario desde reset_writes(). """
+    return _wrote_primary.get()
+
+
+@contextmanager
+def read_from_replica():
+    """ Envía a la réplica las lecturas del bloque (reportes, comandos...). """
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_read(view_func):
+    """ Marca una vista de función como de solo lectura (apta para la réplica). """
+    view_func.use_replica = True
+    return view_func
+
+
+def is_replica_view(view_func):
+    view_class = getattr(view_func, 'view_class', None)
+    if view_class is not None:
+        return getattr(view_class, 'use_replica', False)
+    return getattr(view_func, 'use_replica', False)
+
+
+class ReplicaRouter:
+    """ Router de base de datos: lecturas a la réplica, escrituras al primario. """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_available():
+            return REPLICA_DB_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        # Tras una escritura, el resto de lecturas del contexto van al primario
+        # para no leer datos que la réplica aún no ha recibido.
+        _use_replica.set(False)
+        _wrote_primary.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplica contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación, no por migraciones
+        return db != REPLICA_DB_ALIAS
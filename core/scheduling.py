@@ -0,0 +1,103 @@
+"""
+Reprogramación automática de las tareas sucesoras.
+
+Cuando cambian las fechas de una tarea en un proyecto con 'auto_schedule',
+se recorre solo el subgrafo de sucesoras alcanzable desde ella (una consulta
+por nivel), se ordena topológicamente y cada tarea se desplaza para empezar el
+día siguiente al vencimiento más tardío de sus predecesoras. Las tareas solo se
+mueven hacia delante y conservan su duración; las completadas o canceladas no
+se mueven. Todos los cambios se guardan con un único bulk_update, así que el
+coste depende del tamaño del subgrafo afectado y no del proyecto.
+"""
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from django.db import transaction
+
+from . import versions
+from .models import Task
+
+Edge = Task.predecessors.through
+FROZEN_STATUSES = {Task.Status.DONE, Task.Status.CANCELED}
+BATCH_SIZE = 500
+
+
+def _downstream(root_id):
+    """ Ids de todas las sucesoras (directas e indirectas) de root_id, nivel a nivel. """
+    reached = set()
+    frontier = {root_id}
+    while frontier:
+        successors = set(
+            Edge.objects.filter(to_task_id__in=frontier).values_list('from_task_id', flat=True)
+        )
+        frontier = successors - reached - {root_id}
+        reached |= frontier
+    return reached
+
+
+def topological_order(nodes, predecessors_of):
+    """ Kahn sobre el subgrafo. Las tareas de un ciclo (datos corruptos) se omiten. """
+    pending = {node: 0 for node in nodes}
+    successors_of = defaultdict(list)
+    for node in nodes:
+        for predecessor in predecessors_of[node]:
+            if predecessor in pending:
+                pending[node] += 1
+                successors_of[predecessor].append(node)
+    queue = deque(sorted(node for node, count in pending.items() if count == 0))
+    order = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for successor in successors_of[node]:
+            pending[successor] -= 1
+            if pending[successor] == 0:
+                queue.append(successor)
+    return order
+
+
+def propagate(task):
+    """
+    Desplaza las sucesoras de 'task' para respetar las dependencias. Devuelve
+    la lista de tareas modificadas (ya guardadas).
+    """
+    affected = _downstream(task.pk)
+    if not affected:
+        return []
+
+    # Aristas de entrada de cada tarea afectada: sus predecesoras pueden estar
+    # fuera del subgrafo y también limitan la fecha de inicio
+    predecessors_of = defaultdict(set)
+    for task_id, predecessor_id in Edge.objects.filter(from_task_id__in=affected).values_list('from_task_id', 'to_task_id'):
+        predecessors_of[task_id].add(predecessor_id)
+    outside = set().union(*predecessors_of.values()) - affected
+
+    tasks = Task.objects.only('id', 'project_id', 'status', 'start_date', 'due_date').in_bulk(affected | outside)
+    tasks[task.pk] = task  # la versión en memoria, con las fechas recién guardadas
+
+    changed = []
+    for node in topological_order(affected, predecessors_of):
+        current = tasks[node]
+        if current.status in FROZEN_STATUSES:
+            continue
+        due_dates = [tasks[p].due_date for p in predecessors_of[node] if p in tasks and tasks[p].due_date]
+        anchor = current.start_date or current.due_date
+        if not due_dates or anchor is None:
+            continue
+        earliest = max(due_dates) + timedelta(days=1)
+        if anchor >= earliest:
+            continue
+        shift = earliest - anchor
+        if current.start_date:
+            current.start_date += shift
+        if current.due_date:
+            current.due_date += shift
+        changed.append(current)
+
+    if changed:
+        with transaction.atomic():
+            Task.objects.bulk_update(changed, ['start_date', 'due_date'], batch_size=BATCH_SIZE)
+        # bulk_update no dispara las señales que versionan los proyectos
+        for project_id in {current.project_id for current in changed}:
+            versions.bump_project(project_id)
+    return changed
@@ -0,0 +1,182 @@
+"""
+Búsqueda global sobre tareas, comentarios y proyectos de todos los workspaces
+del usuario.
+
+Índice invertido propio (SearchEntry) en lugar de FTS de PostgreSQL para que
+funcione igual en SQLite. Cada documento se trocea en términos normalizados
+(minúsculas, sin acentos) y se guarda una fila por término con un peso
+(frecuencia × peso del campo). Una búsqueda exige todos los términos y ordena
+por la suma de pesos. Las señales de core/signals.py mantienen el índice; lo
+que se escribe con bulk_create se indexa con reindex() o con
+'manage.py rebuild_search_index'.
+"""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import Comment, Membership, Project, SearchEntry, Task
+
+TOKEN_RE = re.compile(r'\w+')
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+MAX_WEIGHT = 100
+# Peso por campo: coincidir en el título pesa más que en la descripción
+TITLE_WEIGHT = 3
+BODY_WEIGHT = 1
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(normalize(text))
+        if len(token) >= MIN_TERM_LENGTH
+    ]
+
+
+def _weights(*fields):
+    """ fields: pares (texto, peso del campo). Devuelve {término: peso}. """
+    weights = Counter()
+    for text, field_weight in fields:
+        for term in tokenize(text):
+            weights[term] += field_weight
+    return {term: min(weight, MAX_WEIGHT) for term, weight in weights.items()}
+
+
+def _document(kind, obj, workspace_id):
+    if kind == SearchEntry.Kind.TASK:
+        weights = _weights((obj.title, TITLE_WEIGHT), (obj.description, BODY_WEIGHT))
+    elif kind == SearchEntry.Kind.PROJECT:
+        weights = _weights((obj.name, TITLE_WEIGHT), (obj.description, BODY_WEIGHT))
+    else:
+        weights = _weights((obj.text, BODY_WEIGHT))
+    return [
+        SearchEntry(term=term, kind=kind, object_id=obj.pk, workspace_id=workspace_id, weight=weight)
+        for term, weight in weights.items()
+    ]
+
+
+def kind_for(instance):
+    return {
+        Task: SearchEntry.Kind.TASK,
+        Comment: SearchEntry.Kind.COMMENT,
+        Project: SearchEntry.Kind.PROJECT,
+    }[type(instance)]
+
+
+def workspace_id_for(instance):
+    if isinstance(instance, Project):
+        return instance.workspace_id
+    if isinstance(instance, Task):
+        return Project.objects.filter(pk=instance.project_id).values_list('workspace_id', flat=True).get()
+    return Task.objects.filter(pk=instance.task_id).values_list('project__workspace_id', flat=True).get()
+
+
+def index_instance(instance):
+    """ Reindexa un documento: borra sus términos y los vuelve a insertar. """
+    kind = kind_for(instance)
+    entries = _document(kind, instance, workspace_id_for(instance))
+    with transaction.atomic():
+        SearchEntry.objects.filter(kind=kind, object_id=instance.pk).delete()
+        SearchEntry.objects.bulk_create(entries)
+
+
+def remove_instance(instance):
+    SearchEntry.objects.filter(kind=kind_for(instance), object_id=instance.pk).delete()
+
+
+SOURCES = {
+    SearchEntry.Kind.PROJECT: (Project.objects.only('name', 'description', 'workspace_id'), 'workspace_id'),
+    SearchEntry.Kind.TASK: (Task.objects.only('title', 'description'), 'project__workspace_id'),
+    SearchEntry.Kind.COMMENT: (Comment.objects.only('text'), 'task__project__workspace_id'),
+}
+
+
+def _bulk_index(kind, queryset, batch_size):
+    """ Inserta por lotes los términos de los documentos del queryset. """
+    _, workspace_path = SOURCES[kind]
+    queryset = queryset.annotate(indexed_workspace=F(workspace_path)).order_by()
+    documents = 0
+    entries = []
+    for obj in queryset.iterator(chunk_size=batch_size):
+        entries.extend(_document(kind, obj, obj.indexed_workspace))
+        documents += 1
+        if len(entries) >= batch_size:
+            SearchEntry.objects.bulk_create(entries, batch_size=batch_size)
+            entries = []
+    SearchEntry.objects.bulk_create(entries, batch_size=batch_size)
+    return documents
+
+
+def rebuild(workspace_ids=None, batch_size=2000):
+    """
+    Reconstruye el índice (todo o solo algunos workspaces) por lotes, con
+    memoria acotada. Devuelve el número de documentos indexados.
+    """
+    existing = SearchEntry.objects.all()
+    if workspace_ids is not None:
+        existing = existing.filter(workspace_id__in=workspace_ids)
+    existing.delete()
+
+    documents = 0
+    for kind, (queryset, workspace_path) in SOURCES.items():
+        if workspace_ids is not None:
+            queryset = queryset.filter(**{f'{workspace_path}__in': workspace_ids})
+        documents += _bulk_index(kind, queryset, batch_size)
+    return documents
+
+
+def reindex(kind, object_ids, batch_size=2000):
+    """ Reindexa un conjunto de documentos escritos con bulk_create/update(). """
+    SearchEntry.objects.filter(kind=kind, object_id__in=object_ids).delete()
+    queryset, _ = SOURCES[kind]
+    return _bulk_index(kind, queryset.filter(pk__in=object_ids), batch_size)
+
+
+def search(user, query):
+    """
+    Documentos que contienen todos los términos de 'query', limitados a los
+    workspaces del usuario, como filas {'kind', 'object_id', 'score'}
+    ordenadas por relevancia. Es un queryset: se pagina con Paginator.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return SearchEntry.objects.none().values('kind', 'object_id')
+    workspaces = Membership.objects.filter(user=user).values('workspace_id')
+    return (
+        SearchEntry.objects
+        .filter(term__in=terms, workspace__in=workspaces)
+        .values('kind', 'object_id')
+        .annotate(matched=Count('term'), score=Sum('weight'))
+        .filter(matched=len(terms))
+        .order_by('-score', '-object_id')
+    )
+
+
+def hydrate(rows):
+    """ Carga los objetos de una página de resultados (una consulta por tipo). """
+    ids = defaultdict(list)
+    for row in rows:
+        ids[row['kind']].append(row['object_id'])
+    loaded = {
+        # Las tareas y comentarios de proyectos pendientes de borrar no se muestran
+        SearchEntry.Kind.TASK: Task.objects.filter(project__deleted_at__isnull=True)
+        .select_related('project__workspace').in_bulk(ids[SearchEntry.Kind.TASK]),
+        SearchEntry.Kind.COMMENT: Comment.objects.filter(task__project__deleted_at__isnull=True)
+        .select_related('author', 'task__project__workspace').in_bulk(ids[SearchEntry.Kind.COMMENT]),
+        SearchEntry.Kind.PROJECT: Project.objects.select_related('workspace').in_bulk(ids[SearchEntry.Kind.PROJECT]),
+    }
+    results = []
+    for row in rows:
+        obj = loaded[row['kind']].get(row['object_id'])
+        if obj is not None:
+            results.append({'kind': row['kind'], 'object': obj, 'score': row['score']})
+    return results
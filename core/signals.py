@@ -0,0 +1,78 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import search, versions
+from .middleware import collect_queries
+from .models import Attachment, Comment, Project, StoredFile, Task, TaskTransition
+
+
+@receiver(connection_created)
+def install_query_collector(sender, connection, **kwargs):
+    """ Las métricas por petición (core/middleware.py) leen las consultas de cada conexión, en cualquier hilo. """
+    # connection_created se repite en cada reconexión del mismo DatabaseWrapper
+    if collect_queries not in connection.execute_wrappers:
+        # Al principio: execute_wrapper() quita el último de la lista al salir
+        connection.execute_wrappers.insert(0, collect_queries)
+
+
+@receiver(post_delete, sender=Attachment)
+def release_attachment_blob(sender, instance, **kwargs):
+    """ Al borrar un adjunto (también en cascada) se libera su contenido deduplicado. """
+    if instance.blob_id:
+        StoredFile(pk=instance.blob_id).release()
+
+
+# --- Índice de la búsqueda global (ver core/search.py) ---
+SEARCH_FIELDS = {
+    Task: {'title', 'description'},
+    Comment: {'text'},
+    Project: {'name', 'description'},
+}
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Project)
+def index_search_document(sender, instance, created, update_fields=None, **kwargs):
+    # Un save(update_fields=['status']) no cambia el texto: no hace falta reindexar
+    if update_fields and not SEARCH_FIELDS[sender] & set(update_fields):
+        return
+    search.index_instance(instance)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Project)
+def remove_search_document(sender, instance, **kwargs):
+    search.remove_instance(instance)
+
+
+# --- Versión de los datos de cada proyecto (ver core/versions.py) ---
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def bump_project_version(sender, instance, **kwargs):
+    versions.bump_project(instance.project_id)
+
+
+@receiver(m2m_changed, sender=Task.predecessors.through)
+def bump_project_version_on_dependencies(sender, instance, action, **kwargs):
+    # Relación de Task consigo misma: 'instance' es siempre una tarea del proyecto
+    if action.startswith('post_'):
+        versions.bump_project(instance.project_id)
+
+
+# --- Historial de estados (ver TaskTransition y core/flow.py) ---
+@receiver(post_save, sender=Task)
+def record_status_transition(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and 'status' not in update_fields:
+        return
+    if created:
+        from_status = ''
+    elif getattr(instance, '_loaded_status', None) in (None, instance.status):
+        # Sin cambios, o sin estado de partida conocido (instancia no cargada de la BD o con 'status' diferido)
+        return
+    else:
+        from_status = instance._loaded_status
+    TaskTransition.for_change(instance, from_status, actor=instance.changed_by).save()
+    instance._loaded_status = instance.status
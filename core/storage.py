@@ -0,0 +1,63 @@
+"""
+Almacenamiento direccionado por contenido para los archivos adjuntos.
+
+Cada archivo se guarda una sola vez bajo su SHA-256 ('blobs/ab/cd/<sha256>');
+los Attachment que suben el mismo contenido comparten el mismo StoredFile.
+"""
+import hashlib
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def blob_path(sha256):
+    return f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def hash_file(content):
+    """ Calcula el SHA-256 leyendo el archivo por partes (memoria constante). """
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """ El nombre es el hash: si el archivo ya existe no se vuelve a escribir. """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+def content_addressed_storage():
+    return ContentAddressedStorage()
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Escribe cada subida por partes en un archivo temporal y calcula su SHA-256
+    al mismo tiempo, así no hace falta releer el archivo para deduplicarlo.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.sha256 = self.digest.hexdigest()
+        return uploaded
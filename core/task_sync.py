@@ -0,0 +1,263 @@
+"""
+Sincronización idempotente de tareas desde sistemas externos.
+
+Cada registro se identifica por su 'external_id' dentro del proyecto: repetir
+el mismo lote (por ejemplo tras un timeout) actualiza las mismas tareas en vez
+de duplicarlas. Todo el lote se escribe con un número fijo de consultas:
+
+1. Validación con los miembros y las tareas existentes cargados de una vez.
+2. Upsert con bulk_create(update_conflicts=True) sobre (project, external_id).
+3. Reconciliación de predecesoras: se calculan las aristas a añadir y a quitar
+   y se aplican con un bulk_create y un delete. Los registros que cerrarían un
+   ciclo (con el lote o con las dependencias ya guardadas) se rechazan: el
+   orden topológico de la planificación y la previsión los descartaría.
+
+Los registros con errores se omiten y se informan; el resto se aplica en una
+sola transacción, junto con su evento de la bandeja de salida (core/events.py).
+"""
+from collections import defaultdict
+from datetime import date
+
+import shortuuid
+from django.db import transaction
+from django.utils.text import slugify
+
+from . import events, search, versions
+from .models import DomainEvent, SearchEntry, Task, TaskTransition
+from .scheduling import topological_order
+
+UPDATE_FIELDS = ['title', 'description', 'status', 'priority', 'assignee', 'start_date', 'due_date', 'estimated_hours']
+BATCH_SIZE = 500
+
+
+def _parse_date(value, field, errors):
+    if value in (None, ''):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        errors[field] = 'Fecha no válida (AAAA-MM-DD).'
+        return None
+
+
+def _validate(record, member_ids, seen):
+    """ Devuelve (datos limpios, errores) de un registro. """
+    errors = {}
+    if not isinstance(record, dict):
+        return None, {'record': 'Cada registro debe ser un objeto JSON.'}
+
+    external_id = record.get('external_id')
+    if not isinstance(external_id, (str, int)) or not str(external_id).strip():
+        errors['external_id'] = 'Obligatorio.'
+    else:
+        external_id = str(external_id).strip()
+        if len(external_id) > 100:
+            errors['external_id'] = 'Máximo 100 caracteres.'
+        elif external_id in seen:
+            errors['external_id'] = 'Repetido en el lote.'
+
+    title = record.get('title')
+    if not isinstance(title, str) or not title.strip():
+        errors['title'] = 'Obligatorio.'
+    elif len(title) > 250:
+        errors['title'] = 'Máximo 250 caracteres.'
+
+    status = record.get('status', Task.Status.BACKLOG)
+    if status not in Task.Status.values:
+        errors['status'] = f'Valores posibles: {", ".join(Task.Status.values)}.'
+    priority = record.get('priority', Task.Priority.MEDIUM)
+    if priority not in Task.Priority.values:
+        errors['priority'] = f'Valores posibles: {", ".join(Task.Priority.values)}.'
+
+    assignee = record.get('assignee')
+    if assignee is not None and (type(assignee) is not int or assignee not in member_ids):
+        errors['assignee'] = 'No es miembro del workspace.'
+    description = record.get('description')
+    if description is not None and not isinstance(description, str):
+        errors['description'] = 'Debe ser texto.'
+
+    start_date = _parse_date(record.get('start_date'), 'start_date', errors)
+    due_date = _parse_date(record.get('due_date'), 'due_date', errors)
+    estimated_hours = record.get('estimated_hours')
+    if estimated_hours is not None and (type(estimated_hours) is not int or estimated_hours < 0):
+        errors['estimated_hours'] = 'Debe ser un entero positivo.'
+
+    predecessors = record.get('predecessors')
+    if predecessors is not None:
+        if not isinstance(predecessors, list) or not all(isinstance(p, (str, int)) for p in predecessors):
+            errors['predecessors'] = 'Debe ser una lista de external_id.'
+        else:
+            predecessors = [str(p) for p in predecessors]
+            if 'external_id' not in errors and external_id in predecessors:
+                errors['predecessors'] = 'Una tarea no puede depender de sí misma.'
+
+    if errors:
+        return None, errors
+    return {
+        'external_id': external_id,
+        'title': title.strip(),
+        'description': description or '',
+        'status': status,
+        'priority': priority,
+        'assignee_id': assignee,
+        'start_date': start_date,
+        'due_date': due_date,
+        'estimated_hours': estimated_hours,
+        'predecessors': predecessors,
+    }, {}
+
+
+def upsert_tasks(project, records, actor=None):
+    """
+    Crea o actualiza las tareas de 'records' en 'project' ('actor' queda como
+    autor de los cambios de estado y del evento TASKS_SYNCED). Devuelve una
+    lista de resultados por registro, en el mismo orden:
+    {'external_id', 'result': 'created' | 'updated' | 'error', 'id' | 'errors'}.
+    """
+    member_ids = set(project.workspace.members.values_list('pk', flat=True))
+    results = []
+    pending = []  # (datos, resultado) de los registros válidos
+    seen = set()
+    for record in records:
+        data, errors = _validate(record, member_ids, seen)
+        if errors:
+            external_id = record.get('external_id') if isinstance(record, dict) else None
+            results.append({'external_id': external_id, 'result': 'error', 'errors': errors})
+            continue
+        seen.add(data['external_id'])
+        result = {'external_id': data['external_id']}
+        results.append(result)
+        pending.append((data, result))
+
+    with transaction.atomic():
+        # Las predecesoras pueden venir en el mismo lote o existir ya en el proyecto
+        referenced = {p for data, _ in pending for p in data['predecessors'] or ()}
+        existing, previous_status = {}, {}
+        rows = Task.objects.filter(project=project, external_id__in=seen | referenced).values_list('external_id', 'pk', 'status')
+        for external_id, pk, status in rows:
+            existing[external_id] = pk
+            previous_status[pk] = status
+        # Aristas ya guardadas, solo si el lote cambia alguna (detección de ciclos)
+        stored_edges = []
+        if any(data['predecessors'] for data, _ in pending):
+            stored_edges = list(
+                Task.predecessors.through.objects.filter(from_task__project=project).values_list('from_task_id', 'to_task_id')
+            )
+        # Si una predecesora falla, también fallan las tareas que dependen de ella
+        valid = pending
+        while True:
+            available = set(existing) | {data['external_id'] for data, _ in valid}
+            cyclic = _cyclic([data for data, _ in valid], existing, stored_edges)
+            still_valid = []
+            for data, result in valid:
+                missing = sorted(set(data['predecessors'] or ()) - available)
+                if missing:
+                    result.update(result='error', errors={'predecessors': f'external_id desconocidos: {", ".join(missing)}.'})
+                elif data['external_id'] in cyclic:
+                    result.update(result='error', errors={'predecessors': 'Las dependencias forman un ciclo.'})
+                else:
+                    still_valid.append((data, result))
+            if len(still_valid) == len(valid):
+                break
+            valid = still_valid
+
+        tasks = [
+            Task(
+                project=project,
+                slug=f'{slugify(data["title"])[:240]}-{shortuuid.uuid()[:6]}',
+                **{field: data[field] for field in ('external_id', 'title', 'description', 'status',
+                                                     'priority', 'assignee_id', 'start_date', 'due_date',
+                                                     'estimated_hours')},
+            )
+            for data, _ in valid
+        ]
+        Task.objects.bulk_create(
+            tasks,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['project', 'external_id'],
+            update_fields=UPDATE_FIELDS,
+        )
+
+        # Ids definitivos (creadas y actualizadas) con una sola consulta
+        ids = dict(
+            Task.objects.filter(project=project, external_id__in=[data['external_id'] for data, _ in valid])
+            .values_list('external_id', 'pk')
+        )
+        for data, result in valid:
+            result['result'] = 'updated' if data['external_id'] in existing else 'created'
+            result['id'] = ids[data['external_id']]
+        existing.update(ids)
+
+        # bulk_create tampoco dispara la señal del historial de estados
+        TaskTransition.objects.bulk_create(
+            [
+                TaskTransition(
+                    task_id=result['id'], project_id=project.pk, from_status=previous_status.get(result['id'], ''),
+                    to_status=data['status'], actor=actor,
+                )
+                for data, result in valid
+                if previous_status.get(result['id']) != data['status']
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        _reconcile_predecessors([data for data, _ in valid], existing)
+        # bulk_create no dispara las señales del índice de búsqueda
+        search.reindex(SearchEntry.Kind.TASK, list(ids.values()), batch_size=BATCH_SIZE)
+        if valid and actor is not None:
+            events.record(DomainEvent.Kind.TASKS_SYNCED, actor, target=project, project=project, count=len(valid))
+    if valid:
+        versions.bump_project(project.pk)
+    return results
+
+
+def _cyclic(valid, existing, stored_edges):
+    """
+    external_id de los registros que, con sus predecesoras, quedarían en un
+    ciclo (o detrás de uno): las que el orden topológico no puede colocar.
+    """
+    def node(external_id):
+        # Las tareas ya guardadas se identifican por id; las nuevas, por external_id
+        return ('task', existing[external_id]) if external_id in existing else ('new', external_id)
+
+    replaced = {node(data['external_id']) for data in valid if data['predecessors'] is not None}
+    predecessors_of = defaultdict(set)
+    for task_id, predecessor_id in stored_edges:
+        if ('task', task_id) not in replaced:
+            predecessors_of['task', task_id].add(('task', predecessor_id))
+    for data in valid:
+        if data['predecessors'] is not None:
+            predecessors_of[node(data['external_id'])] = {node(p) for p in data['predecessors']}
+    nodes = {node(data['external_id']) for data in valid} | set(predecessors_of)
+    nodes |= set().union(*predecessors_of.values())
+    ordered = set(topological_order(nodes, predecessors_of))
+    return {data['external_id'] for data in valid if node(data['external_id']) not in ordered}
+
+
+def _reconcile_predecessors(valid, ids_by_external_id):
+    """ Deja las predecesoras de cada tarea del lote exactamente como se enviaron. """
+    desired = {
+        ids_by_external_id[data['external_id']]: {ids_by_external_id[p] for p in data['predecessors']}
+        for data in valid if data['predecessors'] is not None
+    }
+    if not desired:
+        return
+    Edge = Task.predecessors.through
+    current = Edge.objects.filter(from_task_id__in=desired).values_list('pk', 'from_task_id', 'to_task_id')
+
+    to_delete = []
+    present = set()
+    for edge_id, task_id, predecessor_id in current.iterator(chunk_size=BATCH_SIZE):
+        if predecessor_id in desired[task_id]:
+            present.add((task_id, predecessor_id))
+        else:
+            to_delete.append(edge_id)
+    to_add = [
+        Edge(from_task_id=task_id, to_task_id=predecessor_id)
+        for task_id, predecessors in desired.items()
+        for predecessor_id in predecessors
+        if (task_id, predecessor_id) not in present
+    ]
+    for start in range(0, len(to_delete), BATCH_SIZE):
+        Edge.objects.filter(pk__in=to_delete[start:start + BATCH_SIZE]).delete()
+    Edge.objects.bulk_create(to_add, batch_size=BATCH_SIZE)
@@ -12,5 +12,5 @@ def unread_notifications_count(context):
     """ Obtiene el numero de notificaciones no leídas del usuario actual. """
     request = context.get('request')
     if request and request.user.is_authenticated:
-        return request.user.notifications.filter(read=False).count()
+        return request.user.notifications.live().filter(read=False).count()
     return 0
\ No newline at end of file
@@ -1,3 +1,1922 @@
-from django.test import TestCase
+import gzip
+import logging
+import importlib.util
+import json
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.handlers.asgi import ASGIHandler
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import archive, capacity, deletion, events, flow, forecasting, perf, previews, scheduling, transfer, urls as core_urls
+from .middleware import REPLICA_PIN_SESSION_KEY, PerfInstrumentationMiddleware, ReplicaRoutingMiddleware
+from .models import Workspace, Membership, Project, Task, Comment, Attachment, StoredFile, Notification, Activity, DomainEvent, DeletionJob, ProjectArchive, TimeLog, User, SearchEntry, TaskTransition, Invitation, Role
+from .routers import ReplicaRouter, read_from_replica, replica_read
+from .forms import TaskForm
+from .views import ProjectReportsView, update_task_status
+
+
+class WorkspaceTestCase(TestCase):
+    """
+    Base de las pruebas sobre un workspace: 'dev' (Ana) es miembro de 'Equipo',
+    que tiene el proyecto 'Proyecto'. Con separate_owner el workspace es de
+    'owner', también miembro; si no, de 'dev' (y self.owner es self.user).
+    """
+    separate_owner = False
+    project_options = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='dev', email='dev@example.com', password='x', first_name='Ana')
+        cls.owner = cls.user
+        if cls.separate_owner:
+            cls.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        cls.workspace = Workspace.objects.create(name='Equipo', owner=cls.owner)
+        members = [cls.owner, cls.user] if cls.separate_owner else [cls.user]
+        Membership.objects.bulk_create(Membership(user=user, workspace=cls.workspace) for user in members)
+        cls.project = Project.objects.create(workspace=cls.workspace, **{'name': 'Proyecto', **cls.project_options})
+
+    def setUp(self):
+        cache.clear()
+
+    def use_temp_media(self, **extra):
+        """ MEDIA_ROOT en un directorio temporal, sin estadísticas de rendimiento ni previews en procesos. """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        overrides = override_settings(MEDIA_ROOT=self.tmp.name, PERF_STATS_DIR='', ATTACHMENT_PREVIEW_WORKERS=0, **extra)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+
+class HotPathIndexTests(WorkspaceTestCase):
+    """
+    Verifica con EXPLAIN que las consultas calientes usan los índices de la
+    migración 0017. En PostgreSQL se desactiva el seq scan para que el plan no
+    dependa del tamaño de las tablas de prueba; en SQLite se lee el
+    'EXPLAIN QUERY PLAN', que también nombra el índice usado.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.task = Task.objects.create(project=cls.project, title='Tarea', assignee=cls.user)
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor == 'postgresql':
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                plan = queryset.explain()
+        elif connection.vendor == 'sqlite':
+            plan = queryset.explain()
+        else:
+            self.skipTest(f'Sin verificación de plan para {connection.vendor}.')
+        self.assertIn(index_name, plan)
+
+    def test_task_project_status(self):
+        qs = Task.objects.filter(project=self.project, status=Task.Status.TODO)
+        self.assertUsesIndex(qs, 'task_project_status_idx')
+
+    def test_task_assignee_status_due_date(self):
+        qs = Task.objects.filter(assignee=self.user, status=Task.Status.TODO).order_by('due_date')
+        self.assertUsesIndex(qs, 'task_assignee_status_due_idx')
+
+    def test_notification_unread(self):
+        qs = Notification.objects.filter(recipient=self.user, read=False)
+        self.assertUsesIndex(qs, 'notif_unread_idx')
+
+    def test_notification_list(self):
+        qs = Notification.objects.filter(recipient=self.user).order_by('-created_at')
+        self.assertUsesIndex(qs, 'notif_recipient_created_idx')
+
+    def test_activity_project_created_at(self):
+        qs = Activity.objects.filter(project=self.project).order_by('-created_at')
+        self.assertUsesIndex(qs, 'activity_project_created_idx')
+
+    def test_running_timelog(self):
+        qs = TimeLog.objects.filter(task=self.task, user=self.user, end_time__isnull=True)
+        self.assertUsesIndex(qs, 'timelog_running_idx')
+
+    def test_only_one_running_timer_per_user(self):
+        other_task = Task.objects.create(project=self.project, title='Otra tarea')
+        TimeLog.objects.create(task=self.task, user=self.user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TimeLog.objects.create(task=other_task, user=self.user)
+
+    def test_finished_timers_are_not_limited(self):
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now())
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now())
+        TimeLog.objects.create(task=self.task, user=self.user)
+        self.assertEqual(TimeLog.objects.filter(user=self.user).count(), 3)
+
+
+@mock.patch('core.routers.replica_available', return_value=True)
+@mock.patch('core.middleware.replica_available', return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    """ Lecturas de vistas de solo lectura a la réplica; escrituras al primario. """
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def _request(self, method='get'):
+        request = getattr(self.factory, method)('/')
+        request.session = SessionStore()
+        return request
+
+    def _run(self, request, view_func, writes=False):
+        """ Ejecuta el middleware y devuelve la base elegida para leer dentro de la vista. """
+        seen = {}
+
+        def get_response(req):
+            middleware.process_view(req, view_func, (), {})
+            seen['db'] = self.router.db_for_read(Task)
+            if writes:
+                self.router.db_for_write(Task)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        middleware(request)
+        return seen['db']
+
+    async def _arun(self, request, view_func, writes=False):
+        """ Igual que _run, con la cadena de middleware en modo asíncrono. """
+        seen = {}
+
+        async def get_response(req):
+            await middleware.process_view(req, view_func, (), {})
+            seen['db'] = self.router.db_for_read(Task)
+            if writes:
+                # Como el ORM de una vista asíncrona: en el hilo de sync_to_async
+                await sync_to_async(self.router.db_for_write)(Task)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        await middleware(request)
+        return seen['db']
+
+    def test_read_from_replica_context(self, *mocks):
+        self.assertEqual(self.router.db_for_read(Task), 'default')
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Task), 'replica')
+            self.assertEqual(self.router.db_for_write(Task), 'default')
+            # Después de escribir, las lecturas vuelven al primario
+            self.assertEqual(self.router.db_for_read(Task), 'default')
+
+    def test_read_only_views_use_replica(self, *mocks):
+        self.assertEqual(self._run(self._request(), ProjectReportsView.as_view()), 'replica')
+        self.assertEqual(self._run(self._request(), replica_read(lambda request: None)), 'replica')
+
+    def test_other_views_use_primary(self, *mocks):
+        self.assertEqual(self._run(self._request(), update_task_status), 'default')
+        self.assertEqual(self._run(self._request('post'), ProjectReportsView.as_view()), 'default')
+
+    def test_session_sticks_to_primary_after_write(self, *mocks):
+        post = self._request('post')
+        self._run(post, update_task_status, writes=True)
+
+        get = self._request()
+        get.session = post.session
+        self.assertEqual(self._run(get, ProjectReportsView.as_view()), 'default')
+
+    def test_pin_follows_the_writes_not_the_method(self, *mocks):
+        # Un GET que escribe (marcar notificaciones como leídas) también fija la sesión
+        get = self._request()
+        self._run(get, ProjectReportsView.as_view(), writes=True)
+        self.assertIn(REPLICA_PIN_SESSION_KEY, get.session)
+
+        post = self._request('post')
+        self._run(post, update_task_status)
+        self.assertNotIn(REPLICA_PIN_SESSION_KEY, post.session)
+
+    async def test_async_mode_routes_and_pins_the_same_way(self, *mocks):
+        self.assertEqual(await self._arun(self._request(), ProjectReportsView.as_view()), 'replica')
+        self.assertEqual(await self._arun(self._request('post'), ProjectReportsView.as_view()), 'default')
+
+        post = self._request('post')
+        await self._arun(post, update_task_status, writes=True)
+        get = self._request()
+        get.session = post.session
+        self.assertEqual(await self._arun(get, ProjectReportsView.as_view()), 'default')
+
+
+@override_settings(PERF_STATS_DIR='', PERF_INSTRUMENTATION_ENABLED=True)
+class PerfInstrumentationTests(TestCase):
+    """ El middleware agrega consultas y latencia por nombre de URL. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', email='staff@example.com', password='x', is_staff=True)
+        cls.user = User.objects.create_user(username='dev', email='dev@example.com', password='x')
+
+    def setUp(self):
+        perf.stats = perf.PerfStats()
+
+    def test_records_metrics_per_url_name(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('core:workspace_list'))
+        self.client.get(reverse('core:workspace_list'))
+
+        summary = {row['view']: row for row in perf.summarize(perf.stats.snapshot())}
+        row = summary['core:workspace_list']
+        self.assertEqual(row['requests'], 2)
+        self.assertGreater(row['avg_queries'], 0)
+        self.assertGreater(row['avg_bytes'], 0)
+        self.assertIsNotNone(row['slowest_sql'])
+
+    async def test_async_views_are_measured_in_async_mode(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(PerfInstrumentationMiddleware(get_response)))
+
+        # Las consultas de la vista asíncrona corren en el hilo de sync_to_async
+        await self.async_client.aforce_login(self.user)
+        await self.async_client.get(reverse('core:notification_count'))
+        summary = {row['view']: row for row in perf.summarize(perf.stats.snapshot())}
+        self.assertGreater(summary['core:notification_count']['avg_queries'], 0)
+
+    def test_streaming_responses_are_measured_until_sent(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('core:api_project_list'))
+            # Las filas se leen al enviar el cuerpo: hasta entonces no se registra nada
+            self.assertNotIn('core:api_project_list', perf.stats.snapshot())
+            body = b''.join(response.streaming_content)
+
+        row = {row['view']: row for row in perf.summarize(perf.stats.snapshot())}['core:api_project_list']
+        self.assertEqual(row['avg_bytes'], len(body))
+        self.assertEqual(row['avg_queries'], len(queries))
+
+    async def test_async_streaming_responses_are_measured_until_sent(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('core:api_project_list'))
+        body = b''.join([part async for part in response.streaming_content])
+
+        row = {row['view']: row for row in perf.summarize(perf.stats.snapshot())}['core:api_project_list']
+        self.assertEqual(row['avg_bytes'], len(body))
+
+    def test_report_sorts_by_a_known_column(self):
+        perf.stats.record('lenta', 6000, 0, 0, 1, None, 0, 0)
+        perf.stats.record('rapida', 3, 0, 0, 9, None, 0, 0)
+        with tempfile.TemporaryDirectory() as directory, self.settings(PERF_STATS_DIR=directory):
+            perf.stats.flush(directory)
+            out = StringIO()
+            call_command('perf_report', '--sort', 'p95_ms', '--json', stdout=out)
+            self.assertEqual([row['view'] for row in json.loads(out.getvalue())], ['lenta', 'rapida'])
+            out = StringIO()
+            call_command('perf_report', '--sort', 'avg_queries', '--json', stdout=out)
+            self.assertEqual([row['view'] for row in json.loads(out.getvalue())], ['rapida', 'lenta'])
+            with self.assertRaisesMessage(CommandError, 'Columna de orden desconocida: p95'):
+                call_command('perf_report', '--sort', 'p95')
+
+    @override_settings(PERF_QUERY_BUDGET=0)
+    def test_logs_when_query_budget_exceeded(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('core.perf', level='WARNING'):
+            self.client.get(reverse('core:workspace_list'))
+
+    def test_endpoint_is_staff_only(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('core:perf_stats')).status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('core:perf_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('views', response.json())
+
+
+@override_settings(PERF_STATS_DIR='')
+class PerfBenchmarkTests(TestCase):
+    """ seed_perf genera datos deterministas y bench_views mide todas las URLs. """
+
+    def test_seed_is_deterministic_and_benchmark_covers_all_urls(self):
+        call_command('seed_perf', workspaces=1, members=3, projects=1, tasks=10, notifications=2, seed=7, stdout=StringIO())
+        first = list(Task.objects.order_by('id').values_list('status', 'priority', 'due_date'))
+        call_command('seed_perf', workspaces=1, members=3, projects=1, tasks=10, notifications=2, seed=7, clear=True, stdout=StringIO())
+        second = list(Task.objects.order_by('id').values_list('status', 'priority', 'due_date'))
+        self.assertEqual(first, second)
+
+        with tempfile.TemporaryDirectory() as tmp, self.settings(CHUNKED_UPLOAD_DIR=Path(tmp)):
+            baseline = Path(tmp) / 'baseline.json'
+            call_command('bench_views', baseline=str(baseline), repeat=2, stdout=StringIO())
+            results = json.loads(baseline.read_text())
+            # Las subidas creadas en cada ronda se revierten junto con sus ficheros temporales
+            self.assertEqual(list(Path(tmp).glob('*.part')), [])
+        self.assertEqual(set(results), {p.name for p in core_urls.urlpatterns})
+
+
+class ProfilingTests(TestCase):
+    """ Perfilado bajo demanda: solo staff, opcional y con descarga de resultados. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', email='staff@example.com', password='x', is_staff=True)
+        cls.user = User.objects.create_user(username='dev', email='dev@example.com', password='x')
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        overrides = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.tmp.name, PERF_STATS_DIR='')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_staff_request_is_profiled(self):
+        self.client.force_login(self.staff)
+        for mode, suffix in (('cprofile', '.prof'), ('sample', '.speedscope.json')):
+            response = self.client.get(reverse('core:workspace_list'), HTTP_X_PROFILE=mode)
+            name = response['X-Profile-Id']
+            self.assertTrue((Path(self.tmp.name) / f'{name}{suffix}').is_file())
+            sql_log = json.loads((Path(self.tmp.name) / f'{name}.sql.json').read_text())
+            self.assertTrue(sql_log['queries'])
+
+        listing = self.client.get(reverse('core:profile_list'))
+        self.assertEqual(len(listing.context['profiles']), 2)
+        download = self.client.get(reverse('core:profile_download', args=[listing.context['profiles'][0]['sql_file']]))
+        self.assertEqual(download.status_code, 200)
+
+    async def test_async_request_profiles_the_loop_and_the_sync_thread(self):
+        await self.async_client.aforce_login(self.staff)
+        for mode, suffix in (('cprofile', '.prof'), ('sample', '.speedscope.json')):
+            response = await self.async_client.get(reverse('core:notification_count'), headers={'X-Profile': mode})
+            name = response['X-Profile-Id']
+            self.assertTrue((Path(self.tmp.name) / f'{name}{suffix}').is_file())
+            sql_log = json.loads((Path(self.tmp.name) / f'{name}.sql.json').read_text())
+            self.assertTrue(sql_log['queries'])
+
+        speedscope = json.loads((Path(self.tmp.name) / f'{name}.speedscope.json').read_text())
+        self.assertEqual(
+            [profile['name'] for profile in speedscope['profiles']],
+            [f'GET {reverse("core:notification_count")} (bucle de eventos)',
+             f'GET {reverse("core:notification_count")} (hilo síncrono)'],
+        )
+
+    def test_asgi_middleware_chain_is_not_adapted_to_sync(self):
+        with override_settings(DEBUG=True), self.assertLogs('django.request', 'DEBUG') as logs:
+            logging.getLogger('django.request').debug('cadena cargada')
+            ASGIHandler()
+        self.assertFalse([line for line in logs.output if 'adapted' in line], logs.output)
+
+    def test_non_staff_request_is_not_profiled(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:workspace_list') + '?_profile=cprofile')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.client.get(reverse('core:profile_list')).status_code, 302)
+
+    @override_settings(PROFILING_MAX_PER_MINUTE=1)
+    def test_rate_limited(self):
+        cache.clear()
+        self.client.force_login(self.staff)
+        first = self.client.get(reverse('core:workspace_list'), HTTP_X_PROFILE='cprofile')
+        second = self.client.get(reverse('core:workspace_list'), HTTP_X_PROFILE='cprofile')
+        self.assertIn('X-Profile-Id', first)
+        self.assertNotIn('X-Profile-Id', second)
+
+
+class AttachmentStorageTests(WorkspaceTestCase):
+    """ Adjuntos deduplicados por SHA-256, subida reanudable, descarga protegida y previews. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.task = Task.objects.create(project=cls.project, title='Tarea')
+
+    def setUp(self):
+        super().setUp()
+        self.use_temp_media(CHUNKED_UPLOAD_CHUNK_SIZE=4)
+        overrides = override_settings(CHUNKED_UPLOAD_DIR=Path(self.tmp.name) / 'uploads_tmp')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client.force_login(self.user)
+
+    def _comment(self, **data):
+        return self.client.post(reverse('core:add_comment', args=[self.task.pk]), {'text': 'Adjunto', **data})
+
+    def test_same_content_is_stored_once(self):
+        for name in ('spec.pdf', 'spec-copia.pdf'):
+            self.assertEqual(self._comment(file=SimpleUploadedFile(name, b'%PDF contenido')).status_code, 200)
+
+        blob = StoredFile.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(sorted(str(a) for a in Attachment.objects.all()), ['spec-copia.pdf', 'spec.pdf'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attachment.objects.first().delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        path = blob.file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.all().delete()
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(Path(path).exists())
+
+    def test_chunked_upload_is_resumable(self):
+        start = self.client.post(reverse('core:chunked_upload_start'), {'filename': 'grande.bin', 'size': 10}).json()
+        url = reverse('core:chunked_upload_chunk', args=[start['upload_id']])
+
+        put = lambda offset, data: self.client.put(url, data, content_type='application/octet-stream', HTTP_X_UPLOAD_OFFSET=str(offset))
+        self.assertEqual(put(0, b'0123').json()['offset'], 4)
+        # Un offset equivocado devuelve el offset correcto para reanudar
+        conflict = put(0, b'0123')
+        self.assertEqual((conflict.status_code, conflict.json()['offset']), (409, 4))
+        put(4, b'4567')
+        self.assertEqual(self.client.get(url).json()['offset'], 8)
+        self.assertTrue(put(8, b'89').json()['complete'])
+
+        self.assertEqual(self._comment(upload_id=start['upload_id']).status_code, 200)
+        attachment = Attachment.objects.get()
+        self.assertEqual(str(attachment), 'grande.bin')
+        self.assertEqual(attachment.file.read(), b'0123456789')
+
+    def test_download_requires_membership_and_supports_ranges(self):
+        self._comment(file=SimpleUploadedFile('notas.txt', b'0123456789'))
+        attachment = Attachment.objects.get()
+        url = reverse('core:attachment_download', args=[attachment.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['ETag'], f'"{attachment.blob.sha256}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        partial = self.client.get(url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(partial.streaming_content), b'2345')
+        self.assertEqual(b''.join(self.client.get(url, HTTP_RANGE='bytes=-3').streaming_content), b'789')
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=20-').status_code, 416)
+        # If-Range con otro ETag: el archivo cambió, se envía completo
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"otro"').status_code, 200)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        outsider = User.objects.create_user(username='ajeno', email='ajeno@example.com', password='x')
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_download_is_offloaded_to_proxy(self):
+        self._comment(file=SimpleUploadedFile('notas.txt', b'0123456789'))
+        attachment = Attachment.objects.get()
+        url = reverse('core:attachment_download', args=[attachment.pk])
+
+        with self.settings(ATTACHMENT_SENDFILE_BACKEND='nginx', ATTACHMENT_SENDFILE_PREFIX='/protected-media/'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{attachment.blob.file.name}')
+        self.assertEqual(response.content, b'')
+
+        with self.settings(ATTACHMENT_SENDFILE_BACKEND='apache'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Sendfile'], attachment.file.path)
+
+    def test_preview_is_served_with_long_cache(self):
+        self._comment(file=SimpleUploadedFile('foto.png', b'no es una imagen'))
+        attachment = Attachment.objects.get()
+        url = reverse('core:attachment_preview', args=[attachment.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        path = previews.preview_path(attachment.blob.sha256)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b'jpeg')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+        modal = self.client.get(reverse('core:task_detail_update', args=[self.task.pk]))
+        self.assertContains(modal, url)
+
+    @skipUnless(importlib.util.find_spec('PIL'), 'Pillow no está instalado')
+    def test_image_thumbnail_is_generated(self):
+        from PIL import Image
+
+        image = BytesIO()
+        Image.new('RGB', (1200, 800), 'red').save(image, 'PNG')
+        self._comment(file=SimpleUploadedFile('foto.png', image.getvalue()))
+        blob = StoredFile.objects.get()
+
+        self.assertTrue(previews.generate_preview(blob))
+        with Image.open(previews.preview_path(blob.sha256)) as thumbnail:
+            self.assertEqual(max(thumbnail.size), 320)
+
+        # Un archivo que no es imagen queda marcado para no reintentarlo
+        self._comment(file=SimpleUploadedFile('datos.bin', b'\x00\x01'))
+        other = StoredFile.objects.exclude(pk=blob.pk).get()
+        self.assertFalse(previews.generate_preview(other))
+        self.assertFalse(previews.needs_preview(other.sha256))
+
+
+class CommentThreadTests(WorkspaceTestCase):
+    """ Hilo de comentarios del modal paginado por keyset. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.task = Task.objects.create(project=cls.project, title='Tarea')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def _add_comments(self, count):
+        comments = Comment.objects.bulk_create(
+            Comment(task=self.task, author=self.user, text=f'Comentario {i}') for i in range(count)
+        )
+        Attachment.objects.bulk_create(
+            Attachment(comment=comment, uploader=self.user, file=f'attachments/{comment.pk}.txt') for comment in comments
+        )
+
+    def _modal_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('core:task_detail_update', args=[self.task.pk]))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_modal_query_count_is_independent_of_thread_length(self):
+        self._add_comments(3)
+        short_thread = self._modal_queries()
+        self._add_comments(60)
+        self.assertEqual(self._modal_queries(), short_thread)
+
+    def test_load_older_walks_the_whole_thread(self):
+        self._add_comments(45)
+        # Misma fecha para todos: el id desempata el cursor
+        Comment.objects.update(created_at=timezone.now())
+
+        response = self.client.get(reverse('core:task_detail_update', args=[self.task.pk]))
+        seen = [c.pk for c in response.context['comments']]
+        cursor = response.context['older_cursor']
+        while cursor:
+            page = self.client.get(reverse('core:task_comments', args=[self.task.pk]), {'before': cursor})
+            seen = [c.pk for c in page.context['comments']] + seen
+            cursor = page.context['older_cursor']
+
+        self.assertEqual(seen, sorted(Comment.objects.values_list('pk', flat=True)))
+
+    def test_invalid_cursor_is_404(self):
+        url = reverse('core:task_comments', args=[self.task.pk])
+        for cursor in ('abc', '1.2.3', f'{10 ** 30}.1'):
+            self.assertEqual(self.client.get(url, {'before': cursor}).status_code, 404)
+
+
+class TaskPickerAutocompleteTests(WorkspaceTestCase):
+    """ Los selectores de TaskForm no renderizan todas las tareas ni todos los miembros. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.task = Task.objects.create(project=cls.project, title='Tarea', assignee=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def _grow_project(self, tasks, members):
+        Task.objects.bulk_create(Task(project=self.project, title=f'Relleno {i}', slug=f'relleno-{i}') for i in range(tasks))
+        users = User.objects.bulk_create(
+            User(username=f'm{i}', email=f'm{i}@example.com', first_name=f'Miembro {i}') for i in range(members)
+        )
+        Membership.objects.bulk_create(Membership(user=user, workspace=self.workspace) for user in users)
+
+    def _modal(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('core:task_detail_update', args=[self.task.pk]))
+        return len(response.content), len(queries)
+
+    def test_modal_size_is_independent_of_project_size(self):
+        self.task.predecessors.add(Task.objects.create(project=self.project, title='Diseño'))
+        small = self._modal()
+        self._grow_project(tasks=80, members=40)
+        self.assertEqual(self._modal(), small)
+
+    def test_autocomplete_searches_by_prefix_within_scope(self):
+        self._grow_project(tasks=30, members=5)
+        other = Project.objects.create(workspace=Workspace.objects.create(name='Otro', owner=self.user), name='Otro')
+        Task.objects.create(project=other, title='Relleno ajeno')
+
+        url = reverse('core:task_autocomplete', args=[self.project.slug])
+        response = self.client.get(url, {'q': 'relleno 1'})
+        self.assertEqual(len(response.context['results']), 11)  # 'Relleno 1' y 'Relleno 10'..'19'
+        self.assertNotContains(response, 'ajeno')
+        self.assertEqual(len(self.client.get(url, {'q': 'rell'}).context['results']), 20)
+        self.assertNotContains(self.client.get(url, {'q': 'tar', 'exclude': self.task.pk}), '>Tarea<')
+
+        members = self.client.get(reverse('core:member_autocomplete', args=[self.workspace.slug]), {'q': 'miembro 3'})
+        self.assertEqual([label for _, label in members.context['results']], ['Miembro 3'])
+
+        outsider = User.objects.create_user(username='ajeno', email='ajeno@example.com', password='x')
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_submitted_ids_are_validated_against_the_project(self):
+        foreign = Task.objects.create(
+            project=Project.objects.create(workspace=self.workspace, name='Otro'), title='Ajena'
+        )
+        form = TaskForm(
+            {'title': 'Tarea', 'status': Task.Status.BACKLOG, 'priority': self.task.priority, 'predecessors': [foreign.pk]},
+            instance=self.task, project=self.project,
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('predecessors', form.errors)
+
+
+class DashboardWorkspaceListTests(TestCase):
+    """ El dashboard lista los workspaces con contadores anotados y paginados. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='consultor', email='consultor@example.com', password='x')
+        cls.client_owner = User.objects.create_user(username='cliente', email='cliente@example.com', password='x')
+        cls.colleague = User.objects.create_user(username='colega', email='colega@example.com', password='x')
+        own = Workspace.objects.create(name='Propio', owner=cls.user)
+        Membership.objects.create(user=cls.user, workspace=own)
+
+        # Un consultor en muchos workspaces de clientes, cada uno con proyectos y miembros
+        workspaces = Workspace.objects.bulk_create(
+            Workspace(name=f'Cliente {i:03}', slug=f'cliente-{i:03}', owner=cls.client_owner) for i in range(40)
+        )
+        Membership.objects.bulk_create(
+            Membership(user=user, workspace=workspace)
+            for workspace in workspaces for user in (cls.user, cls.client_owner, cls.colleague)
+        )
+        Project.objects.bulk_create(
+            Project(workspace=workspace, name=f'P{i}', slug=f'{workspace.slug}-p{i}')
+            for workspace in workspaces for i in range(3)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_query_count_is_pinned(self):
+        # sesión, usuario, PMO, insignia de notificaciones, borrados en curso, 'mis tareas' y 2 por lista paginada
+        with self.assertNumQueries(10):
+            response = self.client.get(reverse('core:workspace_list'))
+        self.assertEqual(response.status_code, 200)
+
+        shared = response.context['shared_workspaces']
+        self.assertEqual((len(shared), shared.paginator.count), (24, 40))
+        self.assertEqual((shared[0].project_count, shared[0].member_count), (3, 3))
+        self.assertContains(response, '?shared_page=2')
+
+    def test_second_page(self):
+        response = self.client.get(reverse('core:workspace_list'), {'shared_page': 2})
+        self.assertEqual([w.name for w in response.context['shared_workspaces']][:1], ['Cliente 024'])
+        self.assertEqual(response.context['owned_workspaces'][0].member_count, 1)
+
+
+class GlobalSearchTests(WorkspaceTestCase):
+    """ Búsqueda global sobre el índice invertido mantenido por señales. """
+
+    project_options = {'name': 'Migración de facturación'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.task = Task.objects.create(project=cls.project, title='Exportar facturas', description='Formato CSV para contabilidad')
+        cls.comment = Comment.objects.create(task=cls.task, author=cls.user, text='Las facturas rectificativas van aparte')
+
+        stranger = User.objects.create_user(username='otro', email='otro@example.com', password='x')
+        foreign = Project.objects.create(workspace=Workspace.objects.create(name='Ajeno', owner=stranger), name='Facturas ajenas')
+        Task.objects.create(project=foreign, title='Facturas secretas')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def _search(self, query):
+        response = self.client.get(reverse('core:global_search'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [(result['kind'], result['object'].pk) for result in response.context['results']]
+
+    def test_results_are_ranked_and_limited_to_user_workspaces(self):
+        # Sin acentos ni mayúsculas; la tarea (título) pesa más que el comentario
+        self.assertEqual(self._search('FACTURAS'), [('task', self.task.pk), ('comment', self.comment.pk)])
+        self.assertEqual(self._search('migracion'), [('project', self.project.pk)])
+        # Todos los términos deben aparecer
+        self.assertEqual(self._search('facturas csv'), [('task', self.task.pk)])
+        self.assertEqual(self._search(''), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.task.title = 'Importar albaranes'
+        self.task.save()
+        self.assertEqual(self._search('albaranes'), [('task', self.task.pk)])
+        self.assertEqual(self._search('exportar'), [])
+
+        self.comment.delete()
+        self.assertEqual(self._search('rectificativas'), [])
+
+        # Cambiar solo el estado no reindexa (UPDATE + la fila de TaskTransition)
+        with self.assertNumQueries(2):
+            self.task.status = Task.Status.DONE
+            self.task.save(update_fields=['status'])
+
+    def test_rebuild_matches_signal_maintained_index(self):
+        def snapshot():
+            return sorted(SearchEntry.objects.values_list('term', 'kind', 'object_id', 'workspace_id', 'weight'))
+
+        expected = snapshot()
+        SearchEntry.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(snapshot(), expected)
+
+
+class TaskApiTests(WorkspaceTestCase):
+    """ API JSON de solo lectura: cursor, campos a elección y filtros. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        statuses = [Task.Status.TODO, Task.Status.DONE]
+        Task.objects.bulk_create(
+            Task(
+                project=cls.project, title=f'Tarea {i}', slug=f'tarea-{i}', status=statuses[i % 2],
+                assignee=cls.user if i < 5 else None, due_date=date(2026, 1, 1) + timedelta(days=i),
+            )
+            for i in range(25)
+        )
+        Project.objects.create(workspace=Workspace.objects.create(name='Ajeno', owner=cls.user), name='Invisible')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse('core:api_task_list', args=[self.project.slug])
+
+    def _get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response, json.loads(b''.join(response.streaming_content)) if response.streaming else response.json()
+
+    def test_cursor_walks_every_task_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 10, 'fields': 'id'}
+            if cursor:
+                params['cursor'] = cursor
+            _, body = self._get(self.url, **params)
+            seen += [row['id'] for row in body['results']]
+            cursor = body['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, sorted(Task.objects.values_list('id', flat=True)))
+
+    def test_sparse_fields_only_fetch_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            _, body = self._get(self.url, fields='title,status', limit=3)
+        self.assertEqual(body['results'][0], {'title': 'Tarea 0', 'status': Task.Status.TODO})
+        task_query = next(q['sql'] for q in queries if 'FROM "core_task"' in q['sql'] and 'LIMIT 4' in q['sql'])
+        self.assertNotIn('description', task_query)
+
+        response, body = self._get(self.url, fields='title,secreto')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secreto', body['error'])
+
+    def test_filters(self):
+        _, body = self._get(self.url, status='done', assignee=self.user.pk, fields='id')
+        self.assertEqual(len(body['results']), 2)  # tareas 1 y 3
+        _, body = self._get(self.url, assignee='none', due_after='2026-01-20', due_before='2026-01-22', fields='due_date')
+        self.assertEqual([row['due_date'] for row in body['results']], ['2026-01-20', '2026-01-21', '2026-01-22'])
+        self.assertEqual(self._get(self.url, due_after='ayer')[0].status_code, 400)
+
+    async def test_pages_are_streamed_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url, {'limit': 10, 'fields': 'id'})
+        self.assertTrue(response.is_async)
+        body = json.loads(b''.join([part async for part in response.streaming_content]))
+        self.assertEqual(len(body['results']), 10)
+        self.assertIsNotNone(body['next_cursor'])
+
+    def test_projects_are_limited_to_memberships(self):
+        _, body = self._get(reverse('core:api_project_list'))
+        self.assertEqual([row['name'] for row in body['results']], ['Proyecto'])
+
+
+class TaskUpsertApiTests(TestCase):
+    """ Sincronización por lotes: idempotente, con aristas reconciliadas y errores por registro. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', email='owner@example.com', password='x')
+        cls.member = User.objects.create_user(username='member', email='member@example.com', password='x')
+        cls.stranger = User.objects.create_user(username='stranger', email='stranger@example.com', password='x')
+        cls.workspace = Workspace.objects.create(name='Equipo', owner=cls.owner)
+        Membership.objects.create(user=cls.owner, workspace=cls.workspace)
+        Membership.objects.create(user=cls.member, workspace=cls.workspace)
+        cls.project = Project.objects.create(workspace=cls.workspace, name='Proyecto')
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+        self.url = reverse('core:api_task_upsert', args=[self.project.slug])
+
+    def _post(self, records):
+        return self.client.post(self.url, {'tasks': records}, content_type='application/json')
+
+    def test_retrying_a_batch_updates_instead_of_duplicating(self):
+        records = [
+            {'external_id': 'A', 'title': 'Diseño', 'assignee': self.member.pk, 'due_date': '2026-03-01'},
+            {'external_id': 'B', 'title': 'Desarrollo', 'predecessors': ['A']},
+        ]
+        first = self._post(records).json()
+        self.assertEqual((first['created'], first['updated'], first['errors']), (2, 0, 0))
+
+        records[0]['title'] = 'Diseño final'
+        second = self._post(records).json()
+        self.assertEqual((second['created'], second['updated']), (0, 2))
+        self.assertEqual([r['id'] for r in first['results']], [r['id'] for r in second['results']])
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 2)
+        task_a = Task.objects.get(external_id='A')
+        self.assertEqual((task_a.title, task_a.assignee, task_a.due_date), ('Diseño final', self.member, date(2026, 3, 1)))
+        self.assertQuerySetEqual(Task.objects.get(external_id='B').predecessors.all(), [task_a])
+        # bulk_create no dispara señales: el índice de búsqueda se actualiza aparte
+        self.assertTrue(SearchEntry.objects.filter(term='final', object_id=task_a.pk).exists())
+
+    def test_predecessors_are_reconciled(self):
+        self._post([
+            {'external_id': 'A', 'title': 'A'},
+            {'external_id': 'B', 'title': 'B'},
+            {'external_id': 'C', 'title': 'C', 'predecessors': ['A']},
+        ])
+        self._post([{'external_id': 'C', 'title': 'C', 'predecessors': ['B']}])
+        task_c = Task.objects.get(external_id='C')
+        self.assertEqual(list(task_c.predecessors.values_list('external_id', flat=True)), ['B'])
+        # Sin 'predecessors' las aristas no se tocan
+        self._post([{'external_id': 'C', 'title': 'C renombrada'}])
+        self.assertEqual(list(task_c.predecessors.values_list('external_id', flat=True)), ['B'])
+
+    def test_invalid_records_are_reported_and_skipped(self):
+        body = self._post([
+            {'external_id': 'A', 'title': 'Válida'},
+            {'external_id': 'B', 'title': 'Estado raro', 'status': 'NOPE'},
+            {'external_id': 'C', 'title': 'Ajeno', 'assignee': self.stranger.pk},
+            {'external_id': 'D', 'title': 'Huérfana', 'predecessors': ['B']},
+            {'title': 'Sin id'},
+        ]).json()
+        self.assertEqual((body['created'], body['errors']), (1, 4))
+        self.assertEqual([r['result'] for r in body['results']], ['created', 'error', 'error', 'error', 'error'])
+        self.assertIn('status', body['results'][1]['errors'])
+        self.assertIn('assignee', body['results'][2]['errors'])
+        self.assertIn('predecessors', body['results'][3]['errors'])
+        self.assertEqual(list(Task.objects.values_list('external_id', flat=True)), ['A'])
+
+    def test_field_types_are_validated_per_record(self):
+        body = self._post([
+            {'external_id': 'A', 'title': 'Lista', 'assignee': [self.member.pk]},
+            {'external_id': 'B', 'title': 'Booleano', 'assignee': True},
+            {'external_id': 'C', 'title': 'Objeto', 'description': {'k': 1}},
+            {'external_id': 'D', 'title': 'Válida', 'assignee': self.member.pk, 'description': 'Texto'},
+        ])
+        self.assertEqual(body.status_code, 200)
+        results = body.json()['results']
+        self.assertIn('assignee', results[0]['errors'])
+        self.assertIn('assignee', results[1]['errors'])
+        self.assertIn('description', results[2]['errors'])
+        self.assertEqual(results[3]['result'], 'created')
+        self.assertEqual(list(Task.objects.values_list('external_id', 'description')), [('D', 'Texto')])
+
+    def test_dependency_cycles_are_rejected(self):
+        body = self._post([
+            {'external_id': 'A', 'title': 'A', 'predecessors': ['C']},
+            {'external_id': 'B', 'title': 'B', 'predecessors': ['A']},
+            {'external_id': 'C', 'title': 'C', 'predecessors': ['B']},
+            {'external_id': 'D', 'title': 'D'},
+            {'external_id': 'E', 'title': 'E', 'predecessors': ['D']},
+        ]).json()
+        self.assertEqual([r['result'] for r in body['results']], ['error', 'error', 'error', 'created', 'created'])
+        self.assertEqual(body['results'][0]['errors'], {'predecessors': 'Las dependencias forman un ciclo.'})
+        # Un ciclo con las dependencias ya guardadas: D -> E -> D
+        body = self._post([{'external_id': 'D', 'title': 'D', 'predecessors': ['E']}]).json()
+        self.assertEqual(body['results'][0]['result'], 'error')
+        self.assertFalse(Task.objects.get(external_id='D').predecessors.exists())
+        # Sustituir las predecesoras de la tarea que cerraba el ciclo sí es válido
+        body = self._post([
+            {'external_id': 'E', 'title': 'E', 'predecessors': []},
+            {'external_id': 'D', 'title': 'D', 'predecessors': ['E']},
+        ]).json()
+        self.assertEqual([r['result'] for r in body['results']], ['updated', 'updated'])
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def run(count, prefix):
+            records = [{'external_id': f'{prefix}{i}', 'title': f'Tarea {i}'} for i in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self._post(records).status_code, 200)
+            return len(queries)
+
+        run(1, 'w')  # calienta la caché de ContentType
+        # Dentro de un lote el número de consultas es fijo (SQLite parte antes los INSERT)
+        self.assertEqual(run(5, 'x'), run(50, 'y'))
+
+    def test_event_is_recorded_in_the_sync_transaction(self):
+        self._post([{'external_id': 'A', 'title': 'A'}, {'external_id': 'B', 'title': 'B'}])
+        event = DomainEvent.objects.get(kind=DomainEvent.Kind.TASKS_SYNCED)
+        self.assertEqual(event.payload['count'], 2)
+
+        # Si el evento no se puede guardar, tampoco se guardan las tareas
+        with mock.patch.object(events, 'record', side_effect=IntegrityError), self.assertRaises(IntegrityError):
+            self._post([{'external_id': 'C', 'title': 'C'}])
+        self.assertFalse(Task.objects.filter(external_id='C').exists())
+
+    def test_only_the_owner_can_sync_and_body_is_validated(self):
+        self.assertEqual(self.client.post(self.url, 'no json', content_type='application/json').status_code, 400)
+        with self.settings(TASK_UPSERT_MAX_BATCH=1):
+            self.assertEqual(self._post([{}, {}]).status_code, 400)
+        self.client.force_login(self.member)
+        self.assertEqual(self._post([{'external_id': 'A', 'title': 'A'}]).status_code, 403)
+
+
+class GanttDataTests(WorkspaceTestCase):
+    """ Datos del Gantt: ventana de fechas, predecesoras precargadas y agregación por zoom. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        base = date(2026, 1, 5)  # lunes
+        cls.tasks = Task.objects.bulk_create(
+            Task(
+                project=cls.project, title=f'Tarea {i}', slug=f'tarea-{i}',
+                assignee=cls.user if i % 2 else None,
+                status=Task.Status.DONE if i % 3 == 0 else Task.Status.TODO,
+                start_date=base + timedelta(days=i), due_date=base + timedelta(days=i + 2),
+            )
+            for i in range(30)
+        )
+        for previous, task in zip(cls.tasks, cls.tasks[1:]):
+            task.predecessors.add(previous)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse('core:project_gantt_data', args=[self.project.slug])
+
+    def test_only_tasks_overlapping_the_window_are_returned(self):
+        body = self.client.get(self.url, {'start': '2026-01-10', 'end': '2026-01-12', 'zoom': 'day'}).json()
+        # Tareas 3..7: empiezan antes del fin y terminan después del inicio
+        self.assertEqual([bar['name'] for bar in body['tasks']], [f'Tarea {i}' for i in range(3, 8)])
+        self.assertFalse(body['aggregated'])
+        # La predecesora de la primera barra queda fuera de la ventana
+        self.assertEqual(body['tasks'][0]['dependencies'], '')
+        self.assertEqual(body['tasks'][1]['dependencies'], f'task_{self.tasks[3].pk}')
+
+    def test_query_count_does_not_depend_on_the_number_of_tasks(self):
+        with CaptureQueriesContext(connection) as narrow:
+            self.client.get(self.url, {'start': '2026-01-05', 'end': '2026-01-06', 'zoom': 'day'})
+        with CaptureQueriesContext(connection) as wide:
+            body = self.client.get(self.url, {'start': '2026-01-01', 'end': '2026-03-01', 'zoom': 'day'}).json()
+        self.assertEqual(len(body['tasks']), 30)
+        self.assertEqual(len(narrow), len(wide))
+
+    def test_coarse_zoom_groups_bars_by_assignee_and_week(self):
+        body = self.client.get(self.url, {'start': '2026-01-01', 'end': '2026-03-01', 'zoom': 'month'}).json()
+        self.assertTrue(body['aggregated'])
+        self.assertEqual(sum(bar['count'] for bar in body['tasks']), 30)
+        # 30 días desde un lunes: 5 semanas (la última incompleta) por 2 asignados
+        self.assertEqual(len(body['tasks']), 10)
+        first = body['tasks'][0]
+        self.assertEqual((first['assignee'], first['start'], first['end']), ('Ana', '2026-01-06', '2026-01-12'))
+
+    def test_invalid_parameters_return_400(self):
+        for params in ({'zoom': 'decade'}, {'start': 'ayer'}, {'start': '2026-02-01', 'end': '2026-01-01'},
+                       {'start': '2020-01-01', 'end': '2026-01-01'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+@skipUnless(capacity.available(), 'NumPy no está instalado')
+class CapacityForecastTests(WorkspaceTestCase):
+    """ Previsión de capacidad: reparto del esfuerzo, sobreasignación y caché por versión. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Project.objects.create(workspace=cls.workspace, name='Otro')
+        cls.start = date(2026, 3, 2)
+
+    def _task(self, project, first, last, hours, **extra):
+        return Task.objects.create(
+            project=project, title='T', assignee=self.user, estimated_hours=hours,
+            start_date=self.start + timedelta(days=first), due_date=self.start + timedelta(days=last), **extra,
+        )
+
+    def test_daily_load_spreads_effort_and_clips_to_horizon(self):
+        import numpy as np
+        load = capacity.daily_load(
+            person=np.array([0, 0, 1]), first_day=np.array([0, -2, 3]), last_day=np.array([3, 1, 10]),
+            hours=np.array([8.0, 8.0, 16.0]), days=5,
+        )
+        # 8 h en 4 días = 2 h/día; 8 h en 4 días (dos antes del horizonte); 16 h en 8 días
+        self.assertEqual(load.tolist(), [[4.0, 4.0, 2.0, 2.0, 0.0], [0.0, 0.0, 0.0, 2.0, 2.0]])
+
+    def test_overallocation_across_projects(self):
+        self._task(self.project, 0, 4, 30)   # 6 h/día
+        self._task(self.other, 3, 5, 12)     # 4 h/día
+        self._task(self.other, 0, 9, 80, status=Task.Status.DONE)  # cerrada: no cuenta
+        result = capacity.forecast(self.workspace, start=self.start, days=14)
+        (person,) = result['people']
+        self.assertEqual(person['peak'], 10.0)
+        self.assertEqual(person['windows'], [(self.start + timedelta(days=3), self.start + timedelta(days=4), 10.0)])
+        self.assertEqual(person['daily'][:6], [6.0, 6.0, 6.0, 10.0, 10.0, 4.0])
+
+    def test_result_is_cached_until_a_task_changes(self):
+        task = self._task(self.project, 0, 0, 4)
+        capacity.forecast(self.workspace, start=self.start, days=7)
+        with self.assertNumQueries(1):  # solo los proyectos del workspace
+            capacity.forecast(self.workspace, start=self.start, days=7)
+        task.estimated_hours = 12
+        task.save()
+        result = capacity.forecast(self.workspace, start=self.start, days=7)
+        self.assertEqual(result['people'][0]['peak'], 12.0)
+
+    def test_reports_page_shows_overallocation(self):
+        today = timezone.localdate()
+        Task.objects.create(project=self.project, title='T', assignee=self.user, estimated_hours=40,
+                            start_date=today, due_date=today + timedelta(days=1))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:project_reports', args=[self.project.slug]))
+        self.assertContains(response, 'Previsión de Capacidad')
+        self.assertContains(response, 'Pico: 20.0 h/día')
+
+    def test_reports_page_is_404_outside_the_workspace(self):
+        stranger = User.objects.create_user(username='otro', email='otro@example.com', password='x')
+        self.client.force_login(stranger)
+        response = self.client.get(reverse('core:project_reports', args=[self.project.slug]))
+        self.assertEqual(response.status_code, 404)
+
+
+class AutoScheduleTests(WorkspaceTestCase):
+    """ Reprogramación de sucesoras: solo el subgrafo afectado, en orden topológico. """
+
+    project_options = {'auto_schedule': True}
+    day = date(2026, 5, 4)
+
+    def _task(self, title, first, last, *predecessors, **extra):
+        task = Task.objects.create(
+            project=self.project, title=title, start_date=self.day + timedelta(days=first),
+            due_date=self.day + timedelta(days=last), **extra,
+        )
+        task.predecessors.add(*predecessors)
+        return task
+
+    def _dates(self, task):
+        task.refresh_from_db()
+        return (task.start_date - self.day).days, (task.due_date - self.day).days
+
+    def test_successors_shift_after_the_latest_predecessor(self):
+        a = self._task('A', 0, 2)
+        other = self._task('Otra', 0, 6)
+        b = self._task('B', 3, 4, a)
+        c = self._task('C', 7, 8, b, other)
+        done = self._task('Hecha', 3, 3, a, status=Task.Status.DONE)
+        unrelated = self._task('Suelta', 0, 1)
+
+        a.due_date = self.day + timedelta(days=5)
+        a.save()
+        changed = scheduling.propagate(a)
+        self.assertEqual({t.pk for t in changed}, {b.pk, c.pk})
+        self.assertEqual(self._dates(b), (6, 7))   # conserva la duración
+        self.assertEqual(self._dates(c), (8, 9))   # tras B (7), no tras Otra (6)
+        self.assertEqual(self._dates(done), (3, 3))
+        self.assertEqual(self._dates(unrelated), (0, 1))
+
+    def test_tasks_never_move_backwards(self):
+        a = self._task('A', 0, 5)
+        b = self._task('B', 10, 12, a)
+        self.assertEqual(scheduling.propagate(a), [])
+        self.assertEqual(self._dates(b), (10, 12))
+
+    def test_query_count_depends_on_the_affected_chain_only(self):
+        a = self._task('A', 0, 1)
+        b = self._task('B', 2, 3, a)
+        self._task('C', 4, 5, b)
+        for i in range(30):
+            self._task(f'Ruido {i}', 0, 1, self._task(f'Raíz {i}', 0, 0))
+        a.due_date = self.day + timedelta(days=3)
+        # 3 niveles (B, C, fin) + aristas de entrada + tareas + bulk_update en su savepoint
+        with self.assertNumQueries(8):
+            self.assertEqual(len(scheduling.propagate(a)), 2)
+
+    def test_editing_dates_in_the_modal_reschedules_and_refreshes_cards(self):
+        a = self._task('A', 0, 2)
+        b = self._task('B', 3, 4, a)
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('core:task_detail_update', args=[a.pk]), {
+            'title': 'A', 'status': Task.Status.TODO, 'priority': Task.Priority.MEDIUM,
+            'start_date': self.day.isoformat(), 'due_date': (self.day + timedelta(days=4)).isoformat(),
+        })
+        self.assertEqual(self._dates(b), (5, 6))
+        self.assertContains(response, f'id="task-{b.pk}"')
+        self.assertContains(response, 'hx-swap-oob="true"')
+
+    def test_failed_propagation_rolls_back_the_edit(self):
+        a = self._task('A', 0, 2)
+        b = self._task('B', 3, 4, a)
+        self.client.force_login(self.user)
+        with mock.patch.object(scheduling, 'propagate', side_effect=DatabaseError('fallo')), \
+                self.assertRaises(DatabaseError):
+            self.client.post(reverse('core:task_detail_update', args=[a.pk]), {
+                'title': 'A editada', 'status': Task.Status.TODO, 'priority': Task.Priority.MEDIUM,
+                'start_date': self.day.isoformat(), 'due_date': (self.day + timedelta(days=4)).isoformat(),
+            })
+        a.refresh_from_db()
+        self.assertEqual((a.title, self._dates(a)), ('A', (0, 2)))
+        self.assertEqual(self._dates(b), (3, 4))
+
+
+@skipUnless(forecasting.available(), 'NumPy no está instalado')
+class CompletionForecastTests(WorkspaceTestCase):
+    """ Previsión Monte Carlo: recorrido del grafo, percentiles, pool de procesos y caché. """
+
+    today = date(2026, 6, 1)
+    project_options = {'deadline': today + timedelta(days=7)}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        history = Project.objects.create(workspace=cls.workspace, name='Histórico')
+        # Historial: todas las tareas completadas duraron 3 días
+        Task.objects.bulk_create(
+            Task(project=history, title=f'H{i}', slug=f'h-{i}', status=Task.Status.DONE,
+                 start_date=date(2026, 1, 1), due_date=date(2026, 1, 3))
+            for i in range(forecasting.MIN_HISTORY)
+        )
+
+    def test_simulate_follows_the_dependency_graph(self):
+        # 0 -> 1 -> 2 en cadena y 3 en paralelo, que no puede empezar hasta el día 5
+        finish = forecasting.simulate([2], [[], [0], [1], []], [0, 0, 0, 5], trials=10, seed=1)
+        self.assertEqual(finish.tolist(), [7] * 10)
+
+    def test_percentiles_and_deadline_probability(self):
+        first = Task.objects.create(project=self.project, title='A')
+        second = Task.objects.create(project=self.project, title='B')
+        second.predecessors.add(first)
+        Task.objects.create(project=self.project, title='Hecha', status=Task.Status.DONE)
+
+        result = forecasting.forecast(self.project, today=self.today)
+        # Dos tareas de 3 días en cadena: terminan el día 5 (hoy es el día 0)
+        self.assertEqual(result['percentiles'], [(p, self.today + timedelta(days=5)) for p in (50, 85, 95)])
+        self.assertEqual(result['deadline_probability'], 100.0)
+
+        third = Task.objects.create(project=self.project, title='C')
+        third.predecessors.add(second)
+        result = forecasting.forecast(self.project, today=self.today)
+        self.assertEqual(result['percentiles'][0][1], self.today + timedelta(days=8))
+        self.assertEqual(result['deadline_probability'], 0.0)
+
+    def test_result_is_cached_per_version(self):
+        Task.objects.create(project=self.project, title='A')
+        forecasting.forecast(self.project, today=self.today)
+        with self.assertNumQueries(1):  # solo los proyectos del workspace
+            forecasting.forecast(self.project, today=self.today)
+
+    @override_settings(FORECAST_WORKERS=1)
+    def test_process_pool_gives_the_same_result(self):
+        args = ([1, 2, 5], [[], [0], [0], [1, 2]], [0, 0, 3, 0])
+        with mock.patch.object(forecasting, 'POOL_MIN_TASKS', 1):
+            pooled = forecasting._run_trials(*args, seed=7)
+        with override_settings(FORECAST_WORKERS=0):
+            local = forecasting._run_trials(*args, seed=7)
+        self.assertEqual(pooled.tolist(), local.tolist())
+
+
+class FlowMetricsTests(WorkspaceTestCase):
+    """ Historial de estados (TaskTransition) y métricas de cycle time, lead time y throughput. """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.now = timezone.now()
+
+    def test_status_changes_are_recorded_on_every_path(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('core:task_create', args=[self.project.slug]), {
+            'title': 'Nueva', 'status': Task.Status.TODO, 'priority': Task.Priority.MEDIUM,
+        })
+        task = Task.objects.get(title='Nueva')
+        self.client.post(reverse('core:update_task_status'), {'task_id': task.pk, 'new_status': Task.Status.IN_PROGRESS})
+        task.refresh_from_db()
+        task.title = 'Renombrada'
+        task.save()  # sin cambio de estado: no hay transición
+        task_sync_records = [{'external_id': 'X', 'title': 'X', 'status': Task.Status.DONE}]
+        self.client.post(reverse('core:api_task_upsert', args=[self.project.slug]), {'tasks': task_sync_records},
+                         content_type='application/json')
+
+        self.assertEqual(
+            list(TaskTransition.objects.order_by('id').values_list('task__title', 'from_status', 'to_status', 'actor')),
+            [('Renombrada', '', Task.Status.TODO, self.user.pk),
+             ('Renombrada', Task.Status.TODO, Task.Status.IN_PROGRESS, self.user.pk),
+             ('X', '', Task.Status.DONE, self.user.pk)],
+        )
+
+    def _finished_task(self, created_days_ago, started_days_ago, done_days_ago, assignee=None):
+        task = Task.objects.create(project=self.project, title='T', status=Task.Status.DONE, assignee=assignee)
+        Task.objects.filter(pk=task.pk).update(created_at=self.now - timedelta(days=created_days_ago))
+        TaskTransition.objects.filter(task=task).delete()
+        for status, days_ago in ((Task.Status.IN_PROGRESS, started_days_ago), (Task.Status.DONE, done_days_ago)):
+            if days_ago is not None:
+                TaskTransition.objects.create(task=task, project=self.project, to_status=status,
+                                              created_at=self.now - timedelta(days=days_ago))
+        return task
+
+    def test_cycle_lead_time_and_throughput(self):
+        self._finished_task(10, 6, 5, assignee=self.user)   # cycle 1 d, lead 5 d
+        self._finished_task(10, 8, 5, assignee=self.user)   # cycle 3 d, lead 5 d
+        self._finished_task(20, None, 0)                    # sin IN_PROGRESS: solo lead 20 d
+        self._finished_task(400, 390, 380)                  # fuera del periodo
+        Task.objects.create(project=self.project, title='Abierta', status=Task.Status.IN_PROGRESS)
+
+        metrics = flow.project_metrics(self.project, now=self.now)
+        self.assertEqual(metrics['cycle_time'], {'count': 2, 'percentiles': [(50, 2.0), (85, 2.7), (95, 2.9)]})
+        self.assertEqual(metrics['lead_time']['count'], 3)
+        self.assertEqual(metrics['lead_time']['percentiles'][0], (50, 5.0))
+        self.assertEqual(dict(metrics['cycle_histogram'])['1-2 d'], 1)
+        self.assertEqual(dict(metrics['cycle_histogram'])['2-4 d'], 1)
+        self.assertEqual([(a['name'], a['count']) for a in metrics['assignees']], [('Ana', 2)])
+        self.assertEqual(len(metrics['throughput']), flow.THROUGHPUT_WEEKS)
+        self.assertEqual(sum(count for _, count in metrics['throughput']), 3)
+        self.assertEqual(flow.cycle_time_days(self.workspace.pk), [1, 3, 10])
+
+    def test_reports_page_shows_flow_metrics(self):
+        self._finished_task(3, 2, 1)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:project_reports', args=[self.project.slug]))
+        self.assertContains(response, 'Métricas de Flujo')
+        self.assertContains(response, 'id="flow-data"')
+
+    def test_reports_page_does_not_compute_metrics_for_non_members(self):
+        self._finished_task(3, 2, 1)
+        stranger = User.objects.create_user(username='otro', email='otro@example.com', password='x')
+        self.client.force_login(stranger)
+        with mock.patch.object(flow, 'project_metrics') as metrics, mock.patch.object(forecasting, 'forecast') as forecast:
+            response = self.client.get(reverse('core:project_reports', args=[self.project.slug]))
+        self.assertEqual(response.status_code, 404)
+        metrics.assert_not_called()
+        forecast.assert_not_called()
+
+
+class OutboxTests(WorkspaceTestCase):
+    """ Bandeja de eventos de dominio: una inserción por petición y proyección por lotes. """
+
+    separate_owner = True
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_request_only_records_the_event(self):
+        task = Task.objects.create(project=self.project, title='Tarea', status=Task.Status.TODO, assignee=self.user)
+        self.client.post(reverse('core:update_task_status'), {'task_id': task.pk, 'new_status': Task.Status.IN_PROGRESS})
+
+        event = DomainEvent.objects.get()
+        self.assertEqual(event.kind, DomainEvent.Kind.TASK_STATUS_CHANGED)
+        self.assertEqual(event.target, task)
+        # El actor (también asignado) no se notifica a sí mismo
+        self.assertEqual(event.payload['recipients'], [self.owner.pk])
+        self.assertFalse(Activity.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_projection_materializes_activity_and_notifications(self):
+        task = Task.objects.create(project=self.project, title='Tarea', status=Task.Status.TODO)
+        self.client.post(reverse('core:update_task_status'), {'task_id': task.pk, 'new_status': Task.Status.IN_PROGRESS})
+        self.client.post(reverse('core:add_comment', args=[task.pk]), {'text': 'Hola'})
+        happened_at = timezone.now() - timedelta(hours=1)
+        DomainEvent.objects.update(created_at=happened_at)
+
+        self.assertEqual(events.project_pending(), 2)
+        verb = f'cambió el estado de "{Task.Status.TODO.label}" a "{Task.Status.IN_PROGRESS.label}" en la tarea'
+        self.assertEqual(
+            sorted(Activity.objects.values_list('verb', 'actor', 'project')),
+            sorted([(verb, self.user.pk, self.project.pk), ('comentó en la tarea', self.user.pk, self.project.pk)]),
+        )
+        self.assertEqual(
+            sorted(Notification.objects.values_list('verb', 'recipient')),
+            sorted([('cambió el estado de la tarea', self.owner.pk), ('comentó en la tarea', self.owner.pk)]),
+        )
+        # Se conserva la hora del evento, no la de la proyección
+        self.assertEqual(set(Activity.objects.values_list('created_at', flat=True)), {happened_at})
+        self.assertFalse(DomainEvent.objects.filter(processed_at__isnull=True).exists())
+
+        # Cada evento se proyecta una sola vez
+        self.assertEqual(events.project_pending(), 0)
+        self.assertEqual(Activity.objects.count(), 2)
+
+    def test_projection_queries_do_not_grow_with_the_batch(self):
+        task = Task.objects.create(project=self.project, title='Tarea')
+        for _ in range(30):
+            events.record(DomainEvent.Kind.COMMENT_ADDED, self.user, target=task, project=self.project,
+                          recipients=[self.owner])
+        # Lote: SELECT de eventos y de candidatas a agrupar, INSERT de actividad y
+        # de notificaciones y UPDATE (más savepoint)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(events.project_batch(), 30)
+        self.assertLessEqual(len(queries), 7)
+        self.assertEqual(Activity.objects.count(), 30)
+        # Las repeticiones se agrupan en una notificación (ver NotificationRetentionTests)
+        self.assertEqual(Notification.objects.get(recipient=self.owner).count, 30)
+
+    def test_process_outbox_command(self):
+        task = Task.objects.create(project=self.project, title='Tarea')
+        events.record(DomainEvent.Kind.TASK_CREATED, self.user, target=task, project=self.project,
+                      recipients=[self.owner], title=task.title)
+        out = StringIO()
+        call_command('process_outbox', stdout=out)
+        self.assertIn('1 evento(s)', out.getvalue())
+        self.assertEqual(Activity.objects.get().verb, 'creó la tarea "Tarea"')
+        self.assertEqual(Notification.objects.get().verb, 'te asignó la tarea')
+
+    def test_processed_events_are_pruned_in_batches(self):
+        task = Task.objects.create(project=self.project, title='Tarea')
+        for _ in range(5):
+            events.record(DomainEvent.Kind.COMMENT_ADDED, self.user, target=task, project=self.project)
+        events.project_pending()
+        DomainEvent.objects.update(processed_at=timezone.now() - timedelta(days=10))
+        recent = events.record(DomainEvent.Kind.COMMENT_ADDED, self.user, target=task, project=self.project)
+        events.project_pending()
+        pending = events.record(DomainEvent.Kind.COMMENT_ADDED, self.user, target=task, project=self.project)
+        DomainEvent.objects.filter(pk=pending.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        with mock.patch.object(events, 'project_pending', return_value=0):
+            out = StringIO()
+            call_command('process_outbox', prune_days=7, batch_size=2, stdout=out)
+        self.assertIn('5 evento(s) antiguo(s)', out.getvalue())
+        # Se conservan los recientes y los pendientes de proyectar, aunque sean antiguos
+        self.assertEqual(set(DomainEvent.objects.values_list('pk', flat=True)), {recent.pk, pending.pk})
+        self.assertEqual(Activity.objects.count(), 6)
+
+
+class PollingEndpointTests(WorkspaceTestCase):
+    """ Endpoints asíncronos de sondeo: contador de notificaciones y tiempo registrado. """
+
+    separate_owner = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.task = Task.objects.create(project=cls.project, title='Tarea')
+        cls.stranger = User.objects.create_user(username='otro', email='otro@example.com', password='x')
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_notification_count_only_counts_own_unread(self):
+        Notification.objects.create(recipient=self.user, actor=self.owner, verb='te asignó', target=self.task)
+        Notification.objects.create(recipient=self.user, actor=self.owner, verb='comentó', target=self.task, read=True)
+        Notification.objects.create(recipient=self.owner, actor=self.user, verb='comentó', target=self.task)
+
+        response = self.client.get(reverse('core:notification_count'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'unread': 1})
+
+    def test_notification_count_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('core:notification_count'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_task_time_summary_reports_closed_logs_and_running_timer(self):
+        url = reverse('core:task_time_summary', args=[self.task.pk])
+        end = timezone.now()
+        TimeLog.objects.create(task=self.task, user=self.user, start_time=end - timedelta(hours=1, minutes=30, seconds=5),
+                               end_time=end)
+        self.assertEqual(self.client.get(url).json(), {'status': 'stopped', 'total_logged_time': '01:30:05'})
+
+        # El cronómetro en curso cambia el estado pero no suma hasta cerrarse
+        TimeLog.objects.create(task=self.task, user=self.user)
+        self.assertEqual(self.client.get(url).json(), {'status': 'started', 'total_logged_time': '01:30:05'})
+
+    def test_task_time_summary_is_404_outside_the_workspace(self):
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.client.get(reverse('core:task_time_summary', args=[self.task.pk])).status_code, 404)
+
+        Project.objects.filter(pk=self.project.pk).update(deleted_at=timezone.now())
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('core:task_time_summary', args=[self.task.pk])).status_code, 404)
+
+
+class NotificationRetentionTests(WorkspaceTestCase):
+    """ Agrupación de notificaciones repetidas y borrado por lotes de las antiguas. """
+
+    separate_owner = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.task = Task.objects.create(project=cls.project, title='Tarea')
+        cls.other_task = Task.objects.create(project=cls.project, title='Otra')
+
+    def _comment(self, task, minutes_ago):
+        event = events.record(DomainEvent.Kind.COMMENT_ADDED, self.user, target=task, project=self.project,
+                              recipients=[self.owner])
+        DomainEvent.objects.filter(pk=event.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+
+    @override_settings(NOTIFICATION_COALESCE_MINUTES=30)
+    def test_repeated_actions_are_coalesced_within_the_window(self):
+        self._comment(self.task, minutes_ago=100)
+        events.project_pending()
+        self._comment(self.task, minutes_ago=50)   # fuera de la ventana: fila nueva
+        self._comment(self.task, minutes_ago=40)   # agrupada con la anterior
+        self._comment(self.other_task, minutes_ago=40)
+        events.project_pending()
+        self._comment(self.task, minutes_ago=15)   # agrupada con una fila ya guardada
+        events.project_pending()
+
+        rows = list(Notification.objects.order_by('created_at').values_list('object_id', 'count'))
+        self.assertEqual(rows, [(self.task.pk, 1), (self.other_task.pk, 1), (self.task.pk, 3)])
+        latest = Notification.objects.get(object_id=self.task.pk, count=3)
+        self.assertAlmostEqual(latest.created_at, timezone.now() - timedelta(minutes=15), delta=timedelta(minutes=1))
+
+    @override_settings(NOTIFICATION_COALESCE_MINUTES=30)
+    def test_back_and_forth_status_changes_are_coalesced(self):
+        self.client.force_login(self.user)
+        for status in [Task.Status.IN_PROGRESS, Task.Status.TODO] * 3:
+            self.client.post(reverse('core:update_task_status'), {'task_id': self.task.pk, 'new_status': status})
+        events.project_pending()
+        self.assertEqual(
+            list(Notification.objects.values_list('recipient', 'verb', 'count')),
+            [(self.owner.pk, 'cambió el estado de la tarea', 6)],
+        )
+        # La actividad conserva cada cambio con sus estados
+        self.assertEqual(Activity.objects.filter(object_id=self.task.pk).count(), 6)
+
+    @override_settings(NOTIFICATION_COALESCE_MINUTES=30)
+    def test_read_notifications_are_not_reopened(self):
+        self._comment(self.task, minutes_ago=10)
+        events.project_pending()
+        Notification.objects.update(read=True)
+        self._comment(self.task, minutes_ago=5)
+        events.project_pending()
+        self.assertEqual(list(Notification.objects.order_by('created_at').values_list('read', 'count')),
+                         [(True, 1), (False, 1)])
+
+    @override_settings(NOTIFICATION_COALESCE_MINUTES=0)
+    def test_coalescing_can_be_disabled(self):
+        self._comment(self.task, minutes_ago=2)
+        self._comment(self.task, minutes_ago=1)
+        events.project_pending()
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def _notification(self, days_ago, read=True):
+        return Notification.objects.create(
+            recipient=self.owner, actor=self.user, verb='comentó en la tarea', target=self.task,
+            read=read, created_at=timezone.now() - timedelta(days=days_ago),
+        )
+
+    def test_prune_deletes_old_read_notifications_in_batches(self):
+        old = [self._notification(days_ago=100) for _ in range(5)]
+        recent = self._notification(days_ago=10)
+        unread = self._notification(days_ago=100, read=False)
+        with tempfile.TemporaryDirectory() as directory:
+            archive = Path(directory) / 'notifications.jsonl.gz'
+            out = StringIO()
+            with CaptureQueriesContext(connection) as queries:
+                call_command('prune_notifications', days=90, batch_size=2, archive=str(archive), stdout=out)
+            with gzip.open(archive, 'rt', encoding='utf-8') as archived:
+                archived_ids = [json.loads(line)['id'] for line in archived]
+        self.assertIn('5 notificación(es)', out.getvalue())
+        self.assertEqual(sorted(archived_ids), sorted(notification.pk for notification in old))
+        self.assertEqual(set(Notification.objects.values_list('pk', flat=True)), {recent.pk, unread.pk})
+        # Lotes de 2: tres DELETE, uno por lote
+        self.assertEqual(sum(query['sql'].startswith('DELETE') for query in queries.captured_queries), 3)
+
+    def test_notification_list_query_count_is_constant(self):
+        for _ in range(5):
+            self._notification(days_ago=1, read=False)
+        self.client.force_login(self.owner)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('core:notification_list'))
+        for _ in range(10):
+            self._notification(days_ago=1, read=False)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse('core:notification_list'))
+        self.assertContains(response, 'Tarea')
+        self.assertEqual(len(few), len(many))
+
+
+class ProjectArchiveTests(WorkspaceTestCase):
+    """ Archivo en frío de proyectos terminados: snapshot, purga por lotes, vista de solo lectura y restauración. """
+
+    separate_owner = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Project.objects.create(workspace=cls.workspace, name='Otro')
+        cls.other_task = Task.objects.create(project=cls.other, title='Sigue viva', assignee=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        self.use_temp_media()
+        self.client.force_login(self.owner)
+
+        self.design = Task.objects.create(project=self.project, title='Diseño', status=Task.Status.DONE, assignee=self.user)
+        self.build = Task.objects.create(project=self.project, title='Construcción', status=Task.Status.DONE)
+        self.build.predecessors.add(self.design)
+        self.comment = Comment.objects.create(task=self.design, author=self.user, text='Planos revisados')
+        self.attachment = Attachment.create_from_upload(self.comment, self.user, SimpleUploadedFile('planos.pdf', b'%PDF planos'))
+        TimeLog.objects.create(task=self.design, user=self.user, end_time=timezone.now())
+        Activity.objects.create(project=self.project, actor=self.user, verb='comentó en la tarea', target=self.design)
+        Notification.objects.create(recipient=self.owner, actor=self.user, verb='comentó en la tarea', target=self.design)
+
+    def _rows(self):
+        """ Filas del proyecto en cada tabla, con sus ids. """
+        return {
+            'tasks': set(Task.objects.filter(project=self.project).values_list('pk', 'created_at', 'assignee_id')),
+            'dependencies': set(self.build.predecessors.values_list('pk', flat=True)),
+            'transitions': TaskTransition.objects.filter(project=self.project).count(),
+            'comments': set(Comment.objects.filter(task__project=self.project).values_list('pk', 'created_at')),
+            'attachments': set(Attachment.objects.filter(comment__task__project=self.project).values_list('pk', 'blob_id')),
+            'timelogs': TimeLog.objects.filter(task__project=self.project).count(),
+            'activities': Activity.objects.filter(project=self.project).count(),
+            'notifications': Notification.objects.filter(object_id__in=[self.design.pk, self.build.pk]).count(),
+            'search': SearchEntry.objects.filter(
+                Q(kind=SearchEntry.Kind.TASK, object_id__in=[self.design.pk, self.build.pk])
+                | Q(kind=SearchEntry.Kind.COMMENT, object_id=self.comment.pk)
+            ).count(),
+        }
+
+    def _archive(self):
+        response = self.client.post(reverse('core:project_archive', args=[self.project.slug]))
+        self.assertRedirects(response, reverse('core:project_detail', args=[self.project.slug]))
+        record = ProjectArchive.objects.get(project=self.project)
+        with mock.patch.object(archive, 'CHUNK_SIZE', 1):
+            archive.process(record.pk)
+        record.refresh_from_db()
+        return record
+
+    def test_archive_moves_rows_to_snapshot_and_restore_brings_them_back(self):
+        before = self._rows()
+        blob_refs = StoredFile.objects.get(pk=self.attachment.blob_id).ref_count
+
+        record = self._archive()
+        self.assertEqual(record.state, ProjectArchive.State.ARCHIVED)
+        self.assertEqual(record.counts['tasks'], 2)
+        self.assertEqual(self._rows(), {
+            'tasks': set(), 'dependencies': set(), 'transitions': 0, 'comments': set(), 'attachments': set(),
+            'timelogs': 0, 'activities': 0, 'notifications': 0, 'search': 0,
+        })
+        # El contenido del adjunto sigue referenciado por el snapshot; el resto del workspace no se toca
+        self.assertEqual(StoredFile.objects.get(pk=self.attachment.blob_id).ref_count, blob_refs)
+        self.assertTrue(Task.objects.filter(pk=self.other_task.pk).exists())
+
+        response = self.client.get(reverse('core:project_detail', args=[self.project.slug]))
+        self.assertTemplateUsed(response, 'core/project_archived.html')
+        self.assertContains(response, 'Diseño')
+        self.assertContains(response, 'Ana')
+
+        self.client.post(reverse('core:project_restore', args=[self.project.slug]))
+        with mock.patch.object(archive, 'CHUNK_SIZE', 1):
+            archive.process(record.pk)
+        self.project.refresh_from_db()
+        self.assertIsNone(self.project.archived_at)
+        self.assertFalse(ProjectArchive.objects.exists())
+        # Mismos ids y fechas: la actividad y las notificaciones vuelven a apuntar a sus objetos
+        self.assertEqual(self._rows(), before)
+        self.assertEqual(Notification.objects.get(object_id=self.design.pk).target, self.design)
+
+    def test_archived_project_is_read_only(self):
+        self._archive()
+        response = self.client.post(reverse('core:task_create', args=[self.project.slug]), {
+            'title': 'Nueva', 'status': Task.Status.TODO, 'priority': Task.Priority.MEDIUM,
+        })
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(reverse('core:api_task_upsert', args=[self.project.slug]),
+                                    {'tasks': [{'external_id': 'X', 'title': 'X'}]}, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Task.objects.filter(project=self.project).exists())
+
+    def test_only_finished_projects_can_be_archived(self):
+        Task.objects.create(project=self.project, title='Pendiente', status=Task.Status.TODO)
+        self.client.post(reverse('core:project_archive', args=[self.project.slug]))
+        self.assertFalse(ProjectArchive.objects.exists())
+        self.client.force_login(self.user)
+        Task.objects.filter(title='Pendiente').update(status=Task.Status.DONE)
+        response = self.client.post(reverse('core:project_archive', args=[self.project.slug]))
+        self.assertEqual(response.status_code, 404)  # solo el dueño del workspace
+
+    def test_restore_skips_rows_of_deleted_users(self):
+        record = self._archive()
+        User.objects.filter(pk=self.user.pk).delete()
+        archive.start_restore(record)
+        archive.process(record.pk)
+        # Asignado opcional: queda sin asignar; comentario y registro de tiempo exigen el autor
+        self.assertIsNone(Task.objects.get(pk=self.design.pk).assignee_id)
+        self.assertFalse(Comment.objects.filter(task__project=self.project).exists())
+        self.assertFalse(TimeLog.objects.filter(task__project=self.project).exists())
+
+
+class DeletionTests(WorkspaceTestCase):
+    """ Borrado de workspaces y proyectos: ocultación inmediata y borrado por lotes en segundo plano. """
+
+    separate_owner = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Project.objects.create(workspace=cls.workspace, name='Otro')
+        cls.other_task = Task.objects.create(project=cls.other, title='Sigue viva')
+
+    def setUp(self):
+        super().setUp()
+        self.use_temp_media()
+        self.client.force_login(self.owner)
+
+        self.task = Task.objects.create(project=self.project, title='Diseño', assignee=self.user)
+        self.next_task = Task.objects.create(project=self.project, title='Construcción')
+        self.next_task.predecessors.add(self.task)
+        comment = Comment.objects.create(task=self.task, author=self.user, text='Planos revisados')
+        self.attachment = Attachment.create_from_upload(comment, self.user, SimpleUploadedFile('planos.pdf', b'%PDF planos'))
+        # El mismo contenido en otro proyecto: el blob debe sobrevivir al borrado
+        other_comment = Comment.objects.create(task=self.other_task, author=self.user, text='Copia')
+        self.shared = Attachment.create_from_upload(other_comment, self.user, SimpleUploadedFile('copia.pdf', b'%PDF planos'))
+        self.unique = Attachment.create_from_upload(comment, self.user, SimpleUploadedFile('solo.pdf', b'%PDF solo'))
+        TimeLog.objects.create(task=self.task, user=self.user, end_time=timezone.now())
+        Activity.objects.create(project=self.project, actor=self.user, verb='comentó en la tarea', target=self.task)
+        Notification.objects.create(recipient=self.owner, actor=self.user, verb='comentó en la tarea', target=self.task)
+
+    def _run(self, job):
+        with mock.patch.object(archive, 'CHUNK_SIZE', 1):
+            deletion.run(job.pk)
+        job.refresh_from_db()
+        return job
+
+    def test_deleted_project_is_hidden_at_once(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('core:project_delete', args=[self.project.slug]))
+        self.assertRedirects(response, reverse('core:workspace_detail', args=[self.workspace.slug]))
+        self.assertEqual(len(callbacks), 1)  # el borrado real se encola tras el commit
+        self.assertTrue(Task.objects.filter(pk=self.task.pk).exists())
+
+        self.assertEqual(self.client.get(reverse('core:project_detail', args=[self.project.slug])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('core:task_detail_update', args=[self.task.pk])).status_code, 404)
+        response = self.client.get(reverse('core:workspace_detail', args=[self.workspace.slug]))
+        self.assertNotContains(response, 'Proyecto"')
+        # Las notificaciones de sus tareas tampoco se muestran (ni cuentan en el contador)
+        self.assertEqual(self.client.get(reverse('core:notification_count')).json(), {'unread': 0})
+        response = self.client.get(reverse('core:notification_list'))
+        self.assertEqual(list(response.context['notifications']), [])
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:workspace_list'))
+        self.assertNotContains(response, 'Diseño')
+
+    def test_run_deletes_in_batches_and_releases_blobs(self):
+        self.client.post(reverse('core:project_delete', args=[self.project.slug]))
+        job = DeletionJob.objects.get()
+        unique_blob = StoredFile.objects.get(pk=self.unique.blob_id)
+        unique_path = Path(unique_blob.file.path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            job = self._run(job)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(job.deleted_rows, job.total_rows)
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+        self.assertFalse(Task.objects.filter(project_id=self.project.pk).exists())
+        self.assertFalse(Activity.objects.filter(project_id=self.project.pk).exists())
+        self.assertFalse(Notification.objects.filter(object_id=self.task.pk).exists())
+        self.assertFalse(SearchEntry.objects.filter(kind='task', object_id=self.task.pk).exists())
+        # El blob compartido pierde una referencia; el exclusivo desaparece con su archivo
+        self.assertEqual(StoredFile.objects.get(pk=self.shared.blob_id).ref_count, 1)
+        self.assertFalse(StoredFile.objects.filter(pk=unique_blob.pk).exists())
+        self.assertFalse(unique_path.exists())
+        self.assertTrue(Task.objects.filter(pk=self.other_task.pk).exists())
+
+        # Repetir un trabajo terminado no hace nada
+        with self.assertNumQueries(1):
+            deletion.run(job.pk)
+
+    def test_deleting_an_archived_project_releases_the_snapshot(self):
+        Task.objects.filter(project=self.project).update(status=Task.Status.DONE)
+        self.client.post(reverse('core:project_archive', args=[self.project.slug]))
+        record = ProjectArchive.objects.get(project=self.project)
+        archive.process(record.pk)
+        record.refresh_from_db()
+        snapshot_path = Path(record.snapshot.path)
+
+        self.client.post(reverse('core:project_delete', args=[self.project.slug]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self._run(DeletionJob.objects.get())
+        self.assertFalse(ProjectArchive.objects.exists())
+        self.assertFalse(snapshot_path.exists())
+        self.assertEqual(StoredFile.objects.get(pk=self.shared.blob_id).ref_count, 1)
+        self.assertFalse(StoredFile.objects.filter(pk=self.unique.blob_id).exists())
+
+    def test_workspace_deletion_and_status_endpoint(self):
+        response = self.client.post(reverse('core:workspace_delete', args=[self.workspace.slug]))
+        self.assertRedirects(response, reverse('core:workspace_list'))
+        self.assertFalse(Project.objects.filter(workspace_id=self.workspace.pk).exists())
+        job = DeletionJob.objects.get()
+        response = self.client.get(reverse('core:workspace_list'))
+        self.assertContains(response, 'Eliminaciones en curso')
+        self.assertNotContains(response, reverse('core:workspace_detail', args=[self.workspace.slug]))
+
+        status_url = reverse('core:deletion_status', args=[job.pk])
+        self.assertEqual(self.client.get(status_url).json()['finished'], False)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(status_url).status_code, 404)  # solo quien lo pidió
+
+        self._run(job)
+        self.assertFalse(Workspace.all_objects.filter(pk=self.workspace.pk).exists())
+        self.assertFalse(Membership.objects.filter(workspace_id=self.workspace.pk).exists())
+        self.assertFalse(Task.objects.filter(pk=self.other_task.pk).exists())
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(status_url).json(), {
+            'name': 'Equipo', 'kind': 'workspace', 'progress': 100,
+            'deleted_rows': job.total_rows, 'total_rows': job.total_rows, 'finished': True,
+        })
+
+    def test_projects_being_archived_are_not_deleted(self):
+        Task.objects.filter(project=self.project).update(status=Task.Status.DONE)
+        with self.captureOnCommitCallbacks():
+            record = archive.start_archive(self.project, self.owner)  # el hilo del archivo aún no ha terminado
+        response = self.client.post(reverse('core:workspace_delete', args=[self.workspace.slug]))
+        self.assertRedirects(response, reverse('core:workspace_detail', args=[self.workspace.slug]))
+        self.assertFalse(DeletionJob.objects.exists())
+        self.assertIsNone(Workspace.objects.get(pk=self.workspace.pk).deleted_at)
+
+        # Un trabajo ya encolado espera a que el archivo termine
+        job = DeletionJob.objects.create(kind=DeletionJob.Kind.WORKSPACE, object_id=self.workspace.pk, name='Equipo')
+        with self.assertLogs('core.deletion', 'WARNING'):
+            deletion.run(job.pk)
+        job.refresh_from_db()
+        self.assertIsNone(job.finished_at)
+        self.assertTrue(ProjectArchive.objects.filter(pk=record.pk).exists())
+        self.assertTrue(Task.objects.filter(project=self.project).exists())
+
+        archive.process(record.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            job = self._run(job)
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(Workspace.all_objects.filter(pk=self.workspace.pk).exists())
+        self.assertFalse(StoredFile.objects.filter(pk=self.unique.blob_id).exists())
+
+    def test_process_deletions_command(self):
+        job = deletion.request_deletion(self.project, self.owner)
+        out = StringIO()
+        call_command('process_deletions', stdout=out)
+        self.assertIn('1 borrado(s)', out.getvalue())
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished_at)
+
+
+class WorkspaceTransferTests(WorkspaceTestCase):
+    """ Exportación a zip de NDJSON (en streaming) e importación por lotes con traducción de ids. """
+
+    separate_owner = True
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.role = Role.objects.create(name='Desarrollo')
+        Membership.objects.filter(user=cls.user, workspace=cls.workspace).update(role=cls.role)
+        cls.invitation = Invitation.objects.create(workspace=cls.workspace, sender=cls.owner, email='nuevo@example.com')
+
+    def setUp(self):
+        super().setUp()
+        self.use_temp_media()
+        self.client.force_login(self.owner)
+
+        self.design = Task.objects.create(project=self.project, title='Diseño', assignee=self.user)
+        self.build = Task.objects.create(project=self.project, title='Construcción')
+        self.build.predecessors.add(self.design)
+        self.comment = Comment.objects.create(task=self.design, author=self.user, text='Planos revisados')
+        self.attachment = Attachment.create_from_upload(self.comment, self.user, SimpleUploadedFile('planos.pdf', b'%PDF planos'))
+        TimeLog.objects.create(task=self.design, user=self.user)  # cronómetro en curso
+        Activity.objects.create(project=self.project, actor=self.user, verb='comentó en la tarea', target=self.design)
+        Notification.objects.create(recipient=self.owner, actor=self.user, verb='comentó en la tarea', target=self.design)
+
+        # Proyecto archivado: sus filas solo están en el snapshot
+        self.old = Project.objects.create(workspace=self.workspace, name='Antiguo')
+        old_task = Task.objects.create(project=self.old, title='Entregado', status=Task.Status.DONE)
+        old_comment = Comment.objects.create(task=old_task, author=self.owner, text='Cerrado')
+        Attachment.create_from_upload(old_comment, self.owner, SimpleUploadedFile('acta.pdf', b'%PDF acta'))
+        record = archive.start_archive(self.old, self.owner)
+        archive.process(record.pk)
+
+    def _export(self):
+        buffer = BytesIO()
+        transfer.export_workspace(self.workspace, buffer)
+        buffer.seek(0)
+        return buffer
+
+    def test_export_import_round_trip(self):
+        blob = StoredFile.objects.get(pk=self.attachment.blob_id)
+        buffer = self._export()
+        # Lotes pequeños: los ids se traducen entre lotes distintos
+        with mock.patch.object(transfer, 'CHUNK_SIZE', 2):
+            copy = transfer.import_workspace(buffer, name='Copia')
+
+        self.assertNotEqual(copy.pk, self.workspace.pk)
+        self.assertEqual(copy.name, 'Copia')
+        self.assertIsNone(Workspace.objects.get(pk=copy.pk).deleted_at)
+        self.assertEqual(copy.owner, self.owner)
+        self.assertEqual(
+            set(Membership.objects.filter(workspace=copy).values_list('user', 'role')),
+            {(self.owner.pk, None), (self.user.pk, self.role.pk)},
+        )
+        invitation = Invitation.objects.get(workspace=copy)
+        self.assertNotEqual(invitation.token, self.invitation.token)
+
+        projects = {project.name: project for project in Project.objects.filter(workspace=copy)}
+        self.assertEqual(set(projects), {'Proyecto', 'Antiguo'})
+        self.assertNotEqual(projects['Proyecto'].slug, self.project.slug)
+        self.assertEqual(projects['Proyecto'].created_at, self.project.created_at)
+        # El proyecto archivado vuelve como proyecto normal, con las filas de su snapshot
+        self.assertIsNone(projects['Antiguo'].archived_at)
+        self.assertTrue(Attachment.objects.filter(comment__task__project=projects['Antiguo']).exists())
+
+        design = Task.objects.get(project=projects['Proyecto'], title='Diseño')
+        build = Task.objects.get(project=projects['Proyecto'], title='Construcción')
+        self.assertEqual(design.created_at, self.design.created_at)
+        self.assertEqual(design.assignee, self.user)
+        self.assertEqual(list(build.predecessors.all()), [design])
+        self.assertEqual(
+            list(TaskTransition.objects.filter(task=design).values_list('project', 'to_status')),
+            [(projects['Proyecto'].pk, Task.Status.BACKLOG)],
+        )
+        attachment = Attachment.objects.get(comment__task=design)
+        self.assertEqual((attachment.comment.text, attachment.blob_id), ('Planos revisados', blob.pk))
+        self.assertEqual(StoredFile.objects.get(pk=blob.pk).ref_count, blob.ref_count + 1)
+        self.assertIsNotNone(TimeLog.objects.get(task=design).end_time)
+        self.assertEqual(Activity.objects.get(project=projects['Proyecto']).target, design)
+        self.assertEqual(Notification.objects.get(object_id=design.pk, recipient=self.owner).target, design)
+        # Índice de búsqueda del nuevo workspace
+        self.assertTrue(SearchEntry.objects.filter(workspace=copy, kind=SearchEntry.Kind.TASK, object_id=design.pk).exists())
+        # El original no cambia
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 2)
+
+    def test_download_is_streamed(self):
+        response = self.client.get(reverse('core:workspace_export', args=[self.workspace.slug]))
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        archive_zip = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        manifest = json.loads(archive_zip.read('manifest.json'))
+        self.assertEqual(manifest['counts']['tasks'], 3)
+        self.assertEqual(manifest['counts']['users'], 2)
+        blob = StoredFile.objects.get(pk=self.attachment.blob_id)
+        self.assertEqual(archive_zip.read(f'blobs/{blob.sha256}'), b'%PDF planos')
+        lines = archive_zip.read('notifications.ndjson').decode().splitlines()
+        self.assertEqual(json.loads(lines[0])['content_type'], 'core.task')
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:workspace_export', args=[self.workspace.slug]))
+        self.assertEqual(response.status_code, 404)  # solo el dueño
+
+    async def test_download_is_streamed_under_asgi(self):
+        # Con un iterador síncrono Django lo leería entero con sync_to_async(list)
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get(reverse('core:workspace_export', args=[self.workspace.slug]))
+        self.assertTrue(response.is_async)
+        archive_zip = zipfile.ZipFile(BytesIO(b''.join([part async for part in response.streaming_content])))
+        manifest = json.loads(archive_zip.read('manifest.json'))
+        self.assertEqual(manifest['counts']['tasks'], 3)
+
+    def test_missing_users_are_created_inactive(self):
+        buffer = self._export()
+        User.objects.filter(pk=self.user.pk).delete()
+        copy = transfer.import_workspace(buffer)
+        user = User.objects.get(email='dev@example.com')
+        self.assertFalse(user.is_active)
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(user.first_name, 'Ana')
+        self.assertTrue(Comment.objects.filter(task__project__workspace=copy, author=user).exists())
+
+    def test_failed_import_is_hidden_and_queued_for_deletion(self):
+        # Un blob nuevo cuyo contenido no coincide con su hash
+        source = zipfile.ZipFile(self._export())
+        fake = '0' * 64
+        corrupt = BytesIO()
+        with zipfile.ZipFile(corrupt, 'w') as target:
+            for item in source.infolist():
+                data = source.read(item)
+                if item.filename == 'blobs.ndjson':
+                    rows = [json.loads(line) for line in data.splitlines()]
+                    rows[0]['sha256'] = fake
+                    data = ''.join(json.dumps(row) + '\n' for row in rows)
+                target.writestr(item, data)
+            target.writestr(f'blobs/{fake}', b'otro contenido')
+        corrupt.seek(0)
+        workspaces = set(Workspace.all_objects.values_list('pk', flat=True))
+
+        with self.assertRaises(ValueError):
+            transfer.import_workspace(corrupt)
+        partial = Workspace.all_objects.exclude(pk__in=workspaces).get()
+        self.assertIsNotNone(partial.deleted_at)
+        self.assertFalse(Project.objects.filter(workspace=partial).exists())
+        self.assertTrue(DeletionJob.objects.filter(kind=DeletionJob.Kind.WORKSPACE, object_id=partial.pk).exists())
+
+    def test_commands(self):
+        path = Path(self.tmp.name) / 'equipo.zip'
+        out = StringIO()
+        call_command('export_workspace', self.workspace.slug, output=str(path), stdout=out)
+        self.assertIn('exportada(s)', out.getvalue())
+        call_command('import_workspace', str(path), name='Importado', stdout=out)
+        self.assertTrue(Workspace.objects.filter(name='Importado').exists())
@@ -0,0 +1,462 @@
+"""
+Exportación e importación de un workspace completo (copia de seguridad o
+traslado a otra instalación) sin volcar toda la base de datos.
+
+El archivo es un zip con un NDJSON por sección (una fila por línea, con los
+ids de origen), el contenido de los adjuntos y un manifest.json:
+
+    manifest.json           versión, nombre del workspace y filas por sección
+    users.ndjson            usuarios referenciados (se identifican por email)
+    roles.ndjson            roles de las membresías (se identifican por nombre)
+    workspace.ndjson, memberships.ndjson, ..., notifications.ndjson
+    blobs.ndjson            StoredFile de los adjuntos; su contenido en blobs/<sha256>
+    media/<ruta>            adjuntos anteriores al almacenamiento deduplicado
+
+La exportación escribe en streaming (las filas se leen con iterator() y el
+zip no necesita seek, así que la vista lo envía mientras se genera): la
+memoria depende del número de usuarios y archivos distintos, no de filas.
+Los proyectos archivados se exportan desde su snapshot (ver core/archive.py).
+
+La importación crea siempre un workspace nuevo. Lee cada sección en orden de
+dependencias, inserta por lotes de CHUNK_SIZE con bulk_create (una
+transacción corta por lote) y traduce los ids de origen a los nuevos con un
+mapa por modelo; solo se guardan los mapas de los modelos a los que apuntan
+otras filas. Mientras dura, el workspace y sus proyectos están ocultos
+(deleted_at); si falla se encola su borrado (ver core/deletion.py). Los
+usuarios que no existen se crean inactivos y sin contraseña, los proyectos
+archivados vuelven como proyectos normales y los cronómetros en curso se
+cierran en la fecha de la exportación. Los índices de búsqueda se
+reconstruyen al final.
+"""
+import itertools
+import json
+import logging
+import shutil
+import tempfile
+import uuid
+import zipfile
+from collections import Counter, defaultdict
+
+import shortuuid
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from . import archive, deletion, events, search
+from .models import (Activity, Attachment, Comment, Invitation, Membership, Notification, Project, ProjectArchive,
+                     Role, StoredFile, Task, TaskTransition, TimeLog, Workspace)
+from .storage import hash_file
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+CHUNK_SIZE = 1000
+MANIFEST = 'manifest.json'
+COPY_CHUNK_SIZE = 1024 * 1024
+
+User = get_user_model()
+Edge = Task.predecessors.through
+
+USER_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name')
+ROLE_FIELDS = ('id', 'name', 'description', 'is_admin_role')
+BLOB_FIELDS = ('id', 'sha256', 'size')
+
+
+def _projects(workspace):
+    return Project.objects.filter(workspace=workspace)
+
+
+def _targets(workspace):
+    """ Filas con relación genérica hacia el workspace, sus proyectos o sus tareas. """
+    content_type = ContentType.objects.get_for_model
+    return (
+        Q(content_type=content_type(Task), object_id__in=Task.objects.filter(project__in=_projects(workspace)).values('pk'))
+        | Q(content_type=content_type(Project), object_id__in=_projects(workspace).values('pk'))
+        | Q(content_type=content_type(Workspace), object_id=workspace.pk)
+    )
+
+
+# Sección -> (modelo, filas del workspace), en orden de dependencias
+SECTIONS = {
+    'workspace': (Workspace, lambda workspace: Workspace.objects.filter(pk=workspace.pk)),
+    'memberships': (Membership, lambda workspace: Membership.objects.filter(workspace=workspace)),
+    'invitations': (Invitation, lambda workspace: Invitation.objects.filter(workspace=workspace)),
+    'projects': (Project, _projects),
+    'tasks': (Task, lambda workspace: Task.objects.filter(project__in=_projects(workspace))),
+    'dependencies': (Edge, lambda workspace: Edge.objects.filter(
+        from_task__project__in=_projects(workspace), to_task__project__in=_projects(workspace),
+    )),
+    'transitions': (TaskTransition, lambda workspace: TaskTransition.objects.filter(project__in=_projects(workspace))),
+    'comments': (Comment, lambda workspace: Comment.objects.filter(task__project__in=_projects(workspace))),
+    'attachments': (Attachment, lambda workspace: Attachment.objects.filter(comment__task__project__in=_projects(workspace))),
+    'timelogs': (TimeLog, lambda workspace: TimeLog.objects.filter(task__project__in=_projects(workspace))),
+    'activities': (Activity, lambda workspace: Activity.objects.filter(
+        Q(project__in=_projects(workspace)) | Q(project__isnull=True) & _targets(workspace),
+    )),
+    'notifications': (Notification, lambda workspace: Notification.objects.filter(_targets(workspace))),
+}
+# Orden de importación: los usuarios, roles y blobs se escriben al final de la
+# exportación (se recogen al recorrer las filas), pero se necesitan antes
+IMPORT_ORDER = ['users', 'roles', *SECTIONS]
+IMPORT_ORDER.insert(IMPORT_ORDER.index('attachments'), 'blobs')
+# Modelos a los que apuntan otras filas: solo de estos se guarda el mapa de ids
+MAPPED = {User, Role, StoredFile, Workspace, Membership, Invitation, Project, Task, Comment}
+
+
+def _fields(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _relations(model):
+    return [field for field in model._meta.concrete_fields if field.is_relation and field.related_model is not ContentType]
+
+
+def _label(content_type_id):
+    if content_type_id is None:
+        return None
+    content_type = ContentType.objects.get_for_id(content_type_id)
+    return f'{content_type.app_label}.{content_type.model}'
+
+
+def check_exportable(workspace):
+    """ Un proyecto a medio archivar o restaurar tiene sus filas repartidas entre tablas y snapshot. """
+    busy = ProjectArchive.objects.filter(project__workspace=workspace).exclude(state=ProjectArchive.State.ARCHIVED)
+    if busy.exists():
+        raise ValueError('Hay proyectos archivándose o restaurándose; inténtalo cuando terminen.')
+
+
+# --- Exportación ---
+class _Stream:
+    """ Destino sin seek para zipfile: acumula lo escrito hasta que se recoge. """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class _References:
+    """ Ids de usuarios, roles y blobs (y archivos sin blob) usados por las filas exportadas. """
+
+    def __init__(self):
+        self.ids = defaultdict(set)
+        self.files = set()
+
+    def collect(self, model, row):
+        for field in _relations(model):
+            if field.related_model in (User, Role, StoredFile) and row[field.attname] is not None:
+                self.ids[field.related_model].add(row[field.attname])
+        if model is Attachment and not row['blob_id'] and row['file']:
+            self.files.add(row['file'])
+
+
+def stream(workspace):
+    """ Genera el zip de la exportación por partes (para StreamingHttpResponse). """
+    out = _Stream()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for _ in _write(zf, workspace, {}):
+            if data := out.drain():
+                yield data
+    yield out.drain()
+
+
+def export_workspace(workspace, fileobj):
+    """ Escribe la exportación en un archivo abierto en binario. Devuelve las filas por sección. """
+    counts = {}
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for _ in _write(zf, workspace, counts):
+            pass
+    return counts
+
+
+def _write(zf, workspace, counts):
+    """ Escribe las entradas del zip; cede el control tras cada lote y anota en 'counts' las filas por sección. """
+    check_exportable(workspace)
+    # Los eventos pendientes deben llegar a la actividad y las notificaciones exportadas
+    events.project_pending()
+    archived = list(ProjectArchive.objects.filter(project__in=_projects(workspace)).exclude(snapshot=''))
+    references = _References()
+    for section, (model, queryset) in SECTIONS.items():
+        rows = queryset(workspace).order_by('pk').values(*_fields(model)).iterator(chunk_size=CHUNK_SIZE)
+        if section in archive.SECTIONS:
+            rows = itertools.chain(rows, *(_snapshot_rows(record, section) for record in archived))
+        counts[section] = yield from _write_section(zf, section, _exported(model, rows, references))
+
+    for section, model, fields in (('users', User, USER_FIELDS), ('roles', Role, ROLE_FIELDS), ('blobs', StoredFile, BLOB_FIELDS)):
+        counts[section] = yield from _write_section(zf, section, _rows_by_id(model, fields, references.ids[model]))
+    blob_ids = sorted(references.ids[StoredFile])
+    for start in range(0, len(blob_ids), CHUNK_SIZE):
+        for blob in StoredFile.objects.filter(pk__in=blob_ids[start:start + CHUNK_SIZE]).only('sha256', 'file'):
+            with blob.file.open('rb') as source:
+                yield from _write_file(zf, f'blobs/{blob.sha256}', source)
+    for name in sorted(references.files):
+        if default_storage.exists(name):
+            with default_storage.open(name, 'rb') as source:
+                yield from _write_file(zf, f'media/{name}', source)
+        else:
+            logger.warning('Adjunto sin archivo en la exportación: %s', name)
+
+    zf.writestr(MANIFEST, json.dumps({
+        'version': FORMAT_VERSION,
+        'workspace': workspace.name,
+        'exported_at': timezone.now().isoformat(),
+        'counts': counts,
+    }, indent=2))
+
+
+def _snapshot_rows(record, section):
+    for name, row in archive.read_snapshot(record):
+        if name == section:
+            yield row
+
+
+def _exported(model, rows, references):
+    """ Filas tal cual salen de la base de datos; el content_type va como etiqueta (sus ids cambian entre instalaciones). """
+    for row in rows:
+        references.collect(model, row)
+        if 'content_type_id' in row:
+            row['content_type'] = _label(row.pop('content_type_id'))
+        yield row
+
+
+def _rows_by_id(model, fields, ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield from model.objects.filter(pk__in=ids[start:start + CHUNK_SIZE]).order_by('pk').values(*fields)
+
+
+def _write_section(zf, section, rows):
+    """ Escribe una sección; cede el control tras cada lote. Devuelve el número de filas. """
+    count = 0
+    with zf.open(f'{section}.ndjson', 'w', force_zip64=True) as out:
+        for row in rows:
+            out.write((json.dumps(row, cls=archive._Encoder) + '\n').encode())
+            count += 1
+            if count % CHUNK_SIZE == 0:
+                yield
+    yield
+    return count
+
+
+def _write_file(zf, name, source):
+    with zf.open(name, 'w', force_zip64=True) as out:
+        while chunk := source.read(COPY_CHUNK_SIZE):
+            out.write(chunk)
+            yield
+
+
+# --- Importación ---
+def import_workspace(source, name=None):
+    """ Importa una exportación (ruta o archivo binario) como un workspace nuevo y lo devuelve. """
+    with zipfile.ZipFile(source) as zf:
+        manifest = json.loads(zf.read(MANIFEST))
+        if manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Versión de exportación no soportada: {manifest.get('version')}")
+        importer = _Importer(zf, manifest, name)
+        try:
+            importer.run()
+        except Exception:
+            if importer.workspace is not None:
+                deletion.request_deletion(importer.workspace, None)
+            raise
+    return importer.workspace
+
+
+class _Importer:
+
+    def __init__(self, zf, manifest, name=None):
+        self.zf = zf
+        self.names = set(zf.namelist())
+        self.name = name
+        self.exported_at = parse_datetime(manifest['exported_at'])
+        self.started = timezone.now()
+        self.workspace = None
+        self.maps = defaultdict(dict)
+        self.blob_files = {}
+        self.legacy_files = {}
+
+    def run(self):
+        for section in IMPORT_ORDER:
+            loader = getattr(self, f'_load_{section}', None)
+            for rows in self._chunks(section):
+                if loader:
+                    loader(rows)
+                else:
+                    self._insert(section, rows)
+            if section == 'workspace' and self.workspace is None:
+                raise ValueError('La exportación no contiene el workspace.')
+        with transaction.atomic():
+            Project.all_objects.filter(workspace=self.workspace).update(deleted_at=None)
+            Workspace.all_objects.filter(pk=self.workspace.pk).update(deleted_at=None)
+        self.workspace.deleted_at = None
+        search.rebuild(workspace_ids=[self.workspace.pk])
+
+    def _chunks(self, section):
+        name = f'{section}.ndjson'
+        if name not in self.names:
+            return
+        with self.zf.open(name) as lines:
+            rows = (json.loads(line) for line in lines)
+            while chunk := list(itertools.islice(rows, CHUNK_SIZE)):
+                yield chunk
+
+    def _insert(self, section, rows):
+        model = SECTIONS[section][0]
+        prepare = getattr(self, f'_prepare_{section}', None)
+        objects, old_ids = [], []
+        for row in rows:
+            old_id = row.pop('id')
+            if not self._remap(model, row):
+                continue
+            objects.append(row)
+            old_ids.append(old_id)
+        if prepare:
+            prepare(objects)
+        objects = [model(**row) for row in objects]
+        with transaction.atomic():
+            # Una dependencia entre dos proyectos archivados viene en los dos snapshots
+            model.objects.bulk_create(objects, batch_size=CHUNK_SIZE, ignore_conflicts=model is Edge)
+            if model is Attachment:
+                for blob_id, refs in Counter(obj.blob_id for obj in objects if obj.blob_id).items():
+                    StoredFile.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + refs)
+        if model in MAPPED:
+            self.maps[model].update(zip(old_ids, (obj.pk for obj in objects)))
+        if model is Workspace and objects:
+            self.workspace = objects[0]
+
+    def _remap(self, model, row):
+        """ Traduce las claves ajenas a los ids nuevos. False si falta una obligatoria. """
+        for field in _relations(model):
+            old = row[field.attname]
+            if old is None:
+                continue
+            row[field.attname] = self.maps[field.related_model].get(old)
+            if row[field.attname] is None and not field.null:
+                return False
+        if 'content_type' in row:
+            label, object_id = row.pop('content_type'), row.pop('object_id')
+            target = apps.get_model(label) if label else None
+            row['object_id'] = self.maps[target].get(object_id) if target in MAPPED else None
+            if row['object_id'] is None:
+                if not model._meta.get_field('content_type').null:
+                    return False
+                row['content_type_id'] = None
+            else:
+                row['content_type_id'] = ContentType.objects.get_for_model(target).pk
+        return True
+
+    # Secciones sin modelo propio del workspace
+    def _load_users(self, rows):
+        """ Los usuarios existentes se reconocen por email; el resto se crean inactivos. """
+        existing = dict(User.objects.filter(email__in=[row['email'] for row in rows]).values_list('email', 'pk'))
+        taken = set(User.objects.filter(username__in=[row['username'] for row in rows]).values_list('username', flat=True))
+        new = []
+        for row in rows:
+            if row['email'] in existing:
+                continue
+            username = row['username']
+            while username in taken:
+                username = f"{row['username'][:140]}-{shortuuid.uuid()[:4]}"
+            taken.add(username)
+            user = User(email=row['email'], username=username, first_name=row['first_name'],
+                        last_name=row['last_name'], is_active=False)
+            user.set_unusable_password()
+            new.append(user)
+        User.objects.bulk_create(new, batch_size=CHUNK_SIZE)
+        existing.update((user.email, user.pk) for user in new)
+        self.maps[User].update((row['id'], existing[row['email']]) for row in rows)
+
+    def _load_roles(self, rows):
+        for row in rows:
+            role, _ = Role.objects.get_or_create(
+                name=row['name'], defaults={'description': row['description'], 'is_admin_role': row['is_admin_role']},
+            )
+            self.maps[Role][row['id']] = role.pk
+
+    def _load_blobs(self, rows):
+        """ Contenido deduplicado: solo se copian los blobs que no existen ya. Las referencias las suman los adjuntos. """
+        existing = dict(StoredFile.objects.filter(sha256__in=[row['sha256'] for row in rows]).values_list('sha256', 'pk'))
+        for row in rows:
+            sha256 = row['sha256']
+            if sha256 not in existing:
+                with tempfile.TemporaryFile() as tmp:
+                    with self.zf.open(f'blobs/{sha256}') as source:
+                        shutil.copyfileobj(source, tmp)
+                    content = File(tmp, name=sha256)
+                    if hash_file(content) != sha256:
+                        raise ValueError(f'El contenido de blobs/{sha256} no coincide con su hash.')
+                    existing[sha256] = StoredFile.store(content, sha256=sha256, refs=0).pk
+            self.maps[StoredFile][row['id']] = existing[sha256]
+        self.blob_files.update(StoredFile.objects.filter(pk__in=existing.values()).values_list('pk', 'file'))
+
+    # Ajustes por sección antes de insertar (filas ya traducidas)
+    def _prepare_workspace(self, rows):
+        for row in rows:
+            row['name'] = self.name or row['name']
+            row['slug'] = _free_slugs(Workspace, [row['slug']])[row['slug']]
+            # Oculto hasta terminar la importación
+            row['deleted_at'] = self.started
+
+    def _prepare_invitations(self, rows):
+        for row in rows:
+            row['token'] = uuid.uuid4()
+
+    def _prepare_projects(self, rows):
+        slugs = _free_slugs(Project, [row['slug'] for row in rows])
+        for row in rows:
+            row['slug'] = slugs[row['slug']]
+            row['archived_at'] = None
+            row['deleted_at'] = self.started
+
+    def _prepare_attachments(self, rows):
+        for row in rows:
+            if row['blob_id']:
+                row['file'] = self.blob_files[row['blob_id']]
+            elif row['file']:
+                row['file'] = self._legacy_file(row['file'])
+
+    def _legacy_file(self, name):
+        if name not in self.legacy_files:
+            member = f'media/{name}'
+            if member in self.names:
+                with self.zf.open(member) as source:
+                    self.legacy_files[name] = default_storage.save(name, File(source, name=name))
+            else:
+                self.legacy_files[name] = name
+        return self.legacy_files[name]
+
+    def _prepare_timelogs(self, rows):
+        # Un cronómetro en curso chocaría con el que el usuario pueda tener abierto aquí
+        for row in rows:
+            if row['end_time'] is None:
+                row['end_time'] = self.exported_at
+
+
+def _free_slugs(model, slugs):
+    """ {slug: slug libre}; los que ya existen reciben un sufijo, como en save(). """
+    taken = set(model.all_objects.filter(slug__in=slugs).values_list('slug', flat=True))
+    result = {}
+    for slug in slugs:
+        free = slug
+        while free in taken:
+            free = f'{slugify(slug)[:240]}-{shortuuid.uuid()[:4]}'
+        taken.add(free)
+        result[slug] = free
+    return result
@@ -15,8 +15,16 @@ from .views import (
     project_create_form, project_create_action,
     ProjectGanttView,
     toggle_time_log, project_gantt_data,
+    notification_count, task_time_summary,
     TeamDirectoryView, ProjectReportsView,
     update_member_role, create_role,
+    perf_stats, profile_list, profile_download,
+    chunked_upload_start, chunked_upload_chunk,
+    attachment_download, attachment_preview,
+    task_comments, task_autocomplete, member_autocomplete,
+    global_search, api_project_list, api_task_list, api_task_upsert,
+    project_archive, project_restore,
+    workspace_delete, project_delete, deletion_status, workspace_export,
 )
 
 app_name = 'core'
@@ -26,18 +34,37 @@ urlpatterns = [
     path('', WorkspaceListView.as_view(), name='workspace_list'),
     path('create/', WorkspaceCreateView.as_view(), name='workspace_create'),
     path('notifications/', NotificationListView.as_view(), name='notification_list'),
+    path('search/', global_search, name='global_search'),
     path('invitations/accept/<uuid:token>/', accept_invitation, name='accept_invitation'),
     path('memberships/<int:membership_id>/update-role/', update_member_role, name='update_member_role'),
     
     # ---- Rutas de API (Endpoints para htmx) ----
     path('api/tasks/update-status/', update_task_status, name='update_task_status'),
     path('api/projects/<slug:project_slug>/gantt-data/', project_gantt_data, name='project_gantt_data'),
+    path('api/notifications/count/', notification_count, name='notification_count'),
+    path('api/tasks/<int:task_pk>/time-summary/', task_time_summary, name='task_time_summary'),
+    path('api/tasks/<int:task_pk>/comments/', task_comments, name='task_comments'),
+    path('api/projects/<slug:project_slug>/task-autocomplete/', task_autocomplete, name='task_autocomplete'),
+    path('api/workspaces/<slug:workspace_slug>/member-autocomplete/', member_autocomplete, name='member_autocomplete'),
+    path('api/perf/', perf_stats, name='perf_stats'),
+    path('api/deletions/<int:job_id>/', deletion_status, name='deletion_status'),
+    path('api/v1/projects/', api_project_list, name='api_project_list'),
+    path('api/v1/projects/<slug:project_slug>/tasks/', api_task_list, name='api_task_list'),
+    path('api/v1/projects/<slug:project_slug>/tasks/upsert/', api_task_upsert, name='api_task_upsert'),
+    path('api/uploads/', chunked_upload_start, name='chunked_upload_start'),
+    path('api/uploads/<uuid:upload_id>/', chunked_upload_chunk, name='chunked_upload_chunk'),
+    path('attachments/<int:pk>/', attachment_download, name='attachment_download'),
+    path('attachments/<int:pk>/preview/', attachment_preview, name='attachment_preview'),
+    path('profiles/', profile_list, name='profile_list'),
+    path('profiles/<str:name>/', profile_download, name='profile_download'),
 
     # ---- Rutas de Workspaces (Específicas primero, genéricas después) ----
     path('<slug:workspace_slug>/manage/', WorkspaceManageView.as_view(), name='workspace_manage'),
     path('<slug:workspace_slug>/team/', TeamDirectoryView.as_view(), name='team_directory'),
     path('<slug:workspace_slug>/invite/', send_invitation, name='send_invitation'),
     path('<slug:workspace_slug>/roles/create/', create_role, name='create_role'),
+    path('<slug:workspace_slug>/delete/', workspace_delete, name='workspace_delete'),
+    path('<slug:workspace_slug>/export/', workspace_export, name='workspace_export'),
     path('<slug:workspace_slug>/projects/create-form/', project_create_form, name='project_create_form'),
     path('<slug:workspace_slug>/projects/create-action/', project_create_action, name='project_create_action'),
     path('<slug:workspace_slug>/', WorkspaceDetailView.as_view(), name='workspace_detail'), # Genérica al final del grupo
@@ -46,6 +73,9 @@ urlpatterns = [
     path('projects/<slug:project_slug>/', ProjectDetailView.as_view(), name='project_detail'),
     path('projects/<slug:project_slug>/gantt/', ProjectGanttView.as_view(), name='project_gantt'),
     path('projects/<slug:project_slug>/reports/', ProjectReportsView.as_view(), name='project_reports'),
+    path('projects/<slug:project_slug>/archive/', project_archive, name='project_archive'),
+    path('projects/<slug:project_slug>/restore/', project_restore, name='project_restore'),
+    path('projects/<slug:project_slug>/delete/', project_delete, name='project_delete'),
     path('projects/<slug:project_slug>/tasks/create/', create_task, name='task_create'),
     path('tasks/<int:pk>/', task_detail_update, name='task_detail_update'),
     path('tasks/<int:task_pk>/add-comment/', add_comment, name='add_comment'),
@@ -2,7 +2,10 @@ def can_user_interact_with_project(project, user):
     """ 
     Verifica si un usuario puede interactuar (modificar) con un proyecto.
     Retorna True si el proyecto no esta vencido, o si el usuario es el dueño.
+    Un proyecto archivado es de solo lectura para todos.
     """
+    if project.archived_at:
+        return False
     is_owner = (user == project.workspace.owner)
     is_expired = (project.health_status == 'Vencido')
     
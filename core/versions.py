@@ -0,0 +1,54 @@
+"""
+Versión de los datos de cada proyecto, para invalidar cálculos cacheados.
+
+Cada proyecto tiene un contador en la caché que se incrementa cuando cambian
+sus tareas (señales de core/signals.py y escrituras en lote). Los resultados
+derivados (capacidad, simulaciones...) incluyen la versión en su clave de caché:
+al cambiar los datos la clave cambia y el resultado viejo simplemente caduca.
+
+Con varios procesos la caché debe ser compartida (Redis, Memcached...): con
+LocMemCache cada proceso solo ve sus propios incrementos.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+
+def _key(project_id):
+    return f'version:project:{project_id}'
+
+
+def _initial():
+    # Si la clave se expulsó de la caché empezamos en un valor nuevo y mayor que
+    # cualquiera anterior: nunca se reutiliza un resultado calculado con datos viejos
+    return time.time_ns()
+
+
+def project_version(project_id):
+    key = _key(project_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_project(project_id):
+    try:
+        cache.incr(_key(project_id))
+    except ValueError:
+        cache.add(_key(project_id), _initial(), timeout=None)
+
+
+def projects_digest(project_ids):
+    """ Huella de la versión de varios proyectos (por ejemplo, todos los de un workspace). """
+    project_ids = sorted(project_ids)
+    stored = cache.get_many([_key(pk) for pk in project_ids])
+    missing = {_key(pk): _initial() for pk in project_ids if _key(pk) not in stored}
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, timeout=None)
+        stored = cache.get_many([_key(pk) for pk in project_ids])
+    raw = ','.join(f'{pk}:{stored.get(_key(pk))}' for pk in project_ids)
+    return hashlib.sha1(raw.encode()).hexdigest()
@@ -1,29 +1,62 @@
-from datetime import timedelta
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
 from django.shortcuts import render
 from django.views.generic import ListView, CreateView, DetailView, TemplateView
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
-from .models import Workspace, Membership, Project, Task, Comment, Attachment, Notification, Activity, Invitation, TimeLog, Role
+from .models import Workspace, Membership, Project, Task, Comment, Attachment, Notification, Invitation, DomainEvent, TimeLog, Role, ChunkedUpload, ProjectArchive, DeletionJob
 from .forms import WorkspaceForm, ProjectForm, TaskForm, CommentForm, InvitationForm, RoleForm
 from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_http_methods
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from .utils import can_user_interact_with_project
+from .routers import replica_read
+from .downloads import serve_protected_file, streaming_response
+from . import api, archive, capacity, deletion, events, flow, forecasting, perf, previews, profiling, scheduling, search, task_sync, transfer
 from django.contrib import messages
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.utils import timezone
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from collections import defaultdict
-from django.db.models import Count
+from django.db.models import Count, F, IntegerField, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.core.paginator import Paginator
+from django.http import Http404, FileResponse
+from django.core.files import File
+from asgiref.sync import sync_to_async
 
 User = get_user_model()
 
 class LandingPageView(TemplateView):
     template_name = 'core/landing_page.html'
 
+WORKSPACE_PAGE_SIZE = 24
+
+
+def annotate_workspace_counts(queryset):
+    """
+    Añade 'project_count' y 'member_count' con subconsultas correlacionadas:
+    a diferencia de dos Count() sobre JOINs, no multiplican filas entre sí.
+    """
+    def count_of(model, field):
+        counts = (
+            model.objects.filter(workspace=OuterRef('pk'))
+            .order_by().values('workspace')
+            .annotate(total=Count(field, distinct=True)).values('total')
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    return queryset.annotate(project_count=count_of(Project, 'pk'), member_count=count_of(Membership, 'user'))
+
+
 class WorkspaceListView(LoginRequiredMixin, ListView):
     model = Workspace
+    use_replica = True # Vista de solo lectura: puede leer de la réplica
     template_name = 'core/dashboard.html'
 
     def get_context_data(self, **kwargs):
@@ -32,9 +65,17 @@ class WorkspaceListView(LoginRequiredMixin, ListView):
 
         # --- 1. LÓGICA PARA LISTAR WORKSPACES  ---
         # Esto es necesario para TODOS los roles.
-        context['owned_workspaces'] = Workspace.objects.filter(owner=user)
-        context['shared_workspaces'] = user.workspaces.exclude(owner=user)
-        context['my_tasks'] = Task.objects.filter(assignee=user).exclude(status=Task.Status.DONE).order_by('due_date')
+        # Listas paginadas con los contadores anotados: 2 consultas por lista
+        # (total y página) aunque el usuario pertenezca a cientos de workspaces.
+        owned = annotate_workspace_counts(Workspace.objects.filter(owner=user))
+        shared = annotate_workspace_counts(
+            Workspace.objects.filter(membership__user=user).exclude(owner=user).select_related('owner')
+        )
+        context['owned_workspaces'] = self._paginate(owned, 'owned_page')
+        context['shared_workspaces'] = self._paginate(shared, 'shared_page')
+        # Borrados en curso pedidos por el usuario (con su progreso)
+        context['pending_deletions'] = DeletionJob.objects.filter(requested_by=user, finished_at__isnull=True)
+        context['my_tasks'] = Task.objects.filter(assignee=user, project__deleted_at__isnull=True).exclude(status=Task.Status.DONE).select_related('project').order_by('due_date')
 
         # --- 2. LÓGICA PARA WIDGETS POR ROL ---
         # Verificamos si el usuario tiene el rol de PMO
@@ -62,12 +103,12 @@ class WorkspaceListView(LoginRequiredMixin, ListView):
                 due_date__lt=today
             ).exclude(status=Task.Status.DONE)
 
-        else:
-            # Mostramos las tareas asignadas al usuario actual
-            context['my_tasks'] = Task.objects.filter(assignee=user).exclude(status=Task.Status.DONE).order_by('due_date')
-
         return context
 
+    def _paginate(self, queryset, page_param):
+        paginator = Paginator(queryset.order_by('name', 'pk'), WORKSPACE_PAGE_SIZE)
+        return paginator.get_page(self.request.GET.get(page_param))
+
 class WorkspaceCreateView(LoginRequiredMixin, CreateView):
     model = Workspace
     form_class = WorkspaceForm
@@ -198,28 +239,22 @@ def accept_invitation(request, token):
         return redirect('core:workspace_detail', slug=workspace.slug)
 
     # Si todo está en orden, añadimos al usuario al equipo
-    Membership.objects.create(
-        user=user,
-        workspace=workspace,
-        role=Membership.Role.MEMBER
-    )
+    with transaction.atomic():
+        Membership.objects.create(
+            user=user,
+            workspace=workspace,
+            role=Membership.Role.MEMBER
+        )
 
-    # Marcamos la invitación como utilizada
-    invitation.is_accepted = True
-    invitation.save()
-
-    # Creamos un registro de actividad y notificaciones
-    verb_text = f'se unió al equipo "{workspace.name}"'
-    # Corregimos el target para que apunte al workspace, no a un proyecto nulo
-    Activity.objects.create(project=None, actor=user, verb=verb_text, target=workspace)
-    
-    # Notificamos al dueño del workspace
-    Notification.objects.create(
-        recipient=workspace.owner,
-        actor=user,
-        verb='aceptó tu invitación para unirse al equipo',
-        target=workspace
-    )
+        # Marcamos la invitación como utilizada
+        invitation.is_accepted = True
+        invitation.save()
+
+        # La actividad y la notificación al dueño las crea el proyector (ver core/events.py)
+        events.record(
+            DomainEvent.Kind.INVITATION_ACCEPTED, user, target=workspace,
+            recipients=[workspace.owner_id], workspace=workspace.name,
+        )
 
     messages.success(request, f"¡Bienvenido! Has sido añadido al equipo '{workspace.name}'.")
     return redirect('core:workspace_detail', slug=workspace.slug)
@@ -245,6 +280,21 @@ class ProjectDetailView(LoginRequiredMixin, DetailView):
     template_name = 'core/project_detail.html'
     context_object_name = 'project'
     
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        if self.object.archived_at:
+            # Proyecto archivado en frío: tablero de solo lectura leído del snapshot
+            record = get_object_or_404(ProjectArchive, project=self.object)
+            context = {
+                'project': self.object,
+                'archive': record,
+                'is_owner': self.object.workspace.owner_id == request.user.pk,
+            }
+            if record.state == ProjectArchive.State.ARCHIVED:
+                context.update(archive.board_context(record))
+            return render(request, 'core/project_archived.html', context)
+        return self.render_to_response(self.get_context_data(object=self.object))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         project = self.get_object()
@@ -298,6 +348,8 @@ class ProjectDetailView(LoginRequiredMixin, DetailView):
         context['activities'] = self.get_object().activities.all()[:5] # Mostramos las 15 más recientes
         
         context['is_locked'] = not can_user_interact_with_project(project, self.request.user)
+        # Solo los proyectos terminados se pueden archivar (ver core/archive.py)
+        context['can_archive'] = project.workspace.owner_id == self.request.user.pk and project.health_status == 'Terminado'
         return context
     
     def get_queryset(self):
@@ -324,7 +376,8 @@ def update_task_status(request):
         # Buscamos la tarea y verificamos el permiso en una sola consulta
         task = Task.objects.get(
             id=task_id,
-            project__workspace__members=request.user
+            project__workspace__members=request.user,
+            project__deleted_at__isnull=True,
         )
         
         if not can_user_interact_with_project(task.project, request.user):
@@ -343,52 +396,34 @@ def update_task_status(request):
         # Guardamos el estado anterior para la notificacion
         old_status_label = task.get_status_display()
         
-        task.status = new_status_key
-        task.save(update_fields=['status']) # Actualiza solo el campo 'status'
-        
-        # ---- Logica AUTOMATIZACION ------
-        if new_status_key == Task.Status.DONE:
-            try:
-                # Intenta obtener el usuario bot que creamos
-                bot_find = 'nexus-bot'
-                bot_user = User.objects.get(username=bot_find)
-                Comment.objects.create(
-                    task=task,
-                    author=bot_user,
-                    text='¡Tarea Finalizada! Pendiente de revisión.'
-                )
-                
-            except User.DoesNotExist:
-                # Si el bot no existe, no hacemos nada para no causar un error
-                print("Advertencia: El usuario 'nexus-bot' no existe para la Automatización.")
-        # ---- Fin de la Logica AUTOMATIZACION ------
-        
-        # Logica notificacion
-        # Obtenemos la etiqueta legible del nuevo estado
-        new_status_label = task.get_status_display()
-        
-        # Logica de actividad
-        verb_text = f'cambió el estado de "{old_status_label}" a "{new_status_label}" en la tarea'
-        Activity.objects.create(project=task.project, actor=request.user, verb=verb_text, target=task)
-        # Fin logica actividad
-        
-        # Creamos el conjunto de destinatarios
-        recipients = set()
-        if task.assignee:
-            recipients.add(task.assignee)
-        recipients.add(task.project.workspace.owner)
-        
-        # Nos aseguramos de no notificar a quien hizo el cambio
-        recipients.discard(request.user)
-        # Creamos una notificacion para cada usuario en el conjunto
-        for user in recipients:
-            Notification.objects.create(
-                recipient=user,
-                actor=request.user,
-                verb=f'cambió el estado de "{old_status_label}" a "{new_status_label}" en la tarea',
-                target=task,
+        with transaction.atomic():
+            task.status = new_status_key
+            task.changed_by = request.user  # Autor de la transición (TaskTransition)
+            task.save(update_fields=['status']) # Actualiza solo el campo 'status'
+            
+            # ---- Logica AUTOMATIZACION ------
+            if new_status_key == Task.Status.DONE:
+                try:
+                    # Intenta obtener el usuario bot que creamos
+                    bot_find = 'nexus-bot'
+                    bot_user = User.objects.get(username=bot_find)
+                    Comment.objects.create(
+                        task=task,
+                        author=bot_user,
+                        text='¡Tarea Finalizada! Pendiente de revisión.'
+                    )
+                    
+                except User.DoesNotExist:
+                    # Si el bot no existe, no hacemos nada para no causar un error
+                    print("Advertencia: El usuario 'nexus-bot' no existe para la Automatización.")
+            # ---- Fin de la Logica AUTOMATIZACION ------
+            
+            # Actividad y notificaciones (asignado y dueño del workspace): un solo evento
+            events.record(
+                DomainEvent.Kind.TASK_STATUS_CHANGED, request.user, target=task, project=task.project,
+                recipients=[task.assignee_id, task.project.workspace.owner_id],
+                old_status=old_status_label, new_status=task.get_status_display(),
             )
-        # fin logica notificacion
         
         # 204 No Content es la respuesta estándar para una petición exitosa sin contenido
         return HttpResponse(status=204)
@@ -412,21 +447,14 @@ def create_task(request, project_slug):
             task.project = project
             if not task.status:
                 task.status = Task.Status.BACKLOG
-            task.save()
-            
-            # Logica de actividad
-            verb_text = f'creó la tarea "{task.title}"'
-            Activity.objects.create(project=project, actor=request.user, verb=verb_text, target=task)
-            
-            # Logica de notificacion
-            if task.assignee is not None:
-                if task.assignee != request.user:
-                    Notification.objects.create(
-                        recipient=task.assignee,
-                        actor=request.user,
-                        verb='te asignó la tarea',
-                        target=task
-                    )
+            task.changed_by = request.user
+            with transaction.atomic():
+                task.save()
+                # Actividad y notificación al asignado (ver core/events.py)
+                events.record(
+                    DomainEvent.Kind.TASK_CREATED, request.user, target=task, project=project,
+                    recipients=[task.assignee_id], title=task.title,
+                )
                     
             return render(request, 'core/_task_card.html', {'task': task})
         
@@ -441,7 +469,7 @@ def create_task(request, project_slug):
 @login_required
 def task_detail_update(request, pk):
     # 1. Obtenemos los objetos principales al principio
-    task = get_object_or_404(Task, pk=pk, project__workspace__members=request.user)
+    task = get_object_or_404(Task, pk=pk, project__workspace__members=request.user, project__deleted_at__isnull=True)
     can_edit = (request.user == task.project.workspace.owner or request.user == task.assignee)
     active_log = TimeLog.objects.filter(task=task, user=request.user, end_time__isnull=True).first()
     is_timer_active = active_log is not None
@@ -453,8 +481,17 @@ def task_detail_update(request, pk):
             
         form = TaskForm(request.POST, instance=task, project=task.project)
         if form.is_valid():
-            updated_task = form.save()
-            return render(request, 'core/_task_update_success.html', {'task': updated_task})
+            task.changed_by = request.user
+            rescheduled = []
+            # La edición y el desplazamiento de las sucesoras se confirman juntos:
+            # si la propagación falla, la tarea no queda guardada con fechas incoherentes
+            with transaction.atomic():
+                updated_task = form.save()
+                if task.project.auto_schedule and {'start_date', 'due_date', 'predecessors'} & set(form.changed_data):
+                    shifted = scheduling.propagate(updated_task)
+                    # Las tarjetas de las sucesoras desplazadas también se actualizan en el tablero
+                    rescheduled = Task.objects.filter(pk__in=[t.pk for t in shifted]).select_related('assignee')
+            return render(request, 'core/_task_update_success.html', {'task': updated_task, 'rescheduled': rescheduled})
         # Si el formulario NO es válido, la función continúa y renderiza el modal con los errores al final
     else: # Petición GET
         form = TaskForm(instance=task, project=task.project)
@@ -466,18 +503,171 @@ def task_detail_update(request, pk):
     context = {
         'form': form,
         'task': task,
+        **_comment_page(task),
         'comment_form': CommentForm(),
         'can_edit': can_edit,
         'is_timer_active': is_timer_active,
         'active_log': active_log,
+        'chunked_upload_threshold': settings.CHUNKED_UPLOAD_CHUNK_SIZE,
     }
     return render(request, 'core/_task_detail_modal.html', context)
 
 
+@replica_read
+@login_required
+def api_project_list(request):
+    """ API: proyectos de los workspaces del usuario (ver core/api.py). """
+    try:
+        fields = api.selected_fields(request, api.PROJECT_FIELDS, api.PROJECT_DEFAULT_FIELDS)
+        projects = Project.objects.filter(workspace__membership__user=request.user)
+        rows, limit = api.paginated_values(request, projects, api.PROJECT_FIELDS, fields)
+    except api.ApiError as error:
+        return api.error_response(error)
+    return api.stream_page(request, rows, limit, api.PROJECT_FIELDS, fields)
+
+
+@replica_read
+@login_required
+def api_task_list(request, project_slug):
+    """ API: tareas de un proyecto con filtros y campos a elección (ver core/api.py). """
+    project = get_object_or_404(Project, slug=project_slug, workspace__members=request.user)
+    try:
+        fields = api.selected_fields(request, api.TASK_FIELDS, api.TASK_DEFAULT_FIELDS)
+        tasks = api.filter_tasks(request, Task.objects.filter(project=project), Task.Status.values, Task.Priority.values)
+        rows, limit = api.paginated_values(request, tasks, api.TASK_FIELDS, fields)
+    except api.ApiError as error:
+        return api.error_response(error)
+    return api.stream_page(request, rows, limit, api.TASK_FIELDS, fields)
+
+
+@login_required
+@require_POST
+def api_task_upsert(request, project_slug):
+    """
+    API: crea o actualiza por lotes las tareas de un proyecto identificándolas
+    por 'external_id' (ver core/task_sync.py). Cuerpo: {"tasks": [...]}.
+    Reintentar el mismo lote es seguro: no duplica tareas.
+    """
+    project = get_object_or_404(Project.objects.select_related('workspace'), slug=project_slug, workspace__members=request.user)
+    if project.workspace.owner_id != request.user.pk:
+        return JsonResponse({'error': 'Solo el dueño del workspace puede sincronizar tareas.'}, status=403)
+    if project.archived_at:
+        return JsonResponse({'error': 'El proyecto está archivado.'}, status=409)
+    try:
+        records = json.loads(request.body).get('tasks')
+    except (ValueError, AttributeError):
+        records = None
+    if not isinstance(records, list):
+        return api.error_response('El cuerpo debe ser un objeto JSON con la lista "tasks".')
+    if len(records) > settings.TASK_UPSERT_MAX_BATCH:
+        return api.error_response(f'Máximo {settings.TASK_UPSERT_MAX_BATCH} tareas por petición.')
+
+    results = task_sync.upsert_tasks(project, records, actor=request.user)
+    counts = defaultdict(int)
+    for result in results:
+        counts[result['result']] += 1
+    return JsonResponse({
+        'created': counts['created'],
+        'updated': counts['updated'],
+        'errors': counts['error'],
+        'results': results,
+    })
+
+
+SEARCH_PAGE_SIZE = 20
+
+
+@replica_read
+@login_required
+def global_search(request):
+    """ Búsqueda en tareas, comentarios y proyectos de todos los workspaces del usuario. """
+    query = request.GET.get('q', '').strip()
+    page = Paginator(search.search(request.user, query), SEARCH_PAGE_SIZE).get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page': page,
+        'results': search.hydrate(page.object_list),
+    }
+    return render(request, 'core/search_results.html', context)
+
+
+AUTOCOMPLETE_LIMIT = 20
+
+
+@replica_read
+@login_required
+def task_autocomplete(request, project_slug):
+    """ Tareas del proyecto cuyo título empieza por 'q' (selector de predecesoras). """
+    project = get_object_or_404(Project, slug=project_slug, workspace__members=request.user)
+    tasks = project.tasks.filter(title__istartswith=request.GET.get('q', '').strip())
+    if request.GET.get('exclude', '').isdigit():
+        tasks = tasks.exclude(pk=request.GET['exclude'])
+    results = tasks.order_by('title').values_list('pk', 'title')[:AUTOCOMPLETE_LIMIT]
+    return render(request, 'core/_autocomplete_results.html', {'results': results})
+
+
+@replica_read
+@login_required
+def member_autocomplete(request, workspace_slug):
+    """ Miembros del workspace por prefijo de nombre, apellido o email (selector de responsable). """
+    workspace = get_object_or_404(Workspace, slug=workspace_slug, members=request.user)
+    query = request.GET.get('q', '').strip()
+    members = workspace.members.filter(
+        Q(first_name__istartswith=query) | Q(last_name__istartswith=query) | Q(email__istartswith=query)
+    ).order_by('first_name', 'last_name', 'email')[:AUTOCOMPLETE_LIMIT]
+    results = [(member.pk, str(member)) for member in members]
+    return render(request, 'core/_autocomplete_results.html', {'results': results})
+
+
+COMMENT_PAGE_SIZE = 20
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _comment_cursor(comment):
+    """ Cursor keyset '<microsegundos>.<id>' del comentario más antiguo de la página. """
+    return f'{(comment.created_at - EPOCH) // timedelta(microseconds=1)}.{comment.pk}'
+
+
+def _comment_page(task, before=None):
+    """
+    Una página de comentarios (los más recientes, o los anteriores al cursor
+    'before'), en orden cronológico. Siempre 3 consultas: comentarios con su
+    autor, adjuntos y sus blobs, sin importar la longitud del hilo.
+    """
+    comments = task.comments.select_related('author').prefetch_related(
+        Prefetch('attachments', queryset=Attachment.objects.select_related('blob'))
+    ).order_by('-created_at', '-id')
+    if before:
+        try:
+            micros, pk = (int(part) for part in before.split('.'))
+            created_at = EPOCH + timedelta(microseconds=micros)
+        except (ValueError, OverflowError):
+            raise Http404("Cursor no válido.")
+        comments = comments.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    page = list(comments[:COMMENT_PAGE_SIZE + 1])
+    has_older = len(page) > COMMENT_PAGE_SIZE
+    page = page[:COMMENT_PAGE_SIZE]
+    page.reverse()
+    return {
+        'comments': page,
+        'older_cursor': _comment_cursor(page[0]) if has_older else None,
+    }
+
+
+@replica_read
+@login_required
+def task_comments(request, task_pk):
+    """ Endpoint htmx "cargar anteriores": la página previa al cursor 'before'. """
+    task = get_object_or_404(Task, pk=task_pk, project__workspace__members=request.user, project__deleted_at__isnull=True)
+    context = {'task': task, **_comment_page(task, before=request.GET.get('before'))}
+    return render(request, 'core/_comment_page.html', context)
+
+
 @login_required
 @require_POST
 def add_comment(request, task_pk):
-    task = get_object_or_404(Task, pk=task_pk, project__workspace__members=request.user)
+    task = get_object_or_404(Task, pk=task_pk, project__workspace__members=request.user, project__deleted_at__isnull=True)
     
     # Verificamos si el usuario puede interactuar
     if not can_user_interact_with_project(task.project, request.user):
@@ -486,45 +676,36 @@ def add_comment(request, task_pk):
     form = CommentForm(request.POST, request.FILES)
 
     if form.is_valid():
-        # Primero, creamos el objeto Comment
-        comment = Comment.objects.create(
-            task=task,
-            author=request.user,
-            text=form.cleaned_data['text']
-        )
-        
-        # Logica de actividad
-        verb_text = 'comentó en la tarea'
-        Activity.objects.create(project=task.project, actor=request.user, verb=verb_text, target=task)
-        # Fin logica actividad
-        
-        # Logica notificacion
-        # Creamos un conjunto de usuarios a notificar para evitar duplicados
-        recipients = set()
-        # Añadimos a la persona a la tarea si existe
-        if task.assignee:
-            recipients.add(task.assignee)
-        # Añadimos al dueño del workspace
-        recipients.add(task.project.workspace.owner)
-        # Nos aseguramos de no hacer la notificacion al autor del comentario
-        recipients.discard(request.user)
-        # Creamos una notificación para cada usuario en el conjunto
-        for user in recipients:
-            Notification.objects.create(
-                recipient=user,
-                actor=request.user,
-                verb='comentó en la tarea',
-                target=task
+        # Archivo grande subido antes por partes (ver chunked_upload_start)
+        chunked_upload = None
+        if form.cleaned_data.get('upload_id'):
+            chunked_upload = ChunkedUpload.objects.filter(id=form.cleaned_data['upload_id'], user=request.user).first()
+            if chunked_upload is None or not chunked_upload.is_complete:
+                return HttpResponse("La subida del archivo no está completa.", status=400)
+
+        with transaction.atomic():
+            # Primero, creamos el objeto Comment
+            comment = Comment.objects.create(
+                task=task,
+                author=request.user,
+                text=form.cleaned_data['text']
+            )
+            # Actividad y notificaciones (asignado y dueño del workspace): un solo evento
+            events.record(
+                DomainEvent.Kind.COMMENT_ADDED, request.user, target=task, project=task.project,
+                recipients=[task.assignee_id, task.project.workspace.owner_id],
             )
 
         # Si el usuario subió un archivo, creamos el objeto Attachment
+        # El contenido se guarda una sola vez por hash (ver StoredFile)
         uploaded_file = form.cleaned_data.get('file')
         if uploaded_file:
-            Attachment.objects.create(
-                comment=comment,
-                uploader=request.user,
-                file=uploaded_file
-            )
+            Attachment.create_from_upload(comment, request.user, uploaded_file)
+        if chunked_upload:
+            with chunked_upload.temp_path.open('rb') as part:
+                Attachment.create_from_upload(comment, request.user, File(part, name=chunked_upload.filename))
+            chunked_upload.temp_path.unlink(missing_ok=True)
+            chunked_upload.delete()
         
         # Devolvemos el HTML del nuevo comentario para que htmx lo añada
         return render(request, 'core/_comment_item.html', {'comment': comment})
@@ -533,6 +714,76 @@ def add_comment(request, task_pk):
 
 
 
+@login_required
+@require_POST
+def chunked_upload_start(request):
+    """
+    Inicia una subida reanudable por partes para archivos grandes.
+    Devuelve el id de la subida y el tamaño máximo de cada parte.
+    """
+    filename = Path(request.POST.get('filename', '')).name[:255]
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        size = 0
+    if not filename or size <= 0 or size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        return HttpResponse("Datos inválidos.", status=400)
+
+    upload = ChunkedUpload.objects.create(user=request.user, filename=filename, size=size)
+    upload.temp_path.parent.mkdir(parents=True, exist_ok=True)
+    upload.temp_path.touch()
+    return JsonResponse({
+        'upload_id': str(upload.id),
+        'offset': 0,
+        'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+    }, status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def chunked_upload_chunk(request, upload_id):
+    """
+    GET devuelve cuántos bytes se han recibido (para reanudar).
+    PUT añade una parte; la cabecera X-Upload-Offset debe coincidir con lo ya
+    recibido, si no se responde 409 con el offset correcto.
+    """
+    upload = get_object_or_404(ChunkedUpload, id=upload_id, user=request.user)
+    if request.method == 'GET':
+        return JsonResponse({'offset': upload.offset, 'size': upload.size})
+
+    try:
+        offset = int(request.headers.get('X-Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length') or 0)
+    except ValueError:
+        return HttpResponse("Cabeceras inválidas.", status=400)
+    if length <= 0 or length > settings.CHUNKED_UPLOAD_CHUNK_SIZE or offset + length > upload.size:
+        return HttpResponse("Tamaño de parte inválido.", status=400)
+
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+        if offset != upload.offset:
+            return JsonResponse({'offset': upload.offset}, status=409)
+
+        with upload.temp_path.open('r+b') as part:
+            # Descartamos los restos de una parte interrumpida antes de escribir
+            part.truncate(offset)
+            part.seek(offset)
+            remaining = length
+            while remaining:
+                data = request.read(min(64 * 1024, remaining))
+                if not data:
+                    break
+                part.write(data)
+                remaining -= len(data)
+        if remaining:
+            return JsonResponse({'offset': upload.offset}, status=400)
+
+        upload.offset = offset + length
+        upload.save(update_fields=['offset'])
+
+    return JsonResponse({'offset': upload.offset, 'complete': upload.is_complete})
+
+
 class NotificationListView(LoginRequiredMixin, ListView):
     model = Notification
     template_name = 'core/notification_list.html'
@@ -552,12 +803,99 @@ class NotificationListView(LoginRequiredMixin, ListView):
         """
         Ahora este método solo tiene una responsabilidad: obtener la lista.
         """
-        return self.request.user.notifications.all()
+        # El actor y el objeto de cada notificación se cargan en bloque para la plantilla
+        # live(): sin las de tareas o proyectos pendientes de borrar, cuyos enlaces ya darían 404
+        return self.request.user.notifications.live().select_related('actor').prefetch_related('target')
     
     
 
+@login_required
+@require_POST
+def project_archive(request, project_slug):
+    """ Archiva en frío un proyecto terminado (ver core/archive.py). Solo el dueño del workspace. """
+    project = get_object_or_404(Project, slug=project_slug, workspace__owner=request.user)
+    if project.archived_at:
+        messages.warning(request, 'El proyecto ya está archivado.')
+    elif project.health_status != 'Terminado':
+        messages.error(request, 'Solo se pueden archivar proyectos con todas sus tareas completadas o canceladas.')
+    else:
+        archive.start_archive(project, request.user)
+        messages.success(request, f"El proyecto '{project.name}' se está archivando.")
+    return redirect('core:project_detail', project_slug=project.slug)
+
+
+@login_required
+@require_POST
+def project_restore(request, project_slug):
+    """ Restaura un proyecto archivado a las tablas activas. Solo el dueño del workspace. """
+    project = get_object_or_404(Project, slug=project_slug, workspace__owner=request.user)
+    record = ProjectArchive.objects.filter(project=project, state=ProjectArchive.State.ARCHIVED).first()
+    if record is None:
+        messages.warning(request, 'El proyecto no está archivado o todavía se está procesando.')
+    else:
+        archive.start_restore(record)
+        messages.success(request, f"El proyecto '{project.name}' se está restaurando.")
+    return redirect('core:project_detail', project_slug=project.slug)
+
+
+@login_required
+@require_POST
+def workspace_delete(request, workspace_slug):
+    """ Oculta el workspace y encola su borrado por lotes (ver core/deletion.py). Solo el dueño. """
+    workspace = get_object_or_404(Workspace, slug=workspace_slug, owner=request.user)
+    if deletion.archive_in_progress(Project.objects.filter(workspace=workspace)):
+        messages.error(request, 'Hay proyectos archivándose o restaurándose; inténtalo cuando terminen.')
+        return redirect('core:workspace_detail', workspace_slug=workspace.slug)
+    deletion.request_deletion(workspace, request.user)
+    messages.success(request, f"El equipo '{workspace.name}' se está eliminando.")
+    return redirect('core:workspace_list')
+
+
+@login_required
+def workspace_export(request, workspace_slug):
+    """ Descarga el workspace completo como zip de NDJSON, generado en streaming (ver core/transfer.py). Solo el dueño. """
+    workspace = get_object_or_404(Workspace, slug=workspace_slug, owner=request.user)
+    try:
+        transfer.check_exportable(workspace)
+    except ValueError as error:
+        messages.error(request, str(error))
+        return redirect('core:workspace_detail', workspace_slug=workspace.slug)
+    response = streaming_response(request, transfer.stream(workspace), content_type='application/zip')
+    filename = f'{workspace.slug}-{timezone.localdate():%Y%m%d}.zip'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@require_POST
+def project_delete(request, project_slug):
+    """ Oculta el proyecto y encola su borrado por lotes (ver core/deletion.py). Solo el dueño del workspace. """
+    project = get_object_or_404(Project.objects.select_related('workspace'), slug=project_slug, workspace__owner=request.user)
+    if deletion.archive_in_progress([project]):
+        messages.error(request, 'El proyecto se está archivando o restaurando; inténtalo cuando termine.')
+        return redirect('core:project_detail', project_slug=project.slug)
+    deletion.request_deletion(project, request.user)
+    messages.success(request, f"El proyecto '{project.name}' se está eliminando.")
+    return redirect('core:workspace_detail', workspace_slug=project.workspace.slug)
+
+
+@login_required
+def deletion_status(request, job_id):
+    """ Endpoint de sondeo con el progreso de un borrado pedido por el usuario. """
+    job = get_object_or_404(DeletionJob, pk=job_id, requested_by=request.user)
+    return JsonResponse({
+        'name': job.name,
+        'kind': job.kind,
+        'progress': job.progress,
+        'deleted_rows': job.deleted_rows,
+        'total_rows': job.total_rows,
+        'finished': job.finished_at is not None,
+    })
+
+
 class ProjectGanttView(LoginRequiredMixin, DetailView):
     model = Project
+    use_replica = True # Vista de solo lectura: puede leer de la réplica
     template_name = 'core/project_gantt.html'
     context_object_name = 'project'
     slug_url_kwarg = 'project_slug'
@@ -566,41 +904,180 @@ class ProjectGanttView(LoginRequiredMixin, DetailView):
         return Project.objects.filter(workspace__members=self.request.user)
     
 
-def project_gantt_data(request, project_slug):
-    project = get_object_or_404(Project, slug=project_slug, workspace__members=request.user)
-    tasks = project.tasks.filter(
-        start_date__isnull=False, 
-        due_date__isnull=False
-    ).order_by('start_date')
+# Zoom del Gantt -> (días de la ventana por defecto, agrupación de las barras).
+# En los zooms amplios una barra por tarea no se distingue y el payload crece
+# sin límite: se agrupan por asignado y semana/mes.
+GANTT_ZOOMS = {
+    'day': (42, None),
+    'week': (182, None),
+    'month': (365, TruncWeek),
+    'year': (1095, TruncMonth),
+}
+GANTT_DEFAULT_ZOOM = 'week'
+GANTT_MAX_WINDOW_DAYS = 3 * 365
+GANTT_MAX_BARS = 2000
+
+
+def _gantt_window(request):
+    """ Devuelve (zoom, inicio, fin) de la ventana pedida, con valores por defecto centrados en hoy. """
+    zoom = request.GET.get('zoom', GANTT_DEFAULT_ZOOM)
+    if zoom not in GANTT_ZOOMS:
+        raise api.ApiError(f"'zoom' debe ser uno de: {', '.join(GANTT_ZOOMS)}.")
+    window_days = GANTT_ZOOMS[zoom][0]
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else None
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else None
+    except ValueError:
+        raise api.ApiError("'start' y 'end' deben ser fechas AAAA-MM-DD.")
+    if start is None and end is None:
+        start = timezone.localdate() - timedelta(days=window_days // 4)
+    if start is None:
+        start = end - timedelta(days=window_days)
+    if end is None:
+        end = start + timedelta(days=window_days)
+    if end < start:
+        raise api.ApiError("'end' no puede ser anterior a 'start'.")
+    if (end - start).days > GANTT_MAX_WINDOW_DAYS:
+        raise api.ApiError(f'La ventana no puede superar {GANTT_MAX_WINDOW_DAYS} días.')
+    return zoom, start, end
+
+
+def _gantt_assignee_name(first_name, last_name):
+    return f'{first_name or ""} {last_name or ""}'.strip() or 'Sin Asignar'
+
+
+@replica_read
+@login_required
+async def project_gantt_data(request, project_slug):
+    """
+    Devuelve las tareas del proyecto que se solapan con una ventana de fechas
+    (?start=&end=&zoom=) en el formato de frappe-gantt. En los zooms 'month' y
+    'year' devuelve una barra por asignado y semana/mes en lugar de una por tarea.
+    Vista asincrona: usa el ORM async para no bloquear un worker por peticion.
+    """
+    user = await request.auser()
+    try:
+        project = await Project.objects.aget(slug=project_slug, workspace__members=user)
+    except Project.DoesNotExist:
+        raise Http404("Proyecto no encontrado.")
+    try:
+        zoom, start, end = _gantt_window(request)
+    except api.ApiError as error:
+        return api.error_response(error)
+
+    # Solapamiento con la ventana; usa el índice (project, start_date, due_date)
+    tasks = project.tasks.filter(start_date__lte=end, due_date__gte=start)
+    bucket = GANTT_ZOOMS[zoom][1]
+    if bucket is not None:
+        bars = await _gantt_groups(tasks, bucket)
+        truncated = False
+    else:
+        bars, truncated = await _gantt_bars(tasks)
+
+    return JsonResponse({
+        'zoom': zoom,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'aggregated': bucket is not None,
+        'truncated': truncated,
+        'tasks': bars,
+    })
+
+
+async def _gantt_bars(tasks):
+    """ Una barra por tarea, con asignados y predecesoras precargados en lote. """
+    tasks = (
+        tasks.select_related('assignee')
+        .prefetch_related(Prefetch('predecessors', queryset=Task.objects.only('id')))
+        .order_by('start_date', 'id')[:GANTT_MAX_BARS + 1]
+    )
+    rows = [task async for task in tasks.aiterator(chunk_size=500)]
+    truncated = len(rows) > GANTT_MAX_BARS
+    rows = rows[:GANTT_MAX_BARS]
+    visible = {task.id for task in rows}
 
     gantt_tasks = []
-    for task in tasks:
-        # --- INICIO DE LA CORRECCIÓN CLAVE ---
-        # Unimos los IDs de las predecesoras en un solo string separado por comas
-        dependencies_str = ",".join([f'task_{p.id}' for p in task.predecessors.all()])
-        # --- FIN DE LA CORRECCIÓN CLAVE ---
-
-        progress = 100 if task.status == Task.Status.DONE else 0
-        custom_class = f'bar-{task.status.lower()}'
-        assigne_name = task.assignee.get_full_name() if task.assignee else 'Sin Asignar'
+    for task in rows:
+        # Solo enlazamos predecesoras que también están en la ventana
+        dependencies_str = ",".join(f'task_{p.id}' for p in task.predecessors.all() if p.id in visible)
         gantt_tasks.append({
             'id': f'task_{task.id}',
             'name': task.title,
             'start': task.start_date.strftime('%Y-%m-%d'),
             'end': task.due_date.strftime('%Y-%m-%d'),
-            'progress': progress,
+            'progress': 100 if task.status == Task.Status.DONE else 0,
             'dependencies': dependencies_str,  # Pasamos el string, no la lista
-            'custom_class': custom_class,
-            'assignee': assigne_name,
+            'custom_class': f'bar-{task.status.lower()}',
+            'assignee': task.assignee.get_full_name() if task.assignee else 'Sin Asignar',
+        })
+    return gantt_tasks, truncated
+
+
+async def _gantt_groups(tasks, bucket):
+    """ Una barra por asignado y periodo, agregada en la base de datos. """
+    groups = (
+        tasks.annotate(period=bucket('start_date'))
+        .values('assignee_id', 'assignee__first_name', 'assignee__last_name', 'period')
+        .annotate(
+            first_start=Min('start_date'),
+            last_due=Max('due_date'),
+            total=Count('id'),
+            done=Count('id', filter=Q(status=Task.Status.DONE)),
+        )
+        # Las tareas sin asignar, al final (en SQLite los NULL irían primero)
+        .order_by(F('assignee_id').asc(nulls_last=True), 'period')
+    )
+    gantt_tasks = []
+    async for group in groups:
+        name = _gantt_assignee_name(group['assignee__first_name'], group['assignee__last_name'])
+        gantt_tasks.append({
+            'id': f"group_{group['assignee_id'] or 0}_{group['period']:%Y%m%d}",
+            'name': f"{group['total']} tareas · {name}",
+            'start': group['first_start'].strftime('%Y-%m-%d'),
+            'end': group['last_due'].strftime('%Y-%m-%d'),
+            'progress': group['done'] * 100 // group['total'],
+            'dependencies': '',
+            'custom_class': 'bar-group',
+            'assignee': name,
+            'count': group['total'],
         })
+    return gantt_tasks
+
+
+@replica_read
+@login_required
+async def notification_count(request):
+    """ Endpoint de sondeo (polling) con el numero de notificaciones no leidas. """
+    user = await request.auser()
+    unread = await user.notifications.live().filter(read=False).acount()
+    return JsonResponse({'unread': unread})
 
-    return JsonResponse(gantt_tasks, safe=False)
+
+@login_required
+async def task_time_summary(request, task_pk):
+    """ Endpoint de sondeo con el tiempo total registrado en una tarea. """
+    user = await request.auser()
+    try:
+        task = await Task.objects.aget(pk=task_pk, project__workspace__members=user, project__deleted_at__isnull=True)
+    except Task.DoesNotExist:
+        raise Http404("Tarea no encontrada.")
+
+    is_active = await TimeLog.objects.filter(task=task, user=user, end_time__isnull=True).aexists()
+    # 'formatted_total_logged_time' es una propiedad sincrona del modelo: la
+    # ejecutamos en el hilo principal de forma explicita.
+    total = await sync_to_async(lambda: task.formatted_total_logged_time, thread_sensitive=True)()
+    return JsonResponse({
+        'status': 'started' if is_active else 'stopped',
+        'total_logged_time': total,
+    })
 
 
 @login_required
 @require_POST
 def toggle_time_log(request, task_pk):
-    task = get_object_or_404(Task, pk=task_pk, project__workspace__members=request.user)
+    task = get_object_or_404(Task, pk=task_pk, project__workspace__members=request.user, project__deleted_at__isnull=True)
+    if task.project.archived_at:
+        return HttpResponseForbidden("El proyecto está archivado.")
     
     active_log = TimeLog.objects.filter(
         task=task, user=request.user, end_time__isnull=True
@@ -615,8 +1092,13 @@ def toggle_time_log(request, task_pk):
             'total_logged_time': task.formatted_total_logged_time
         })
     else:
-        # Si no hay log activo, creamos uno nuevo
-        new_log = TimeLog.objects.create(task=task, user=request.user)
+        # Solo se permite un cronómetro en curso por usuario: detenemos el de
+        # cualquier otra tarea antes de iniciar uno nuevo.
+        with transaction.atomic():
+            TimeLog.objects.filter(
+                user=request.user, end_time__isnull=True
+            ).update(end_time=timezone.now())
+            new_log = TimeLog.objects.create(task=task, user=request.user)
         return JsonResponse({
             'status': 'started',
             'start_time': new_log.start_time.isoformat() # Enviamos la hora de inicio exacta
@@ -625,6 +1107,7 @@ def toggle_time_log(request, task_pk):
 
 class TeamDirectoryView(LoginRequiredMixin, DetailView):
     model = Workspace
+    use_replica = True # Vista de solo lectura: puede leer de la réplica
     template_name = 'core/team_directory.html'
     context_object_name = 'workspace'
     slug_url_kwarg = 'workspace_slug'
@@ -659,9 +1142,13 @@ class TeamDirectoryView(LoginRequiredMixin, DetailView):
     
 class ProjectReportsView(LoginRequiredMixin, DetailView):
     model = Project
+    use_replica = True # Vista de solo lectura: puede leer de la réplica
     template_name = 'core/project_reports.html'
     context_object_name = 'project'
     slug_url_kwarg = 'project_slug'
+
+    def get_queryset(self):
+        return Project.objects.filter(workspace__members=self.request.user)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -701,6 +1188,26 @@ class ProjectReportsView(LoginRequiredMixin, DetailView):
         
         context['workload_labels'] = workload_labels
         context['workload_values'] = workload_values
+
+        # Previsión de capacidad: carga en todo el workspace de quienes tienen
+        # tareas en este proyecto (la sobreasignación suele venir de otros proyectos)
+        forecast = capacity.forecast(project.workspace)
+        if forecast is not None:
+            assigned = set(project.tasks.filter(assignee__isnull=False).values_list('assignee_id', flat=True))
+            forecast = {**forecast, 'people': [p for p in forecast['people'] if p['id'] in assigned]}
+        context['capacity'] = forecast
+        context['completion_forecast'] = forecasting.forecast(project)
+
+        # Métricas de flujo del historial de estados
+        metrics = flow.project_metrics(project)
+        context['flow'] = metrics
+        context['flow_charts'] = {
+            'histogram_labels': [label for label, _ in metrics['cycle_histogram']],
+            'cycle_histogram': [count for _, count in metrics['cycle_histogram']],
+            'lead_histogram': [count for _, count in metrics['lead_histogram']],
+            'throughput_labels': [week.strftime('%d/%m') for week, _ in metrics['throughput']],
+            'throughput': [count for _, count in metrics['throughput']],
+        }
         
         return context
     
@@ -739,4 +1246,78 @@ def create_role(request, workspace_slug):
         for error in form.errors.values():
             messages.error(request, error)
             
-    return redirect('core:workspace_manage', workspace_slug=workspace.slug)
\ No newline at end of file
+    return redirect('core:workspace_manage', workspace_slug=workspace.slug)
+
+
+@staff_member_required
+def perf_stats(request):
+    """ Métricas de rendimiento por vista (solo staff), combinando todos los workers. """
+    views = perf.load_snapshots(settings.PERF_STATS_DIR)
+    return JsonResponse({
+        'window_minutes': settings.PERF_WINDOW_MINUTES,
+        'views': perf.summarize(views),
+    })
+
+
+@staff_member_required
+def profile_list(request):
+    """ Lista los perfiles capturados recientemente (solo staff). """
+    return render(request, 'core/profile_list.html', {
+        'profiles': profiling.list_profiles(),
+        'profiling_enabled': settings.PROFILING_ENABLED,
+    })
+
+
+@staff_member_required
+def profile_download(request, name):
+    """ Descarga un archivo de perfil (.prof, .speedscope.json o .sql.json). """
+    if not profiling.PROFILE_NAME_RE.match(name):
+        raise Http404("Perfil no encontrado.")
+    path = Path(settings.PROFILING_DIR) / name
+    if not path.is_file():
+        raise Http404("Perfil no encontrado.")
+    return FileResponse(path.open('rb'), as_attachment=True, filename=name)
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD'])
+def attachment_download(request, pk):
+    """
+    Descarga un adjunto comprobando que el usuario es miembro del workspace.
+    Soporta Range y peticiones condicionales; con un proxy configurado el envío
+    se delega con X-Accel-Redirect / X-Sendfile.
+    """
+    attachment = get_object_or_404(
+        Attachment.objects.select_related('blob'),
+        pk=pk,
+        comment__task__project__workspace__members=request.user, comment__task__project__deleted_at__isnull=True,
+    )
+    try:
+        path = attachment.file.path
+        # El SHA-256 identifica el contenido: sirve como ETag fuerte
+        etag = f'"{attachment.blob.sha256}"' if attachment.blob else None
+        return serve_protected_file(
+            request, path, str(attachment), etag=etag,
+            as_attachment=request.GET.get('download') == '1',
+        )
+    except FileNotFoundError:
+        raise Http404("Archivo no encontrado.")
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD'])
+def attachment_preview(request, pk):
+    """ Miniatura de un adjunto (ver core/previews.py); 404 si aún no existe. """
+    attachment = get_object_or_404(
+        Attachment.objects.select_related('blob'),
+        pk=pk,
+        comment__task__project__workspace__members=request.user, comment__task__project__deleted_at__isnull=True,
+    )
+    if attachment.blob is None or not previews.preview_exists(attachment.blob.sha256):
+        raise Http404("Previsualización no disponible.")
+    # El contenido de un adjunto no cambia nunca: caché de larga duración
+    return serve_protected_file(
+        request, previews.preview_path(attachment.blob.sha256), f'{attachment}.jpg',
+        etag=f'"{attachment.blob.sha256}-preview"',
+        cache_control='private, max-age=31536000, immutable',
+    )
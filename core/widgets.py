@@ -0,0 +1,48 @@
+from django import forms
+
+
+class AutocompleteMixin:
+    """
+    Selector que solo renderiza las opciones seleccionadas; el resto se busca
+    con htmx en 'url' (ver task_autocomplete / member_autocomplete). Así el HTML
+    no crece con el tamaño del proyecto, y el campo del formulario sigue
+    validando solo los ids enviados contra su queryset.
+    """
+    template_name = 'core/widgets/autocomplete.html'
+
+    def __init__(self, url=None, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['url'] = self.url
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        self.choices = self._selected_choices(value)
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
+
+    def _selected_choices(self, value):
+        selected = [v for v in value if str(v).isdigit()]
+        if not hasattr(self.choices, 'queryset'):
+            return [choice for choice in self.choices if str(choice[0]) in selected]
+        iterator = self.choices
+        options = []
+        if not self.allow_multiple_selected and iterator.field.empty_label is not None:
+            options.append(('', iterator.field.empty_label))
+        if selected:
+            options.extend(iterator.choice(obj) for obj in iterator.queryset.filter(pk__in=selected))
+        return options
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
@@ -0,0 +1,21 @@
+// Selectores con autocompletado (core/widgets.py): al elegir un resultado se
+// añade como <option> seleccionada al <select>, que es lo que envía el formulario.
+(function() {
+    document.body.addEventListener('click', function(evt) {
+        const item = evt.target.closest('[data-autocomplete] [data-value]');
+        if (!item) return;
+        const container = item.closest('[data-autocomplete]');
+        const select = container.querySelector('select');
+
+        let option = Array.from(select.options).find(opt => opt.value === item.dataset.value);
+        if (!option) {
+            option = new Option(item.textContent.trim(), item.dataset.value);
+            select.add(option);
+        }
+        // En un select simple, seleccionar una opción deselecciona la anterior
+        option.selected = true;
+
+        container.querySelector('.autocomplete-results').innerHTML = '';
+        container.querySelector('input[type="search"]').value = '';
+    });
+})();
@@ -0,0 +1,68 @@
+// Subida por partes de archivos grandes en el formulario de comentarios.
+// Si el archivo supera el tamaño de parte, se sube antes de enviar el formulario
+// y htmx solo envía el id de la subida (campo oculto 'upload_id').
+(function() {
+    const MAX_RETRIES = 3;
+
+    function csrfToken() {
+        return document.querySelector('meta[name="csrf-token"]').getAttribute('content');
+    }
+
+    async function currentOffset(chunkUrl) {
+        const response = await fetch(chunkUrl);
+        if (!response.ok) throw new Error('No se pudo consultar la subida.');
+        return (await response.json()).offset;
+    }
+
+    async function uploadInChunks(startUrl, file) {
+        const body = new FormData();
+        body.append('filename', file.name);
+        body.append('size', file.size);
+        const response = await fetch(startUrl, {method: 'POST', headers: {'X-CSRFToken': csrfToken()}, body});
+        if (!response.ok) throw new Error('No se pudo iniciar la subida.');
+        const {upload_id: uploadId, chunk_size: chunkSize} = await response.json();
+        const chunkUrl = `${startUrl}${uploadId}/`;
+
+        let offset = 0;
+        let retries = 0;
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + chunkSize);
+            try {
+                const put = await fetch(chunkUrl, {
+                    method: 'PUT',
+                    headers: {'X-CSRFToken': csrfToken(), 'X-Upload-Offset': offset},
+                    body: chunk,
+                });
+                if (put.ok || put.status === 409) {
+                    // 409: el servidor tiene otro offset; continuamos desde ahí
+                    offset = (await put.json()).offset;
+                    retries = 0;
+                    continue;
+                }
+                throw new Error(`Error ${put.status} al subir una parte.`);
+            } catch (error) {
+                // Corte de red: reanudamos desde lo que el servidor ya recibió
+                if (++retries > MAX_RETRIES) throw error;
+                offset = await currentOffset(chunkUrl);
+            }
+        }
+        return uploadId;
+    }
+
+    document.body.addEventListener('htmx:confirm', function(evt) {
+        const form = evt.detail.elt;
+        if (!form.matches || !form.matches('form[data-chunked-upload-url]')) return;
+        const input = form.querySelector('input[type="file"]');
+        const file = input && input.files[0];
+        if (!file || file.size <= Number(form.dataset.chunkedUploadThreshold)) return;
+
+        evt.preventDefault();
+        uploadInChunks(form.dataset.chunkedUploadUrl, file)
+            .then(uploadId => {
+                form.querySelector('input[name="upload_id"]').value = uploadId;
+                input.value = '';
+                evt.detail.issueRequest();
+            })
+            .catch(error => console.error("Error en la subida por partes:", error));
+    });
+})();